@@ -0,0 +1,150 @@
+"""
+In-memory catalog of the YAML files used by the /yaml listing endpoints
+
+The entries (name, size, mtime, hash) of a directory are refreshed incrementally: the directory is
+scanned at most every CATALOG_SCAN_INTERVAL seconds and only the new or modified files (mtime or size)
+are read again. The blocks list of a file is extracted lazily (see api.yaml_cache).
+
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+### min time (in s) between two scans of a directory
+CATALOG_SCAN_INTERVAL = float(os.environ.get("CATALOG_SCAN_INTERVAL", 1.0))
+
+### fields of an entry that can be projected (see project)
+FIELDS = ('last modified', 'size', 'mtime', 'hash', 'blocks', 'content')
+
+class Entry:
+    """Catalog entry of a YAML file.
+    """
+
+    __slots__ = ('name', 'path', 'size', 'mtime_ns', 'hash')
+
+    def __init__(self, name:str, path:str, size:int, mtime_ns:int):
+        self.name = name
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.hash = file_hash(path)
+
+def file_hash(path:str)->str:
+    """sha256 of the content of the file.
+    """
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+class Catalog:
+    """Catalog of the YAML files of a directory.
+    """
+
+    def __init__(self, path:str, interval:float=CATALOG_SCAN_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._entries = {}
+        self._names = []
+        self._last_scan = None
+        self._lock = threading.Lock()
+
+    def invalidate(self)->None:
+        """Force the scan of the directory at the next access (after an upload for instance).
+        """
+        self._last_scan = None
+
+    def refresh(self)->None:
+        """Scan the directory if needed and update the new, modified or removed entries.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._last_scan is not None and now - self._last_scan < self.interval:
+                return
+
+            entries = {}
+            ### missing directory is considered as empty
+            if os.path.isdir(self.path):
+                with os.scandir(self.path) as it:
+                    for dir_entry in it:
+                        if not dir_entry.name.endswith('.yaml') or not dir_entry.is_file():
+                            continue
+                        st = dir_entry.stat()
+                        entry = self._entries.get(dir_entry.name)
+                        if entry is None or entry.mtime_ns != st.st_mtime_ns or entry.size != st.st_size:
+                            entry = Entry(dir_entry.name, dir_entry.path, st.st_size, st.st_mtime_ns)
+                        entries[dir_entry.name] = entry
+
+            if entries.keys() != self._entries.keys():
+                self._names = sorted(entries)
+            self._entries = entries
+            self._last_scan = now
+
+    def list(self, prefix:str="", offset:int=0, limit:int=None)->tuple:
+        """Get the sorted entries starting with prefix in the page [offset, offset+limit[ and the number of matching entries.
+        """
+        self.refresh()
+
+        names = self._names
+        entries = self._entries
+        if prefix:
+            names = [name for name in names if name.startswith(prefix)]
+
+        page = names[offset:offset+limit if limit is not None else None]
+
+        return [entries[name] for name in page], len(names)
+
+def project(entry:Entry, fields:tuple)->dict:
+    """Get the fields of the entry.
+    """
+    data = {}
+    for field in fields:
+        if field == 'last modified':
+            data[field] = str(time.ctime(entry.mtime_ns / 1e9))
+        elif field == 'size':
+            data[field] = str(entry.size*0.001)+' ko'
+        elif field == 'mtime':
+            data[field] = entry.mtime_ns / 1e9
+        elif field == 'hash':
+            data[field] = entry.hash
+        elif field == 'blocks':
+            from api.yaml_cache import get_blocks_list
+            output = get_blocks_list(entry.path)
+            data[field] = json.loads(output['output']) if output['success'] else None
+        elif field == 'content':
+            with open(entry.path, 'r') as f:
+                data[field] = f.read()
+    return data
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+def get_catalog(path:str)->Catalog:
+    """Get the catalog of the directory.
+    """
+    path = os.path.abspath(path)
+    with _catalogs_lock:
+        if path not in _catalogs:
+            _catalogs[path] = Catalog(path)
+        return _catalogs[path]
+
+def list_entries(paths:list, prefix:str="", offset:int=0, limit:int=None)->tuple:
+    """Get the page of the entries of the directories and the number of matching entries.
+
+    A name of a directory overrides the same name in the previous ones.
+    """
+    if len(paths) == 1:
+        return get_catalog(paths[0]).list(prefix, offset, limit)
+
+    merged = {}
+    for path in paths:
+        entries, _ = get_catalog(path).list(prefix)
+        merged.update((entry.name, entry) for entry in entries)
+
+    names = sorted(merged)
+    page = names[offset:offset+limit if limit is not None else None]
+
+    return [merged[name] for name in page], len(names)
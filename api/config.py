@@ -5,4 +5,11 @@ current_api_path = os.path.dirname(__file__)
 devsimpy_dir = 'devsimpy-nogui'
 yaml_path_dir = os.path.join(current_api_path, 'static', 'yaml')
 users_path_dir = os.path.join(os.path.dirname(current_api_path), 'users')
-devsimpy_nogui = os.path.join(current_api_path, devsimpy_dir, 'devsimpy-nogui.py')
\ No newline at end of file
+devsimpy_nogui = os.path.join(current_api_path, devsimpy_dir, 'devsimpy-nogui.py')
+############################################### set by the environment
+### redis used by the live streams of the simulations (the broker by default)
+redis_url = os.environ.get("REDIS_URL", os.environ.get("CELERY_BROKER_URL", "redis://localhost:6379"))
+### checkpoints of the simulations (shared by the workers to resume them, see /simulation/start/)
+checkpoints_path_dir = os.environ.get("SIM_CHECKPOINT_DIR", os.path.join(os.path.dirname(current_api_path), 'checkpoints'))
+### cProfile stats of the simulations (written by the workers and served by the API, see api.profiles)
+profiles_path_dir = os.environ.get("SIM_PROFILE_DIR", os.path.join(os.path.dirname(current_api_path), 'profiles'))
@@ -0,0 +1,91 @@
+"""
+Cooperative cancellation of the simulations through Redis
+
+The API publishes the cancellation of a simulation on the sim:<sim_id>:control channel (and keeps it in the
+sim:<sim_id>:cancel key for a simulation that has not started yet). The worker listens to the channel while the
+simulation runs and forwards the request on the control channel of devsimpy-nogui (see ControlChannel.py).
+
+"""
+import threading
+
+import redis
+
+from api.config import redis_url
+
+### time (in s) during which a cancellation request is kept
+CANCEL_TTL = 3600
+### period (in s) of the check of the end of a listener
+LISTEN_PERIOD = 0.1
+
+def control_key(sim_id:str)->str:
+    return f"sim:{sim_id}:control"
+
+def cancel_key(sim_id:str)->str:
+    return f"sim:{sim_id}:cancel"
+
+def request_cancel(sim_id:str)->None:
+    """Request the cancellation of the simulation (used by the API).
+    """
+    client = redis.Redis.from_url(redis_url)
+    with client.pipeline() as pipe:
+        pipe.set(cancel_key(sim_id), 1, ex=CANCEL_TTL)
+        pipe.publish(control_key(sim_id), 'cancel')
+        pipe.execute()
+
+class CancelListener(threading.Thread):
+    """Thread that calls on_cancel when the cancellation of the simulation is requested (used by the worker).
+    """
+
+    def __init__(self, sim_id:str, on_cancel):
+        threading.Thread.__init__(self, name=f"CancelListener-{sim_id}", daemon=True)
+        self.sim_id = sim_id
+        self.on_cancel = on_cancel
+        self.cancelled = False
+        self._stop_event = threading.Event()
+        self._client = redis.Redis.from_url(redis_url)
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        ### subscribed before the check of the key so that no request is lost
+        self._pubsub.subscribe(control_key(sim_id))
+
+    def is_requested(self)->bool:
+        """Return True if the cancellation has been requested before the start of the listener.
+        """
+        return bool(self._client.exists(cancel_key(self.sim_id)))
+
+    def run(self):
+        try:
+            while not self._stop_event.is_set():
+                message = self._pubsub.get_message(timeout=LISTEN_PERIOD)
+                if message and message['data'] == b'cancel':
+                    self.cancelled = True
+                    self.on_cancel()
+        finally:
+            self._pubsub.close()
+
+    def stop(self):
+        self._stop_event.set()
+
+class Controller:
+    """Link between the cancellation requests and the running simulation (its cancel function is attached when it starts).
+    """
+
+    def __init__(self):
+        self.requested = False
+        self._cancel = None
+        self._lock = threading.Lock()
+
+    def attach(self, cancel)->None:
+        """Attach the cancel function of the started simulation.
+        """
+        with self._lock:
+            self._cancel = cancel
+            if self.requested:
+                cancel()
+
+    def cancel(self)->None:
+        """Cancel the simulation (as soon as it is started).
+        """
+        with self._lock:
+            self.requested = True
+            if self._cancel is not None:
+                self._cancel()
@@ -1045,9 +1045,12 @@ class Diagram(Savable, Structurable):
 		"""
 		return len(self.shapes)
 
-	def GetFlatBlockShapeList(self, l=[]):
+	def GetFlatBlockShapeList(self, l=None):
 		""" Get the flat list of Block (Code and Container) shape using recursion process
 		"""
+		### a new list at each call (the diagrams of a warm process do not share their blocks)
+		if l is None:
+			l = []
 		for shape in self.shapes:
 			if isinstance(shape, CodeBlock):
 				l.append(shape)
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+"""
+Name: ControlChannel.py
+Brief description: Framed channel used by the process that has started a simulation to control it (cancellation)
+GENERAL NOTES AND REMARKS:
+
+The frames have the format of the result channel (see ResultChannel.py) and are read on the file descriptor
+given by the -control_fd option of devsimpy-nogui.py. A {'type':'cancel'} frame stops the simulation
+cooperatively: the end flag of the simulation thread is set, the finish() hooks of the models are called and
+the report (with the partial results) is made as usual.
+
+GLOBAL VARIABLES AND FUNCTIONS:
+"""
+
+import os
+import threading
+
+from ResultChannel import FrameReader
+
+_lock = threading.Lock()
+### simulation thread of the current simulation and cancellation request
+_simulation = None
+_cancelled = False
+
+def reset()->None:
+	""" Forget the previous simulation (the process executes a new one).
+	"""
+	global _simulation, _cancelled
+	with _lock:
+		_simulation = None
+		_cancelled = False
+
+def register(thread)->None:
+	""" Register the simulation thread to control (cancelled immediately if the cancellation has been requested before).
+	"""
+	global _simulation
+	with _lock:
+		_simulation = thread
+		if _cancelled:
+			thread.cancel()
+
+def cancel()->None:
+	""" Cancel the current simulation (or the next registered one).
+	"""
+	global _cancelled
+	with _lock:
+		_cancelled = True
+		if _simulation is not None:
+			_simulation.cancel()
+
+def is_cancelled()->bool:
+	""" Return True if the cancellation has been requested.
+	"""
+	return _cancelled
+
+def handle(frame:dict)->None:
+	""" Execute the control frame.
+	"""
+	if frame.get('type') == 'cancel':
+		cancel()
+
+def listen(fd:int)->threading.Thread:
+	""" Read the control frames on the file descriptor in a daemon thread.
+	"""
+	def run():
+		reader = FrameReader()
+		while True:
+			data = os.read(fd, 4096)
+			if not data:
+				break
+			for frame in reader.feed(data):
+				handle(frame)
+
+	thread = threading.Thread(target=run, name='ControlChannel', daemon=True)
+	thread.start()
+	return thread
@@ -16,17 +16,19 @@
 import sys
 from itertools import *
 import threading
-import array
+from operator import itemgetter
 
 from .DEVS import CoupledDEVS
 #from Patterns.Strategy import SimStrategy1
 
-from PluginManager import PluginManager
+from PluginManager import Hooks
 
 ### avec ce flag, on gere a totalité des messages sur les ports une seul fois dans delta_ext.
 WITHOUT_DELTA_EXT_FOR_ALL_PORT = True
 ### avec ce flag on peut faire de l'execution en paralle de modèle qui s'active en meme emps mais pas avec des modèles couplé dans des modèle couplé
 WITH_PARALLEL_EXECUTION = False
+### avec ce flag, chaque modèle est lié une seule fois à la fonction receive de son solver (voir Simulator.__augment) au lieu d'un dispatch (isinstance) à chaque message
+WITH_BOUND_DISPATCH = True
 
 ###############################################################################
 # GLOBAL VARIABLES AND FUNCTIONS
@@ -42,6 +44,169 @@ def Error(message = '', esc = 1):
 	stderr.write("ERROR: %s\n" % message)
 	if esc: exit(1)
 
+def reschedule(d):
+	"""Update the position of {\tt d} in the event-list of its parent (after a
+	change of its {\tt myTimeAdvance}).
+	"""
+	parent = d.parent
+	if parent is not None and parent.eventList is not None:
+		parent.eventList.update(d)
+
+def compileRoutes(d):
+	"""Compile the routing table of the ports of {\tt d}.
+
+	The {\tt outLine} of each port (IC, EIC and EOC couplings) is flattened in
+	the {\tt routes} tuple of pairs $(host,\,ports)$, where {\tt ports} are
+	the destination ports of {\tt host} (hosts in the {\tt outLine} order).
+	The coupling structure is static during the simulation, so the routing
+	tables are compiled once (see {\tt Simulator}).
+	"""
+	for p in d.IPorts + d.OPorts:
+		routes = {}
+		for pp in p.outLine:
+			routes.setdefault(pp.host, []).append(pp)
+		p.routes = tuple((host, tuple(ports)) for host, ports in routes.items())
+
+class ActivityCounter:
+	"""Number of active atomic-DEVS (with a finite {\tt timeNext}) of a
+	simulation.
+
+	The counter is shared by all the models of the simulation (see
+	{\tt Simulator}) and updated by the solvers only when the {\tt timeNext}
+	of an atomic-DEVS becomes finite or infinite (see {\tt updateActivity}), so
+	that the end of a simulation without time limit is detected in O(1).
+	"""
+
+	__slots__ = ('active',)
+
+	def __init__(self):
+		"""Constructor.
+		"""
+		self.active = 0
+
+def updateActivity(d):
+	"""Count the change of activity of the atomic-DEVS {\tt d} (its
+	{\tt timeNext} has become finite or infinite).
+	"""
+	d.activity.active += 1 if d.timeNext != INFINITY else -1
+
+###############################################################################
+# EVENT LIST
+###############################################################################
+
+class EventList:
+	"""Event-list of a coupled-DEVS.
+
+		Indexed binary heap of the children of the coupled-DEVS ordered by their
+		time of next event ({\tt myTimeAdvance}) and then by their rank in the
+		{\tt componentSet}. The position of each child in the heap is kept so
+		that only the children whose time of next event has changed are moved
+		(O(log N) per child) instead of scanning all the children at each event.
+	"""
+
+	__slots__ = ('heap', 'pos')
+
+	def __init__(self, componentSet):
+		"""Constructor.
+		"""
+		# Each entry of the heap is the list $[tn_d,\,rank_d,\,d]$.
+		self.heap = []
+		self.pos = {}
+		for i, d in enumerate(componentSet):
+			self.pos[d] = i
+			self.heap.append([d.myTimeAdvance, i, d])
+
+		for i in reversed(range(len(self.heap)//2)):
+			self._down(i)
+
+	def __len__(self):
+		return len(self.heap)
+
+	def min(self):
+		"""Return the smallest time of next event of the children.
+		"""
+		return self.heap[0][0] if self.heap else INFINITY
+
+	def update(self, d):
+		"""Move the child {\tt d} after a change of its time of next event.
+		"""
+		i = self.pos[d]
+		entry = self.heap[i]
+		tn = d.myTimeAdvance
+		if tn < entry[0]:
+			entry[0] = tn
+			self._up(i)
+		elif tn > entry[0]:
+			entry[0] = tn
+			self._down(i)
+
+	def imminent(self):
+		"""Return the children which tied for the smallest time of next event
+		(in the {\tt componentSet} order).
+		"""
+		heap = self.heap
+		if not heap:
+			return []
+
+		tn = heap[0][0]
+		n = len(heap)
+		L = []
+		# the sub-heaps of an entry which is not imminent are skipped
+		stack = [0]
+		while stack:
+			i = stack.pop()
+			entry = heap[i]
+			if entry[0] == tn:
+				L.append(entry)
+				j = 2*i+1
+				if j < n: stack.append(j)
+				if j+1 < n: stack.append(j+1)
+
+		L.sort(key=itemgetter(1))
+		return [entry[2] for entry in L]
+
+	def _up(self, i):
+		heap = self.heap
+		pos = self.pos
+		entry = heap[i]
+		key = (entry[0], entry[1])
+		while i > 0:
+			j = (i-1) >> 1
+			parent = heap[j]
+			if key < (parent[0], parent[1]):
+				heap[i] = parent
+				pos[parent[2]] = i
+				i = j
+			else:
+				break
+		heap[i] = entry
+		pos[entry[2]] = i
+
+	def _down(self, i):
+		heap = self.heap
+		pos = self.pos
+		n = len(heap)
+		entry = heap[i]
+		key = (entry[0], entry[1])
+		while True:
+			j = 2*i+1
+			if j >= n:
+				break
+			child = heap[j]
+			if j+1 < n:
+				right = heap[j+1]
+				if (right[0], right[1]) < (child[0], child[1]):
+					j += 1
+					child = right
+			if (child[0], child[1]) < key:
+				heap[i] = child
+				pos[child[2]] = i
+				i = j
+			else:
+				break
+		heap[i] = entry
+		pos[entry[2]] = i
+
 ###############################################################################
 # SIMULATOR CLASSES
 ###############################################################################
@@ -63,7 +228,13 @@ class Sender:
 			thread.finish()
 
 	def send(self, d, msg):
-		""" Dispatch messages to the right method.
+		""" Send the message to the solver of {\tt d} (bound by {\tt Simulator}).
+		"""
+		return d._receive(d, msg)
+
+	@staticmethod
+	def dispatch(d, msg):
+		""" Dispatch messages to the right method (without {\tt WITH_BOUND_DISPATCH}).
 		"""
 		if isinstance(d, CoupledDEVS):
 			CS = CoupledSolver()
@@ -72,9 +243,6 @@ class Sender:
 			AS = AtomicSolver()
 			r = AS.receive(d, msg)
 
-			PluginManager.trigger_event("SIM_BLINK", model=d, msg=msg)
-			PluginManager.trigger_event("SIM_TEST", model=d, msg=msg)
-
 		return r
 
 class ThreadingAtomicSolver(threading.Thread):
@@ -127,6 +295,7 @@ class AtomicSolver:
 		# For any received message, the time {\tt t} (time at which the message
 		# is sent) is the second item in the list {\tt msg}.
 		t = msg[2]
+		r = None
 
 		# $(*,\,t)$ message --- triggers internal transition and returns
 		# $(y,\,t)$ message for parent coupled-DEVS:
@@ -142,18 +311,21 @@ class AtomicSolver:
 			aDEVS.elapsed = t - aDEVS.timeLast
 			aDEVS.intTransition()
 
+			active = aDEVS.timeNext != INFINITY
 			aDEVS.timeLast = t
 			aDEVS.myTimeAdvance = aDEVS.timeAdvance()
 			aDEVS.timeNext = aDEVS.timeLast + aDEVS.myTimeAdvance
 			if aDEVS.myTimeAdvance != INFINITY: aDEVS.myTimeAdvance += t
 			aDEVS.elapsed = 0
+			if (aDEVS.timeNext != INFINITY) != active: updateActivity(aDEVS)
+			reschedule(aDEVS)
 
 			# The SIM_VERBOSE event occurs
-			PluginManager.trigger_event("SIM_VERBOSE", model=aDEVS, msg=0)
+			for f in Hooks.SIM_VERBOSE: f(model=aDEVS, msg=0)
 
 			# Return the DEVS' output to the parent coupled-DEVS (rather than
 			# sending $(y,\,t)$ message).
-			return aDEVS.myOutput
+			r = aDEVS.myOutput
 
 		# ${x,\,t)$ message --- triggers external transition, where $x$ is the
 		# input dictionnary to the DEVS:
@@ -169,25 +341,35 @@ class AtomicSolver:
 			aDEVS.extTransition()
 
 			# Udpate time variables:
+			active = aDEVS.timeNext != INFINITY
 			aDEVS.timeLast = t
 			aDEVS.myTimeAdvance = aDEVS.timeAdvance()
 			aDEVS.timeNext = aDEVS.timeLast + aDEVS.myTimeAdvance
 			if aDEVS.myTimeAdvance != INFINITY: aDEVS.myTimeAdvance += t
 			aDEVS.elapsed = 0
+			if (aDEVS.timeNext != INFINITY) != active: updateActivity(aDEVS)
+			reschedule(aDEVS)
 
 			# The SIM_VERBOSE event occurs
-			PluginManager.trigger_event("SIM_VERBOSE", model=aDEVS, msg=1)
+			for f in Hooks.SIM_VERBOSE: f(model=aDEVS, msg=1)
 
 		# $(i,\,t)$ message --- sets origin of time at {\tt t}:
 		elif msg[0] == 0:
+			active = aDEVS.timeNext != INFINITY
 			aDEVS.timeLast = t - aDEVS.elapsed
 			aDEVS.myTimeAdvance = aDEVS.timeAdvance()
 			aDEVS.timeNext = aDEVS.timeLast + aDEVS.myTimeAdvance
 			if aDEVS.myTimeAdvance != INFINITY: aDEVS.myTimeAdvance += t
+			if (aDEVS.timeNext != INFINITY) != active: updateActivity(aDEVS)
 
 		else:
 			Error("Unrecognized message", 1)
 
+		for f in Hooks.SIM_BLINK: f(model=aDEVS, msg=msg)
+		for f in Hooks.SIM_TEST: f(model=aDEVS, msg=msg)
+
+		return r
+
 ###############################################################################
 
 class CoupledSolver(Sender):
@@ -199,7 +381,12 @@ class CoupledSolver(Sender):
 	is always sent to a coupled-DEVS in response from its sending a $(*,\,t)$
 	message. (This implementation makes it possible to easily distinguish
 	$(y,\,t)$ from $(x,\,t)$ messages... to be completed)
-	Description of {\tt eventList} and {\tt dStar} (to be completed)
+	{\tt eventList} is the event-list of the coupled-DEVS (see {\tt EventList}):
+	it is rebuilt by the $(i,\,t)$ message and then updated by the children
+	whose time of next event changes (see {\tt reschedule}), so that
+	{\tt myTimeAdvance} and {\tt immChildren} are obtained without scanning
+	all the children. {\tt dStar} is the active-child selected among the
+	{\tt immChildren}.
 	"""
 
 	_instance = None
@@ -210,7 +397,6 @@ class CoupledSolver(Sender):
 
 	def threading_send(self, Y, cDEVS, t):
 
-		send = self.send
 		send_parallel = self.t_send
 
 		cDEVS.timeLast = t
@@ -220,35 +406,29 @@ class CoupledSolver(Sender):
 		imm = cDEVS.immChildren
 		if WITHOUT_DELTA_EXT_FOR_ALL_PORT:
 
-			X = dict((pp.host,[(pp, Y[p])]) for p in Y for pp in p.outLine)
-
-			#for b,val in X.items():
-				#if b is CoupledDEVS:
-					#cDEVS.myOutput[b] = val[-1][-1]
-
-				#if WITH_PARALLEL_EXECUTION:
-					#send_parallel(X,imm,t)
-				#else:
-					#send(b, (dict(val), imm, t))
+			# All the messages for a host are sent at once (one delta_ext), using
+			# the routing tables of the ports (see {\tt compileRoutes}).
+			# (Y can be cleared by the sends, so it is read before)
+			if len(Y) == 1 and not WITH_PARALLEL_EXECUTION:
+				(p, a), = Y.items()
+				for b, ports in p.routes:
+					b._receive(b, (dict.fromkeys(ports, a), imm, t))
+				return
 
 			X = {}
-			for p in Y:
-				a = Y[p]
-				for pp in p.outLine:
-					b = pp.host
-					if b not in X:
-						X[b] = [(pp,a)]
-					else:
-						X[b].append((pp,a))
-
-					if b is CoupledDEVS:
-						cDEVS.myOutput[b] = a
+			for p, a in Y.items():
+				for b, ports in p.routes:
+					x = X.get(b)
+					if x is None:
+						X[b] = x = {}
+					for pp in ports:
+						x[pp] = a
 
 			if WITH_PARALLEL_EXECUTION:
 				send_parallel(X,imm,t)
 			else:
-				for m in X:
-					send(m, (dict(X[m]), imm, t))
+				for m, x in X.items():
+					m._receive(m, (x, imm, t))
 		else:
 			for p in Y:
 				X = {}
@@ -258,7 +438,7 @@ class CoupledSolver(Sender):
 					b = pp.host
 					if b is CoupledDEVS:
 						cDEVS.myOutput[b] = a
-					send(b, (X, imm, t))
+					b._receive(b, (X, imm, t))
 
 		#L.append((cDEVS.myTimeAdvance, cDEVS.myOutput, cDEVS.componentSet))
 
@@ -269,8 +449,6 @@ class CoupledSolver(Sender):
 		# is sent) is the second item in the list {\tt msg}.
 		t = msg[2]
 
-		send = self.send
-
 		# $(*,\,t)$ message --- triggers internal transition and returns
 		# $(y,\,t)$ message for parent coupled-DEVS:
 		if msg[0] == 1:
@@ -282,7 +460,12 @@ class CoupledSolver(Sender):
 			# The coupled-DEVS {\tt select} function is used to decide the active-child.
 
 			try:
-				dStar = cDEVS.select(cDEVS.immChildren)
+				# the immChildren are in the componentSet order: the default select
+				# function returns the first one.
+				if cDEVS.select.__func__ is CoupledDEVS.select:
+					dStar = cDEVS.immChildren[0]
+				else:
+					dStar = cDEVS.select(cDEVS.immChildren)
 			# si pas d'imminentChildren il faut stoper la simulation
 			except IndexError:
 				raise IndexError
@@ -291,12 +474,15 @@ class CoupledSolver(Sender):
 			# back) message $(y,\,t)$. In the present implementation, just the
 			# sub-DEVS output dictionnary $y$ is returned and stored in {\tt Y}:
 
-			self.threading_send(send(dStar, msg), cDEVS, t)
+			self.threading_send(dStar._receive(dStar, msg), cDEVS, t)
 
-			cDEVS.myTimeAdvance = min(array.array('d',[c.myTimeAdvance for c in cDEVS.componentSet]+[cDEVS.myTimeAdvance]))
+			# The children which have changed are already updated in the event-list.
+			eventList = cDEVS.eventList
+			cDEVS.myTimeAdvance = eventList.min()
 
 			###each to the coupled DEVS' immChildren list
-			cDEVS.immChildren = [d for d in cDEVS.componentSet if cDEVS.myTimeAdvance == d.myTimeAdvance]
+			cDEVS.immChildren = eventList.imminent()
+			reschedule(cDEVS)
 
 			return cDEVS.myOutput
 
@@ -315,14 +501,14 @@ class CoupledSolver(Sender):
 
 			self.threading_send(cDEVS.myInput, cDEVS, t)
 
-			for t in array.array('d', [d.myTimeAdvance for d in cDEVS.componentSet]):
-				if cDEVS.myTimeAdvance > t:
-					cDEVS.myTimeAdvance = t
+			eventList = cDEVS.eventList
+			cDEVS.myTimeAdvance = eventList.min()
 
 			# Get all components which tied for the smallest time advance and append
 			# each to the coupled DEVS' immChildren list
 
-			cDEVS.immChildren = [d for d in cDEVS.componentSet if cDEVS.myTimeAdvance == d.myTimeAdvance]
+			cDEVS.immChildren = eventList.imminent()
+			reschedule(cDEVS)
 
 		# $(i,\,t)$cDEVS.myOutput message --- sets origin of time at {\tt t}:
 		elif msg[0] == 0:
@@ -333,15 +519,18 @@ class CoupledSolver(Sender):
 			# defined as bigger than any number in Python (stands for $+\infty$).
 			cDEVS.timeLast = 0
 			cDEVS.myTimeAdvance = INFINITY
+			cDEVS.eventList = None
 
 			for d in cDEVS.componentSet:
-				self.send(d, msg)
-				cDEVS.myTimeAdvance = min(cDEVS.myTimeAdvance, d.myTimeAdvance)
+				d._receive(d, msg)
 				cDEVS.timeLast = max(cDEVS.timeLast, d.timeLast)
 
+			cDEVS.eventList = EventList(cDEVS.componentSet)
+			cDEVS.myTimeAdvance = cDEVS.eventList.min()
+
 			# Get all the components which have tied for the smallest time advance
 			# and put them into the coupled DEVS' immChildren list
-			cDEVS.immChildren = [d for d in cDEVS.componentSet if cDEVS.myTimeAdvance == d.myTimeAdvance]
+			cDEVS.immChildren = cDEVS.eventList.imminent()
 
 		else:
 			Error("Unrecognized message", 1)
@@ -370,6 +559,8 @@ class Simulator(Sender):
 		"""
 
 		self.model = model
+		# number of active atomic-DEVS (see {\tt ActivityCounter})
+		self.activity = ActivityCounter()
 		self.__augment(self.model)
 #		self.__algorithm = SimStrategy1(self)
 
@@ -383,10 +574,29 @@ class Simulator(Sender):
 		# the next event.
 		d.timeLast = d.myTimeAdvance = 0.
 
+		# {\tt activity} counts the atomic-DEVS with a finite {\tt timeNext}
+		# (set by the $(i,\,t)$ message).
+		d.activity = self.activity
+		if not isinstance(d, CoupledDEVS):
+			d.timeNext = INFINITY
+
+		# routing tables of the ports (used to dispatch the messages)
+		compileRoutes(d)
+
+		# {\tt _receive} is the function which receives the messages sent to
+		# {\tt d} (called as {\tt d._receive(d, msg)}).
+		if not WITH_BOUND_DISPATCH:
+			d._receive = Sender.dispatch
+		elif isinstance(d, CoupledDEVS):
+			d._receive = CoupledSolver().receive
+		else:
+			d._receive = AtomicSolver.receive
+
 		if isinstance(d, CoupledDEVS):
-			# {\tt eventList} is the list of pairs $(tn_d,\,d)$, where $d$ is a
+			# {\tt eventList} is the heap of pairs $(tn_d,\,d)$, where $d$ is a
 			# reference to a sub-model of the coupled-DEVS and $tn_d$ is $d$'s
-			# time of next event.
+			# time of next event (built by the $(i,\,t)$ message).
+			d.eventList = None
 			for subd in d.componentSet:
 				self.__augment(subd)
 
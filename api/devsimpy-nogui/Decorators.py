@@ -70,21 +70,26 @@ def hotshotit(func):
 		### if profiling check-box is checked in the simulationDialog
 		if prof:
 			
-			### name of .prof file
-			label = sim_thread.model.getBlockModel().label
-			now = datetime.now() # current date and time
-			date_time = now.strftime('%m-%d-%Y_%H-%M-%S')
-			prof_name = os.path.join(gettempdir(),"%s_%s_%s%s"%(func.__name__, label, date_time ,'.prof'))
+			### name of .prof file (given by devsimpy-nogui -profile or in the temp dir)
+			if isinstance(prof, str):
+				prof_name = prof
+			else:
+				label = sim_thread.model.getBlockModel().label
+				now = datetime.now() # current date and time
+				date_time = now.strftime('%m-%d-%Y_%H-%M-%S')
+				prof_name = os.path.join(gettempdir(),"%s_%s_%s%s"%(func.__name__, label, date_time ,'.prof'))
 
 			### profiling section with cProfile
 			pr = cProfile.Profile()
 			pr.enable()
-			r = func(*args, **kw)
-			pr.disable()
-			#Sort the statistics by the cumulative time spent in the function
-			sortby = 'cumulative'
-			ps = pstats.Stats(pr).sort_stats(sortby)
-			ps.dump_stats(prof_name)
+			try:
+				r = func(*args, **kw)
+			finally:
+				pr.disable()
+				#Sort the statistics by the cumulative time spent in the function
+				sortby = 'cumulative'
+				ps = pstats.Stats(pr).sort_stats(sortby)
+				ps.dump_stats(prof_name)
 
 		else:
 			r = func(*args, **kw)
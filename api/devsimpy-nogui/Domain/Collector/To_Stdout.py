@@ -17,6 +17,8 @@ from DomainInterface.Object import Message
 
 import sys
 
+import ResultChannel
+
 ### Model class ----------------------------------------------------------------
 class To_Stdout(DomainBehavior):
 	''' DEVS Class for the model To_Stdout
@@ -49,7 +51,7 @@ class To_Stdout(DomainBehavior):
 				
 				if self.at_end:
 					self.buffer.append(v)
-				else:
+				elif not ResultChannel.send('output', label=self.name, tag=self.tag, value=v):
 					print(f"{self.tag}:{v}")
 
 		self.passivate()
@@ -74,5 +76,5 @@ class To_Stdout(DomainBehavior):
 	def finish(self, msg):
 		''' Additional function which is lunched just before the end of the simulation.
 		'''
-		if self.at_end:
+		if self.at_end and not ResultChannel.send('output', label=self.name, tag=self.tag, value=self.buffer):
 			print(f"{self.tag}: {self.buffer}")
@@ -10,7 +10,7 @@ class RandomGenerator(DomainBehavior):
     """
     """
 
-    def __init__(self, minValue=0, maxValue=10, minStep=1, maxStep=1, start=0, choice=[]):
+    def __init__(self, minValue=0, maxValue=10, minStep=1, maxStep=1, start=0, choice=[], seed=None):
         """ Constructor.
 
             @param minValue: minimum value
@@ -19,6 +19,7 @@ class RandomGenerator(DomainBehavior):
             @param maxStep: maximum step
 			@param start: time start
 			@param choice: list of items 
+            @param seed: seed of the random generator (None for a non-deterministic generator)
 
         """
         DomainBehavior.__init__(self)
@@ -28,6 +29,10 @@ class RandomGenerator(DomainBehavior):
         self.minStep = minStep
         self.maxStep = maxStep
         self.choice = choice
+        self.seed = seed
+
+        ### own generator to be reproducible when seeded (independently of the other models)
+        self.random = random.Random(seed)
 
         self.msg = Message(None, None)
 
@@ -36,12 +41,12 @@ class RandomGenerator(DomainBehavior):
     def outputFnc(self):
         """ lambda DEVS function
         """
-        numberMessage = random.randint(1, len(self.OPorts))  # Number message to send
-        portsToSend = random.sample(self.OPorts, numberMessage)  # The port with number message
+        numberMessage = self.random.randint(1, len(self.OPorts))  # Number message to send
+        portsToSend = self.random.sample(self.OPorts, numberMessage)  # The port with number message
 
         outputs = {}
         for port in portsToSend:
-            value = random.choice(self.choice) if self.choice else random.randint(self.minValue, self.maxValue)
+            value = self.random.choice(self.choice) if self.choice else self.random.randint(self.minValue, self.maxValue)
             self.msg.value = [value, 0.0, 0.0]
             self.msg.time = self.timeNext
             #adapted with PyPDEVS
@@ -54,9 +59,14 @@ class RandomGenerator(DomainBehavior):
     def intTransition(self):
         """ DEVS Transition function
         """
-        self.holdIn('START',random.randint(self.minStep, self.maxStep))
+        self.holdIn('START',self.random.randint(self.minStep, self.maxStep))
         return self.getState()
 
+    def isDeterministic(self):
+        """ Deterministic only if seeded
+        """
+        return self.seed not in (None, '')
+
     def __str__(self):
         """ str function
         """
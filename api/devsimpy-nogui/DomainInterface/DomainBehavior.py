@@ -43,6 +43,8 @@ path = builtins.__dict__['DEVS_DIR_PATH_DICT'][builtins.__dict__['DEFAULT_DEVS_D
 d = re.split("DEVSKernel", path)[-1].replace(os.sep, '.')
 BaseDEVS = importlib.import_module("DEVSKernel%s.DEVS"%d)
 
+from DomainInterface.Object import getMessageMode, readMessage, writeMessage
+
 # ### import the DEVS module depending on the selected DEVS package in DEVSKernel directory
 # for pydevs_dir in builtins.__dict__['DEVS_DIR_PATH_DICT']:
 #     if pydevs_dir == builtins.__dict__['DEFAULT_DEVS_DIRNAME']:
@@ -65,6 +67,9 @@ class DomainBehavior(BaseDEVS.AtomicDEVS):
 	
 	__slots__ = ('state')
 
+	### message mode of the model ('copy', 'frozen' or 'debug', see Object.py), None for the global MESSAGE_MODE
+	message_mode = None
+
 	###
 	def __init__(self, name:str=""):
 		"""	Constructor.
@@ -77,8 +82,9 @@ class DomainBehavior(BaseDEVS.AtomicDEVS):
 		### if BaseDEVS AtomicDEVS class has the peek method, we have the PyDEVS simulator kernel
 		### else its the PyPDEVS simulator kernel and we adapt the peek and poke method for compatibility aspects 
 		if hasattr(BaseDEVS.AtomicDEVS, 'peek'):
-			DomainBehavior.peek = BaseDEVS.AtomicDEVS.peek
-			DomainBehavior.poke = BaseDEVS.AtomicDEVS.poke
+			DomainBehavior.peek = DomainBehavior.peekPyDEVS
+			DomainBehavior.peek_all = DomainBehavior.peek_allPyDEVS
+			DomainBehavior.poke = DomainBehavior.pokePyDEVS
 			DomainBehavior.getMsgValue = DomainBehavior.getMsgPyDEVSValue
 			DomainBehavior.getMsgTime = DomainBehavior.getMsgPyDEVSTime
 			DomainBehavior.getPortId = DomainBehavior.getPortIdFromPyDEVS
@@ -118,6 +124,20 @@ class DomainBehavior(BaseDEVS.AtomicDEVS):
 
 		return self.state
 
+	###
+	def pokePyDEVS(self, p, v)->None:
+		### the message is frozen in the 'frozen' and 'debug' message modes
+		self.myOutput[p] = writeMessage(v, getMessageMode(self))
+
+	def peekPyDEVS(self, p, *args):
+		### deep copy of the message in the 'copy' message mode, the (frozen) message else
+		value = self.myInput.get(p, None)
+		return readMessage(value, getMessageMode(self), self, p) if value else value
+
+	def peek_allPyDEVS(self)->list:
+		mode = getMessageMode(self)
+		return [(p, readMessage(m, mode, self, p)) for p,m in list(self.myInput.items())]
+
 	###
 	def pokePyPDEVS(self, p, v)->dict:
 		### adapted with PyPDEVS
@@ -156,6 +176,12 @@ class DomainBehavior(BaseDEVS.AtomicDEVS):
 	def getFlatComponentSet(self):
 		return {self.name:self}
 
+	def isDeterministic(self)->bool:
+		''' Return False if two simulations of the model with the same args can give different results (random without seed...).
+			Overridden by the non-deterministic models (the results of their simulations are not cached).
+		'''
+		return True
+
 	def getSigma(self)->float:
 		return self.state['sigma']
 
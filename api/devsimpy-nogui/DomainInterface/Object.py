@@ -12,8 +12,162 @@
 #
 #  GENERAL NOTES AND REMARKS:
 #
+#  Message modes (MESSAGE_MODE builtin or message_mode attribute of a model):
+#	- 'copy' (default): peek returns a deep copy of the message.
+#	- 'frozen': messages are frozen (see FrozenMessage) when they are poked and
+#	  peek returns them without copy. A model that wants to modify a message
+#	  works on the mutable copy given by its thaw method (copy-on-write).
+#	- 'debug': 'frozen' mode where a digest of each frozen message is checked
+#	  at each peek to detect the mutation of a shared message.
+#
 ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
 
+import builtins
+import copy
+import hashlib
+import pickle
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+MESSAGE_MODES = ('copy', 'frozen', 'debug')
+
+### immutable types returned as is by freeze
+IMMUTABLE_TYPES = (type(None), bool, int, float, complex, str, bytes, frozenset, range)
+
+class MessageMutationError(Exception):
+	""" A frozen message has been modified after its freeze.
+	"""
+	pass
+
+class FrozenList(tuple):
+	""" Read-only list (frozen list of a message).
+	"""
+	pass
+
+class FrozenDict(dict):
+	""" Read-only dict (frozen dict of a message).
+	"""
+
+	def _readonly(self, *args, **kwargs):
+		raise TypeError("'FrozenDict' object is read-only (use thaw to get a mutable copy)")
+
+	__setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readonly
+
+	def __hash__(self):
+		return hash(frozenset(self.items()))
+
+	def __reduce__(self):
+		return (FrozenDict, (dict(self),))
+
+def freeze(value):
+	""" Return a read-only version of the value.
+		A numpy array which owns its data is given as a read-only view (without copy). A view of a
+		writeable buffer (like the slice of a Population.members field) is copied once: the sender
+		goes on writing in its buffer after the poke.
+	"""
+	if isinstance(value, IMMUTABLE_TYPES):
+		return value
+	elif isinstance(value, Message):
+		return value.freeze()
+	elif numpy is not None and isinstance(value, numpy.ndarray):
+		if not value.flags.writeable:
+			return value
+		### the buffer of a view is owned (and modified) by the sender
+		view = value.copy() if value.base is not None else value.view()
+		view.flags.writeable = False
+		return view
+	elif isinstance(value, (FrozenList, FrozenDict)):
+		return value
+	elif isinstance(value, list):
+		return FrozenList(freeze(v) for v in value)
+	elif isinstance(value, tuple):
+		frozen = tuple(freeze(v) for v in value)
+		return value if all(a is b for a,b in zip(frozen, value)) else frozen
+	elif isinstance(value, dict):
+		return FrozenDict((k, freeze(v)) for k,v in value.items())
+	elif isinstance(value, set):
+		return frozenset(value)
+	else:
+		### objects which can not be made read-only are copied once
+		return copy.deepcopy(value)
+
+def thaw(value):
+	""" Return a mutable copy of the frozen value.
+	"""
+	if isinstance(value, IMMUTABLE_TYPES):
+		return value
+	elif isinstance(value, FrozenMessage):
+		return value.thaw()
+	elif numpy is not None and isinstance(value, numpy.ndarray):
+		return value.copy()
+	elif isinstance(value, FrozenList):
+		return [thaw(v) for v in value]
+	elif isinstance(value, tuple):
+		return tuple(thaw(v) for v in value)
+	elif isinstance(value, FrozenDict):
+		return {k: thaw(v) for k,v in value.items()}
+	else:
+		return copy.deepcopy(value)
+
+def digest(value)->bytes:
+	""" Digest of the content of the value (used by the 'debug' mode).
+	"""
+	h = hashlib.blake2b(digest_size=16)
+	def update(v):
+		if numpy is not None and isinstance(v, numpy.ndarray):
+			h.update(repr((v.dtype, v.shape)).encode())
+			h.update(numpy.ascontiguousarray(v).tobytes())
+		elif isinstance(v, (tuple, list)):
+			h.update(b'[')
+			for a in v: update(a)
+			h.update(b']')
+		elif isinstance(v, dict):
+			h.update(b'{')
+			for k,a in v.items():
+				update(k)
+				update(a)
+			h.update(b'}')
+		else:
+			try:
+				h.update(pickle.dumps(v))
+			except Exception:
+				h.update(repr(v).encode())
+	update(value)
+	return h.digest()
+
+def getMessageMode(model)->str:
+	""" Return the message mode of the model (its message_mode attribute or the global MESSAGE_MODE).
+	"""
+	return getattr(model, 'message_mode', None) or builtins.__dict__.get('MESSAGE_MODE', 'copy')
+
+def writeMessage(msg, mode:str):
+	""" Return the message to poke depending on the message mode of the sender.
+	"""
+	if mode == 'copy':
+		return msg
+
+	msg = freeze(msg)
+	if mode == 'debug' and isinstance(msg, FrozenMessage):
+		### digest of the message when it is sent
+		msg.check()
+	return msg
+
+def readMessage(msg, mode:str, model=None, port=None):
+	""" Return the message to peek depending on the message mode of the receiver.
+	"""
+	if mode == 'copy':
+		### a frozen message gives a mutable copy (see FrozenMessage.__deepcopy__)
+		return copy.deepcopy(msg)
+	elif isinstance(msg, FrozenMessage):
+		if mode == 'debug':
+			msg.check(model, port)
+		return msg
+	else:
+		return freeze(msg)
+
 class Message:
 	'''	The class Message provide the activation of all DEVS components.
 
@@ -44,6 +198,66 @@ class Message:
 			@rtype: str
 		'''
 		return "<< value = %s; time = %s>>"%(self.value, self.time)
-	
+
+	###
+	def freeze(self):
+		'''	Return the frozen version of the message (see FrozenMessage).
+		'''
+		return FrozenMessage(self.value, self.time, self.name)
+
+class FrozenMessage(Message):
+	'''	Immutable message.
+
+		The value is frozen (see freeze) when the message is made, so the message
+		can be shared by all its receivers without copy. The thaw method gives a
+		mutable copy (copy-on-write).
+	'''
+
+	###
+	def __init__(self, v = None, t = None, name = ""):
+		'''	Constructor method.
+
+			@param v: Value of the transaction
+			@param t : simulation time
+			@param name : name of the message
+		'''
+		object.__setattr__(self, 'value', freeze(v))
+		object.__setattr__(self, 'time', t)
+		object.__setattr__(self, 'name', name)
+		object.__setattr__(self, '_digest', None)
+
+	def __setattr__(self, name, value):
+		raise AttributeError("'FrozenMessage' object is read-only (use thaw to get a mutable copy)")
+
+	__delattr__ = __setattr__
+
+	def __deepcopy__(self, memo):
+		return self.thaw()
+
+	def __reduce__(self):
+		return (FrozenMessage, (self.value, self.time, self.name))
+
+	###
+	def freeze(self):
+		return self
+
+	###
+	def thaw(self):
+		'''	Return a mutable copy of the message.
+		'''
+		msg = Message(thaw(self.value), self.time)
+		msg.name = self.name
+		return msg
+
+	###
+	def check(self, model=None, port=None):
+		'''	Raise MessageMutationError if the value has been modified since the first check.
+		'''
+		d = digest(self.value)
+		if self._digest is None:
+			object.__setattr__(self, '_digest', d)
+		elif d != self._digest:
+			raise MessageMutationError("Shared message %s modified before its reading by %s (port %s)"%(self, model, port))
+
 if __name__ == "__main__":
 	pass
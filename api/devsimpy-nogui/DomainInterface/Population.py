@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
+# Population.py --- Population of homogeneous atomic models
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
+#
+# GENERAL NOTES AND REMARKS:
+#
+# A Population is one atomic model for the kernel (one component in the event
+# lists of all the strategies) that holds the states of N identical members
+# (agents) in the fields of a NumPy structured array (one row by member).
+# The fields of the state of a member are declared by the FIELDS class
+# attribute of the subclass, the 'sigma' (time advance), 'tl' (time of the
+# last transition) and 'tn' (time of the next one) fields are added.
+#
+# The transitions of the members are vectorized: the subclass overrides
+#
+#	- memberOutputFnc(idx): outputs of the imminent members idx (see
+#	  pokeMembers),
+#	- memberIntTransition(idx): internal transition of the imminent members,
+#	- memberExtTransition(idx, port, values, e): external transition of the
+#	  members idx that receive the values on the port (e is the array of
+#	  their elapsed times),
+#	- memberTimeAdvance(idx): time advance of the members (their 'sigma'
+#	  field by default),
+#
+# where idx is the array of the indexes of the members of the transition.
+# The internal transition of the population is the one of all the members due
+# at its time. The messages are routed to individual members: a message on an
+# input port is [idx, values] (the values of the members idx, as sent by
+# pokeMembers) unless the route method is overridden.
+#
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
+#
+#  GLOBAL VARIABLES AND FUNCTIONS
+#
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
+
+import numpy
+
+from DomainInterface.DomainBehavior import DomainBehavior
+from DomainInterface.Object import Message
+
+### fields of the state of the members added to the FIELDS of the populations
+TIME_FIELDS = [('sigma', 'f8'), ('tl', 'f8'), ('tn', 'f8')]
+
+#    ======================================================================    #
+class Population(DomainBehavior):
+	""" Atomic model of a population of homogeneous members with vectorized transitions.
+	"""
+
+	### fields (name, dtype) of the state of a member
+	FIELDS = []
+
+	###
+	def __init__(self, size:int=0, name:str=""):
+		"""	Constructor.
+		"""
+
+		DomainBehavior.__init__(self, name=name)
+
+		self.size = size
+		self.members = numpy.zeros(size, dtype=TIME_FIELDS + list(self.FIELDS))
+		self.members['sigma'] = INFINITY
+		self.members['tn'] = INFINITY
+
+		### time of the next imminent members (None before the scheduling of the members, see timeAdvance)
+		self.next = None
+
+		self.initPhase('ACTIVE', INFINITY)
+
+	###
+	def holdMembersIn(self, idx, sigma)->None:
+		""" Set the time advance of the members idx (array or scalar sigma).
+		"""
+		self.members['sigma'][idx] = sigma
+
+	def passivateMembers(self, idx)->None:
+		self.holdMembersIn(idx, INFINITY)
+
+	def getImminents(self)->numpy.ndarray:
+		""" Indexes of the members due at the time of the next internal transition of the population.
+		"""
+		if self.next in (None, INFINITY):
+			return numpy.empty(0, dtype=numpy.intp)
+		return numpy.flatnonzero(self.members['tn'] == self.next)
+
+	def pokeMembers(self, p, idx, values)->None:
+		""" Send the values (one by member idx) on the output port p.
+		"""
+		self.poke(p, Message([idx, values], self.timeNext))
+
+	def route(self, p, msg)->tuple:
+		""" Return the indexes of the receivers and their values of the message received on the input port p.
+		"""
+		idx, values = self.getMsgValue(msg)[:2]
+		return numpy.atleast_1d(idx), values
+
+	### vectorized functions of the members (to be overridden)
+	def memberOutputFnc(self, idx)->None:
+		pass
+
+	def memberIntTransition(self, idx)->None:
+		self.passivateMembers(idx)
+
+	def memberExtTransition(self, idx, p, values, e)->None:
+		pass
+
+	def memberTimeAdvance(self, idx)->numpy.ndarray:
+		return self.members['sigma'][idx]
+
+	###
+	def schedule(self, idx, t:float)->None:
+		""" Update the times of the members idx after their transition at t.
+		"""
+		self.members['tl'][idx] = t
+		self.members['tn'][idx] = t + self.memberTimeAdvance(idx)
+
+	###
+	def outputFnc(self):
+		self.memberOutputFnc(self.getImminents())
+
+	def intTransition(self):
+		t = self.timeLast + self.elapsed
+		idx = self.getImminents()
+		self.memberIntTransition(idx)
+		self.schedule(idx, t)
+
+	def extTransition(self, *args):
+		t = self.timeLast + self.elapsed
+		for p in self.IPorts:
+			msg = self.peek(p, *args)
+			if msg:
+				idx, values = self.route(p, msg)
+				self.memberExtTransition(idx, p, values, t - self.members['tl'][idx])
+				self.schedule(idx, t)
+
+	def timeAdvance(self):
+		""" Time until the next imminent members.
+		"""
+		### the time of the transition is already the time of the last event
+		t = self.timeLast
+		if self.next is None:
+			self.schedule(numpy.arange(self.size), t)
+		self.next = float(self.members['tn'].min()) if self.size else INFINITY
+		self.holdIn(self.getStatus(), max(self.next - t, 0.0))
+		return self.getSigma()
@@ -1,7 +1,8 @@
 __all__ = [	"MasterModel",
 					"DomainBehavior",
 					"DomainStructure",
-					"Object"
+					"Object",
+					"Population"
 			]
 
 from DomainInterface.DomainBehavior import *
@@ -108,6 +108,34 @@ class YAMLHandler:
                 'old_args':old_args, 
                 'new_args':new_args}
 
+    def overrideYAMLBlockModelArgs(self, overrides):
+        """ Changes in memory (the YAML file is not saved) the values of the parameters
+            of the blocks given by overrides ({<label>:{<arg>:<val>}}).
+            Returns the overridden block parameters (raises ValueError if a block or a parameter does not exist).
+        """
+
+        if self.filename_is_valid != True: return False
+
+        models_list = self.getYAMLBlockModelsList()
+
+        overridden = {}
+        for label, new_args in overrides.items():
+            if label not in models_list:
+                raise ValueError(f"ERROR: Model {label} must belong to the list {models_list}\n")
+
+            ### DEVS block
+            block = self.diagram.GetShapeByLabel(label)
+
+            ### update only existing args
+            for arg in new_args:
+                if arg not in block.args:
+                    raise ValueError(f"ERROR: Parameter {arg} of {label} must belong to the list {list(block.args)}\n")
+                block.args[arg] = to_Python(new_args[arg])
+
+            overridden[label] = self.getYAMLBlockModelArgs(label)
+
+        return overridden
+
     def getJSON(self, diagram=None):
         """ Make JSON representation of the model from YAML file.
         """
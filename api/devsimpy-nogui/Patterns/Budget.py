@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
+# Budget.py --- Budgets of a simulation
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
+#
+# GENERAL NOTES AND REMARKS:
+#
+# The main loops of the simulation strategies call Budget.step at each event
+# (simulation step of the root coordinator). The number of events, the
+# simulation time and the wall clock time are compared at each call while the
+# resident memory (read from /proc) is evaluated every CHECK_PERIOD events only.
+#
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
+
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
+#
+# GLOBAL VARIABLES AND FUNCTIONS
+#
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
+
+import os
+import time
+
+try:
+	import resource
+except ImportError:
+	resource = None
+
+### number of events between two evaluations of the resident memory
+CHECK_PERIOD = 256
+
+def getRSS()->float:
+	""" Get the resident memory of the process (in MB).
+	"""
+	try:
+		with open('/proc/self/statm') as f:
+			return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1048576.0
+	except (OSError, ValueError, IndexError):
+		### max resident memory (in KB on Linux) if /proc is not available
+		return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0 if resource else 0.0
+
+class Budget:
+	""" Budgets (max wall clock time, number of events, simulation time and resident memory) of a simulation.
+	"""
+
+	### termination reasons
+	MAX_WALL = 'max_wall'
+	MAX_EVENTS = 'max_events'
+	MAX_TIME = 'max_time'
+	MAX_RSS = 'max_rss'
+
+	def __init__(self, max_wall:float=None, max_events:int=None, max_time:float=None, max_rss:float=None):
+		""" Constructor.
+
+			@param max_wall: max wall clock time (in s)
+			@param max_events: max number of events
+			@param max_time: max simulation time
+			@param max_rss: max resident memory (in MB)
+		"""
+		self.max_wall = max_wall
+		self.max_events = max_events
+		self.max_time = max_time
+		self.max_rss = max_rss
+
+		self.events = 0
+		self._next_check = CHECK_PERIOD
+		self._deadline = None
+
+	def start(self)->None:
+		""" Start the wall clock of the simulation.
+		"""
+		self.events = 0
+		self._next_check = CHECK_PERIOD
+		self._deadline = time.monotonic() + self.max_wall if self.max_wall is not None else None
+
+	def step(self, clock:float, events:int=1)->str:
+		""" Count the events (one by default) processed up to the simulation time clock.
+			Return the termination reason if a budget is exceeded (None otherwise).
+		"""
+		self.events += events
+
+		if self.max_events is not None and self.events > self.max_events:
+			return Budget.MAX_EVENTS
+
+		if self.max_time is not None and clock > self.max_time:
+			return Budget.MAX_TIME
+
+		if self._deadline is not None and time.monotonic() > self._deadline:
+			return Budget.MAX_WALL
+
+		if self.max_rss is not None and self.events >= self._next_check:
+			self._next_check = self.events + CHECK_PERIOD
+			if getRSS() > self.max_rss:
+				return Budget.MAX_RSS
+
+		return None
+
+	def isEmpty(self)->bool:
+		""" Return True if no budget is defined.
+		"""
+		return all(b is None for b in (self.max_wall, self.max_events, self.max_time, self.max_rss))
+
+	def toDict(self)->dict:
+		return {'max_wall': self.max_wall, 'max_events': self.max_events, 'max_time': self.max_time, 'max_rss': self.max_rss, 'events': self.events}
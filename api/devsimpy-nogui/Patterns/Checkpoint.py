@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
+# Checkpoint.py --- Checkpoints of a simulation
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
+#
+# GENERAL NOTES AND REMARKS:
+#
+# The main loops of the simulation strategies call Checkpoint.step at each
+# event (between two steps, when all the transitions of the previous step
+# are done). The state of the simulation is saved every CHECKPOINT_PERIOD
+# seconds (wall clock), once when the simulation time reaches the 'at' time
+# and when the simulation is stopped (cancelled or exceeded budget).
+#
+# The state of the simulation is the state of the atomic models: all the
+# attributes that are not a part of their structure (see STRUCTURE_ATTRS
+# of ParallelStrategy.py), so their state, timeLast, timeNext, elapsed and
+# the buffers of the collectors. The attributes that can not be pickled
+# (open files, sockets...) are skipped. A checkpoint file is
+#
+#	CHECKPOINT_MAGIC + version (2 bytes) + zlib(pickle(content))
+#
+# and it is written in a temporary file renamed at the end (a crash during
+# a save does not corrupt the previous checkpoint).
+#
+# The resumed simulation rebuilds the same model (and strategy): the saved
+# attributes are restored, the event lists of the kernel are rebuilt and the
+# simulation goes on from the time of the checkpoint. The attributes whose
+# initial value (digest saved in the checkpoint) differs in the resumed
+# simulation keep their new value: a parameter sweep can start all its
+# simulations from the checkpoint of their common prefix (the changed
+# parameters must not have been used before the checkpoint).
+#
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
+
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
+#
+# GLOBAL VARIABLES AND FUNCTIONS
+#
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
+
+import os
+import time
+import zlib
+import pickle
+import struct
+import hashlib
+
+from DEVSKernel.PyDEVS.DEVS import CoupledDEVS
+from DEVSKernel.PyDEVS.simulator import EventList
+from Patterns.ParallelStrategy import getStateNames
+
+CHECKPOINT_MAGIC = b'DEVSCKPT'
+CHECKPOINT_VERSION = 1
+### default period (in s) between two checkpoints
+CHECKPOINT_PERIOD = 60.0
+### zlib compression level of the checkpoints
+CHECKPOINT_LEVEL = 6
+### strategies whose main loop saves and resumes the checkpoints (not the partitions of the conservative and optimistic ones)
+CHECKPOINT_STRATEGIES = ('original', 'bag-based', 'direct-coupling', 'multiprocess')
+
+class CheckpointError(Exception):
+	""" The checkpoint can not be read or does not match the simulated model.
+	"""
+	pass
+
+def getAtomicModels(model)->list:
+	""" Atomic models of the model (depth-first order of the component sets).
+	"""
+	L = []
+	for m in model.componentSet:
+		if isinstance(m, CoupledDEVS):
+			L.extend(getAtomicModels(m))
+		else:
+			L.append(m)
+	return L
+
+def getCoupledModels(model)->list:
+	""" Coupled models of the model (children first).
+	"""
+	L = []
+	for m in model.componentSet:
+		if isinstance(m, CoupledDEVS):
+			L.extend(getCoupledModels(m))
+	L.append(model)
+	return L
+
+def digest(data:bytes)->bytes:
+	return hashlib.blake2b(data, digest_size=8).digest()
+
+def dumpModel(m)->tuple:
+	""" Pickles of the attributes of the model and names of the attributes that can not be pickled.
+	"""
+	state = {}
+	skipped = []
+	for name in getStateNames(m):
+		try:
+			state[name] = pickle.dumps(getattr(m, name), pickle.HIGHEST_PROTOCOL)
+		except Exception:
+			skipped.append(name)
+	return state, skipped
+
+def fingerprint(models:list)->list:
+	return [(m.name, type(m).__name__) for m in models]
+
+def write(path:str, content:dict)->int:
+	""" Write the checkpoint file and return its size.
+	"""
+	data = CHECKPOINT_MAGIC + struct.pack('>H', CHECKPOINT_VERSION) + zlib.compress(pickle.dumps(content, pickle.HIGHEST_PROTOCOL), CHECKPOINT_LEVEL)
+	tmp = path + '.tmp'
+	with open(tmp, 'wb') as f:
+		f.write(data)
+	os.replace(tmp, path)
+	return len(data)
+
+def read(path:str)->dict:
+	""" Read the checkpoint file.
+	"""
+	try:
+		with open(path, 'rb') as f:
+			data = f.read()
+	except OSError as info:
+		raise CheckpointError(f"checkpoint {path} can not be read: {info}")
+
+	n = len(CHECKPOINT_MAGIC)
+	if data[:n] != CHECKPOINT_MAGIC:
+		raise CheckpointError(f"{path} is not a checkpoint")
+	version, = struct.unpack('>H', data[n:n+2])
+	if version != CHECKPOINT_VERSION:
+		raise CheckpointError(f"checkpoint version {version} of {path} is not supported (version {CHECKPOINT_VERSION} expected)")
+
+	return pickle.loads(zlib.decompress(data[n+2:]))
+
+class Checkpoint:
+	""" Checkpoints of a simulation (periodic save and resume).
+	"""
+
+	def __init__(self, path:str=None, period:float=None, at:float=None, resume:str=None):
+		""" Constructor.
+
+			@param path: checkpoint file to write (no save if None)
+			@param period: period of the saves (in s of wall clock, CHECKPOINT_PERIOD if neither period nor at is given)
+			@param at: simulation time of a save
+			@param resume: checkpoint file of the resumed simulation
+		"""
+		self.path = path
+		self.period = period if period is not None or at is not None else CHECKPOINT_PERIOD
+		self.at = at
+		self.resume = resume
+
+		self.saves = 0
+		self.size = 0
+		self.time = None
+		self.resumed_time = None
+		self.kept = []
+		self.skipped = []
+
+		self.strategy = None
+		self.models = []
+		self.initial = []
+		self._next_save = None
+
+	def start(self, simulator)->None:
+		""" Keep the digests of the initial values of the attributes of the atomic models, restore the resumed checkpoint if any
+			and start the wall clock of the periodic saves.
+		"""
+		self.strategy = simulator.strategy
+		self.models = getAtomicModels(simulator.getMaster())
+		self.initial = [dict((name, digest(v)) for name, v in dumpModel(m)[0].items()) for m in self.models]
+
+		if self.resume:
+			self.restore(simulator)
+
+		self._next_save = time.monotonic() + self.period if self.period is not None else None
+
+	def step(self, clock:float)->None:
+		""" Save the simulation if a checkpoint is due before the step at the simulation time clock.
+		"""
+		if self.path is None:
+			return
+
+		if self.at is not None and clock >= self.at:
+			self.at = None
+			self.save(clock)
+		elif self._next_save is not None and time.monotonic() >= self._next_save:
+			self.save(clock)
+
+	def save(self, clock:float=None)->None:
+		""" Save the state of the models (before the step at clock, the next event time of the models by default).
+		"""
+		if clock is None:
+			clock = min((m.myTimeAdvance for m in self.models), default=INFINITY)
+
+		states = []
+		skipped = set()
+		for m in self.models:
+			state, names = dumpModel(m)
+			states.append(state)
+			skipped.update("%s.%s"%(m.name, name) for name in names)
+
+		content = {'version': CHECKPOINT_VERSION, 'time': clock, 'strategy': self.strategy, 'date': time.time(),
+					'models': fingerprint(self.models), 'initial': self.initial, 'states': states}
+
+		self.size = write(self.path, content)
+		self.saves += 1
+		self.time = clock
+		self.skipped = sorted(skipped)
+		if self.period is not None:
+			self._next_save = time.monotonic() + self.period
+
+	def restore(self, simulator)->float:
+		""" Restore the state of the models from the resumed checkpoint, rebuild the event lists and return the time of the checkpoint.
+		"""
+		content = read(self.resume)
+		models = self.models
+
+		if content['strategy'] != simulator.strategy:
+			raise CheckpointError(f"checkpoint of the {content['strategy']} strategy resumed with the {simulator.strategy} strategy")
+		if content['models'] != fingerprint(models):
+			raise CheckpointError("checkpoint of another model")
+
+		for m, state, initial, new in zip(models, content['states'], content['initial'], self.initial):
+			for name, value in state.items():
+				### parameter changed since the checkpoint (sweep from a common prefix)
+				if name in new and initial.get(name) != new[name]:
+					self.kept.append("%s.%s"%(m.name, name))
+					continue
+				setattr(m, name, pickle.loads(value))
+
+		### atomic models with a finite timeNext (see DEVSKernel/PyDEVS/simulator.py)
+		simulator.activity.active = sum(1 for m in models if m.timeNext != INFINITY)
+		rebuildEventLists(simulator.getMaster())
+
+		self.resumed_time = content['time']
+		return self.resumed_time
+
+	def toDict(self)->dict:
+		return {'path': self.path, 'saves': self.saves, 'size': self.size, 'time': self.time, 'resumed_from': self.resume,
+				'resumed_time': self.resumed_time, 'kept': self.kept, 'skipped': self.skipped}
+
+def rebuildEventLists(model)->None:
+	""" Rebuild the event lists of the coupled models after the restore of the atomic models
+		(only the master with the flat list of the atomic models for the direct-coupling strategies).
+	"""
+	for c in getCoupledModels(model):
+		c.timeLast = max((d.timeLast for d in c.componentSet), default=0)
+		c.eventList = EventList(c.componentSet)
+		c.myTimeAdvance = c.eventList.min()
+		c.immChildren = c.eventList.imminent()
@@ -36,10 +36,12 @@ import traceback
 from pubsub import pub
 
 from Utilities import playSound, NotificationMessage
+from PluginManager import PluginManager
 from Patterns.Strategy import *
+from Patterns.ParallelStrategy import SimStrategy6, SimStrategy7, SimStrategy8
 from Decorators import hotshotit
 
-def simulator_factory(model, strategy, prof, ntl, verbose, dynamic_structure_flag, real_time_flag):
+def simulator_factory(model, strategy, prof, ntl, verbose, dynamic_structure_flag, real_time_flag, budget=None, checkpoint=None, profiler=None):
 	""" Preventing direct creation for Simulator
         disallow direct access to the classes
 	"""
@@ -92,7 +94,7 @@ def simulator_factory(model, strategy, prof, ntl, verbose, dynamic_structure_fla
 			Thread for DEVS simulation task.
 		"""
 
-		def __init__(self, model=None, strategy='', prof=False, ntl=False, verbose=False, dynamic_structure_flag=False, real_time_flag=False):
+		def __init__(self, model=None, strategy='', prof=False, ntl=False, verbose=False, dynamic_structure_flag=False, real_time_flag=False, budget=None, checkpoint=None, profiler=None):
 			""" Constructor.
 			"""
 			threading.Thread.__init__(self)
@@ -105,10 +107,23 @@ def simulator_factory(model, strategy, prof, ntl, verbose, dynamic_structure_fla
 			self.verbose = verbose
 			self.dynamic_structure_flag = dynamic_structure_flag
 			self.real_time_flag = real_time_flag
+			### budgets checked by the strategy main loops (see Patterns/Budget.py)
+			self.budget = budget
+			### checkpoints saved and resumed by the strategy main loops (see Patterns/Checkpoint.py)
+			self.checkpoint = checkpoint
+			### calls and times of the functions of the atomic models (see Patterns/Profiler.py)
+			self.profiler = profiler
 
 			#self.deamon = True
 
 			self.end_flag = False
+			### cooperative stop (see stop and cancel) and finish() hooks called once
+			self.cancelled = False
+			self.termination_reason = None
+			self.finished = False
+			### a stop requested (by another thread) once the termination has started is ignored
+			self.terminating = False
+			self._stop_lock = threading.RLock()
 			self.thread_suspend = False
 			self.sleep_time = 0.0
 			self.thread_sleep = False
@@ -131,6 +146,13 @@ def simulator_factory(model, strategy, prof, ntl, verbose, dynamic_structure_fla
 
 			self.setAlgorithm(cls_str(*(), **args))
 
+			### plug-ins of the simulation events called by the kernel (see PluginManager.Hooks)
+			PluginManager.bind_hooks()
+
+			### the functions of the atomic models are wrapped once the strategy has bound their poke and peek
+			if self.profiler:
+				self.profiler.attach(self.model.getFlatComponentSet().values())
+
 			while not self.end_flag:
 				### traceback exception engine for .py file
 				try:
@@ -144,7 +166,11 @@ def simulator_factory(model, strategy, prof, ntl, verbose, dynamic_structure_fla
 				param msg: message to submit
 			"""
 
-			if not self.end_flag:
+			### the completed simulation can not be cancelled any more (see stop)
+			with self._stop_lock:
+				self.terminating = True
+
+			if not self.end_flag or (self.termination_reason and not self.finished):
 				if error:
 
 					###for traceback
@@ -166,6 +192,10 @@ def simulator_factory(model, strategy, prof, ntl, verbose, dynamic_structure_fla
 						### error sound
 						wx.CallAfter(playSound, SIMULATION_ERROR_SOUND_PATH)
 				else:
+					### the stopped simulation (cancelled or exceeded budget) can be resumed from its last state
+					if self.checkpoint and self.checkpoint.path and self.checkpoint.models and self.termination_reason:
+						self.checkpoint.save()
+
 					for m in [a for a in list(self.model.getFlatComponentSet().values()) if hasattr(a, 'finish')]:
 						### call finished method
 						if builtins.__dict__.get('GUI_FLAG',True):
@@ -188,6 +218,28 @@ def simulator_factory(model, strategy, prof, ntl, verbose, dynamic_structure_fla
 						wx.CallAfter(playSound, SIMULATION_SUCCESS_SOUND_PATH)
 
 			self.end_flag = True
+			self.finished = True
+
+		def stop(self, reason):
+			""" Stop the simulation at the end of the current step for the reason (cancelled, max_wall...).
+				The finish() hooks of the models are called (by terminate) as for a normal end.
+				Return False if the simulation is already stopped or terminating (the request is ignored).
+			"""
+			with self._stop_lock:
+				if self.end_flag or self.terminating:
+					return False
+				self.termination_reason = reason
+				self.thread_suspend = False
+				self.thread_sleep = False
+				self.end_flag = True
+				return True
+
+		def cancel(self):
+			""" Cancel the simulation (see stop).
+			"""
+			with self._stop_lock:
+				if self.stop('cancelled'):
+					self.cancelled = True
 			
 		def set_sleep(self, sleeptime):
 			""" Set the sleep.
@@ -209,4 +261,4 @@ def simulator_factory(model, strategy, prof, ntl, verbose, dynamic_structure_fla
 			"""
 			self.thread_suspend = False
 
-	return SimulationThread(model, strategy, prof, ntl, verbose, dynamic_structure_flag, real_time_flag)
\ No newline at end of file
+	return SimulationThread(model, strategy, prof, ntl, verbose, dynamic_structure_flag, real_time_flag, budget, checkpoint, profiler)
\ No newline at end of file
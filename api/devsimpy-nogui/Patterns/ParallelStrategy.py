@@ -0,0 +1,1222 @@
+# -*- coding: utf-8 -*-
+
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
+# ParallelStrategy.py --- Multiprocess and parallel strategies
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
+#
+# GENERAL NOTES AND REMARKS:
+#
+# The threads of parallel_ext_transtion_manager (and WITH_PARALLEL_EXECUTION)
+# are serialized by the GIL. The 'multiprocess' strategy (SimStrategy6) is the
+# direct-coupling one (SimStrategy3) where the transitions of the CPU-heavy
+# atomic models are sent to a persistent pool of processes:
+#
+#	- the first PARALLEL_WARMUP_STEPS steps are serial and measure the cost
+#	  of the transitions of each model (the nested external transitions
+#	  triggered by its outputs excluded),
+#	- the models with a mean cost of at least PARALLEL_MIN_COST (and a state
+#	  that can be pickled) are assigned to the workers (longest first). The
+#	  workers are forked so that they hold resident replicas of the models,
+#	- the round trip time of the pool is measured and the pool is stopped
+#	  (serial simulation) if the estimated gain on the warm-up steps is lower
+#	  than PARALLEL_MIN_GAIN.
+#
+# At each step, the internal transitions of the offloaded imminent models that
+# receive no message from the previous imminent models of the step are
+# computed at the same time by the workers while the master executes the
+# other models in the order of their priority. Only the inputs, the outputs
+# and the deltas of the states (attributes whose pickle has changed) are
+# exchanged: the master applies the deltas to its copy of the models and
+# replays their outputs (and then the external transitions of the receivers)
+# in the order of the priorities, so that the results are those of the
+# direct-coupling strategy. The other transitions of the offloaded models are
+# executed (one at a time) by the worker that holds their replica.
+#
+# An atomic model can declare the attributes of its state with a
+# PARALLEL_STATE tuple (all the attributes that are not a part of the
+# structure of the model otherwise).
+#
+# The 'conservative' strategy (SimStrategy7) partitions the flat model (the
+# couplings of the direct-coupling strategy) in CONSERVATIVE_PARTITIONS parts
+# simulated by forked workers with their own event list. An atomic model can
+# declare its LOOKAHEAD (0.0 by default): after an input at t, its next
+# internal transition is not before t + LOOKAHEAD (or its timeNext if it is
+# earlier). With T the next time of the simulation, no message can cross the
+# parts before the end of the window
+#
+#	E = min(timeNext, T + LOOKAHEAD) of the models coupled to the other parts
+#
+# so that the parts simulate the events before E at the same time. If E = T,
+# the imminent models of all the parts execute a coordinated step in the
+# order of their priority where the messages of the other parts are
+# delivered before the next transitions of their receivers. The results are
+# those of the direct-coupling strategy and the state of the models is sent
+# back to the master at the end of the simulation.
+#
+# The 'optimistic' strategy (SimStrategy8) is the Time Warp version of the
+# conservative one (no lookahead). Each logical process (worker) executes up
+# to TIMEWARP_MAX_STEPS steps of its part on the messages received so far,
+# and saves the state of its models every TIMEWARP_SAVE_PERIOD steps. A
+# message in its past (straggler) rolls it back to the last saved state
+# before the message; the messages sent by the undone steps are cancelled by
+# anti-messages if they are not sent again (lazy cancellation). The master
+# routes the messages between the rounds and computes the GVT (min of the
+# next steps and of the messages in transit): the states and the messages
+# before the GVT are forgotten (fossil collection). The transitions must
+# have no side effect outside the state of the models since they can be
+# executed again after a rollback.
+#
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
+
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
+#
+# GLOBAL VARIABLES AND FUNCTIONS
+#
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
+
+import os
+import time
+import heapq
+import bisect
+import pickle
+import hashlib
+import traceback
+import multiprocessing
+
+from PluginManager import PluginManager, Hooks
+from DEVSKernel.PyDEVS.simulator import updateActivity
+from Patterns.Strategy import SimStrategy3, execIntTransition, execExtTransition, reschedule
+
+### the tunables below are read from the environment variables of the same name (the simulation process inherits
+### the environment of the worker)
+
+### number of (serial) steps used to measure the cost of the transitions
+PARALLEL_WARMUP_STEPS = int(os.environ.get("PARALLEL_WARMUP_STEPS", 20))
+### min mean cost (in s) of the transitions of a model sent to the pool
+PARALLEL_MIN_COST = float(os.environ.get("PARALLEL_MIN_COST", 0.001))
+### min ratio between the serial and the parallel estimated durations of the warm-up steps to keep the pool
+PARALLEL_MIN_GAIN = float(os.environ.get("PARALLEL_MIN_GAIN", 1.2))
+### number of processes of the pool (None for the number of cores - 1)
+PARALLEL_WORKERS = int(os.environ["PARALLEL_WORKERS"]) if os.environ.get("PARALLEL_WORKERS") else None
+### time (in s) given to a worker to stop
+PARALLEL_STOP_TIMEOUT = float(os.environ.get("PARALLEL_STOP_TIMEOUT", 5.0))
+
+### number of partitions of the conservative strategy (None for the number of cores)
+CONSERVATIVE_PARTITIONS = int(os.environ["CONSERVATIVE_PARTITIONS"]) if os.environ.get("CONSERVATIVE_PARTITIONS") else None
+### max number of steps of a partition in a window (the budgets and the cancellation are checked between the windows)
+CONSERVATIVE_MAX_WINDOW_STEPS = int(os.environ.get("CONSERVATIVE_MAX_WINDOW_STEPS", 10000))
+
+### max number of (speculative) steps of a logical process between two GVT computations of the optimistic strategy
+TIMEWARP_MAX_STEPS = int(os.environ.get("TIMEWARP_MAX_STEPS", 1000))
+### number of steps between two state savings of a logical process
+TIMEWARP_SAVE_PERIOD = int(os.environ.get("TIMEWARP_SAVE_PERIOD", 8))
+
+### attributes of the atomic models that are not a part of their state
+STRUCTURE_ATTRS = frozenset(('parent', 'myID', 'name', 'IPorts', 'OPorts', 'myInput', 'myOutput', 'activity',
+							'_receive', 'poke', 'peek', 'peek_all', 'priority', 'ts', 'blockModel', 'eventList',
+							'outputFnc', 'intTransition', 'extTransition', 'timeAdvance'))
+
+def getStateNames(m)->tuple:
+	""" Names of the attributes of the state of the atomic model m.
+	"""
+	names = getattr(m, 'PARALLEL_STATE', None)
+	if names is None:
+		names = [n for n in m.__dict__ if n not in STRUCTURE_ATTRS]
+		for cls in type(m).__mro__:
+			slots = getattr(cls, '__slots__', ())
+			names.extend(n for n in ((slots,) if isinstance(slots, str) else slots) if hasattr(m, n) and n not in names)
+	return tuple(names)
+
+def dumpState(m, names:tuple)->dict:
+	""" Pickles of the attributes of the state of m (PicklingError if one of them can not be pickled).
+	"""
+	return dict((n, pickle.dumps(getattr(m, n), pickle.HIGHEST_PROTOCOL)) for n in names if hasattr(m, n))
+
+def getReceivers(m)->set:
+	""" Atomic models that receive the outputs of m (see WeakValue.AddHosts).
+	"""
+	return set(h[1] for p in m.OPorts if hasattr(p, 'weak') for h in p.weak.GetHosts())
+
+def serveReplicas(conn, models:dict)->None:
+	""" Loop of a worker of the pool on its resident replicas (models forked with the master, by index).
+
+		Requests: ('int', ts, [index...]), ('ext', ts, index, [(port index, value)...]), ('ping',) and ('stop',).
+		Responses: ('ok', result) or ('error', traceback).
+	"""
+	### plugins are triggered by the master only
+	PluginManager.disabled_event.extend(list(PluginManager.plugins))
+	PluginManager.bind_hooks()
+
+	outputs = []
+	def capture(p, v):
+		outputs.append((p.host.OPorts.index(p), v))
+
+	names = {}
+	digests = {}
+	for i, m in models.items():
+		m.poke = capture
+		### the event list of the flat models is the one of the master
+		m.ts.eventList = None
+		names[i] = getStateNames(m)
+		digests[i] = dict((n, hashlib.blake2b(b, digest_size=16).digest()) for n, b in dumpState(m, names[i]).items())
+
+	def transition(i, ts, fct):
+		""" Apply the transition and return the outputs and the delta of the state of the model i.
+		"""
+		m = models[i]
+		del outputs[:]
+		m.ts.Set(ts)
+		fct(m)
+
+		delta = {}
+		for n, b in dumpState(m, names[i]).items():
+			d = hashlib.blake2b(b, digest_size=16).digest()
+			if digests[i].get(n) != d:
+				digests[i][n] = d
+				delta[n] = b
+		return (i, list(outputs), delta)
+
+	while True:
+		try:
+			request = conn.recv()
+		except EOFError:
+			break
+
+		try:
+			if request[0] == 'int':
+				response = [transition(i, request[1], execIntTransition) for i in request[2]]
+			elif request[0] == 'ext':
+				m = models[request[2]]
+				for k, v in request[3]:
+					m.IPorts[k].weak.SetValue(v)
+				try:
+					response = transition(request[2], request[1], execExtTransition)
+				finally:
+					for k, v in request[3]:
+						m.IPorts[k].weak.SetValue(None)
+			elif request[0] == 'ping':
+				response = None
+			else:
+				break
+			conn.send(('ok', response))
+		except Exception:
+			conn.send(('error', traceback.format_exc()))
+
+	conn.close()
+
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
+#
+# CLASS DEFINITION
+#
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
+
+class ParallelError(Exception):
+	""" Error of a transition executed by a worker of the pool.
+	"""
+	pass
+
+class SimStrategy6(SimStrategy3):
+	""" Strategy for DEVSimPy direct-coupled simulation with the transitions of the CPU-heavy models in a process pool.
+	"""
+
+	def __init__(self, simulator=None):
+		""" Constructor.
+		"""
+		SimStrategy3.__init__(self, simulator)
+
+		### index of the models in the flat priority list (same in the replicas)
+		self.index = dict((m, i) for i, m in enumerate(self.flat_priority_list))
+		self.receivers = dict((m, getReceivers(m)) for m in self.flat_priority_list)
+
+		### cost (in s) and number of the measured transitions by model, imminent models (and cost) of the warm-up steps
+		self.cost = dict.fromkeys(self.flat_priority_list, 0.0)
+		self.count = dict.fromkeys(self.flat_priority_list, 0)
+		self.steps = []
+		self._nested = []
+		self._step = []
+		self.warmup = PARALLEL_WARMUP_STEPS
+
+		### pool (one process and one pipe by worker), worker of the offloaded models, results of the pending batches
+		self.processes = []
+		self.conns = []
+		self.worker = {}
+		self.pending = set()
+		self.results = {}
+
+		self.stats = {'strategy': 'multiprocess', 'mode': 'warm-up', 'workers': 0, 'offloaded': [], 'rtt': None,
+						'estimated_gain': None, 'remote_int': 0, 'remote_ext': 0, 'batches': 0}
+
+		self.setExtTransitions(self.timedExtTransition)
+
+	def simulate(self, T = 100000000):
+		""" Simulate for T (the pool is stopped at the end).
+		"""
+		try:
+			SimStrategy3.simulate(self, T)
+		finally:
+			self.stopPool()
+
+	###
+	def setExtTransitions(self, fct, models=None):
+		""" Set the external transition function fct of the models (all if None) in the hosts of the ports.
+		"""
+		for m in self.flat_priority_list:
+			for p in m.OPorts:
+				if hasattr(p, 'weak'):
+					hosts = p.weak.GetHosts()
+					hosts[:] = [(a, h, fct if models is None or h in models else f) for a, h, f in hosts]
+
+	def measure(self, fct, m)->None:
+		""" Apply the transition fct of m and add its duration (nested transitions excluded) to the cost of m.
+		"""
+		self._nested.append(0.0)
+		t = time.perf_counter()
+		try:
+			fct(m)
+		finally:
+			dt = time.perf_counter() - t
+			own = dt - self._nested.pop()
+			if self._nested:
+				self._nested[-1] += dt
+			self.cost[m] += own
+			self.count[m] += 1
+			self._step.append((m, own, fct is execExtTransition))
+
+	def timedExtTransition(self, m):
+		self.measure(execExtTransition, m)
+
+	###
+	def execImminents(self, priority_scheduler):
+		""" Apply the transitions of the imminent models (see the general notes).
+		"""
+		if self.warmup:
+			self._step = []
+			while(priority_scheduler):
+				priority, model, transition_fct = heapq.heappop(priority_scheduler)
+				self.measure(transition_fct, model)
+			self.steps.append(self._step)
+
+			self.warmup -= 1
+			if not self.warmup:
+				self.setExtTransitions(execExtTransition)
+				self.startPool()
+
+		elif not self.conns:
+			SimStrategy3.execImminents(self, priority_scheduler)
+
+		else:
+			imminents = [heapq.heappop(priority_scheduler)[1] for i in range(len(priority_scheduler))]
+			ts = self.ts.Get()
+
+			### offloaded models that do not receive a message from the previous imminent models of the step
+			batches = {}
+			receivers = set()
+			for m in imminents:
+				if m in self.worker and m not in receivers:
+					batches.setdefault(self.worker[m], []).append(self.index[m])
+				receivers |= self.receivers[m]
+
+			for w, batch in batches.items():
+				self.conns[w].send(('int', ts, batch))
+				self.pending.add(w)
+			self.stats['batches'] += len(batches)
+
+			for m in imminents:
+				if m in self.worker:
+					i = self.index[m]
+					w = self.worker[m]
+					while i not in self.results and w in self.pending:
+						self.receive(w)
+					result = self.results.pop(i, None) or self.call(w, ('int', ts, [i]))[0]
+					self.apply(m, result, execIntTransition)
+				else:
+					execIntTransition(m)
+
+	def remoteExtTransition(self, m):
+		""" External transition of the offloaded model m (with the values of its input ports).
+		"""
+		inputs = [(k, p.weak.GetValue()) for k, p in enumerate(m.IPorts) if p.weak.GetValue() is not None]
+		self.apply(m, self.call(self.worker[m], ('ext', self.ts.Get(), self.index[m], inputs)), execExtTransition)
+
+	def apply(self, m, result:tuple, fct)->None:
+		""" Replay the outputs and apply the delta of the state of the transition fct of m computed by a worker.
+		"""
+		i, outputs, delta = result
+		for k, v in outputs:
+			m.poke(m.OPorts[k], v)
+
+		active = m.timeNext != INFINITY
+		for n, b in delta.items():
+			setattr(m, n, pickle.loads(b))
+		if (m.timeNext != INFINITY) != active: updateActivity(m)
+		reschedule(m)
+
+		internal = fct is execIntTransition
+		self.stats['remote_int' if internal else 'remote_ext'] += 1
+
+		# The SIM_VERBOSE event occurs
+		for f in Hooks.SIM_VERBOSE: f(model=m, msg=0 if internal else 1)
+		for f in Hooks.SIM_BLINK: f(model=m, msg=[1] if internal else [{}])
+		for f in Hooks.SIM_TEST: f(model=m, msg=[1] if internal else [{}])
+
+	###
+	def receive(self, w:int):
+		""" Receive the next response of the worker w (the results of its pending batch are stored).
+		"""
+		status, response = self.conns[w].recv()
+		if status != 'ok':
+			raise ParallelError(response)
+
+		if w in self.pending:
+			self.pending.discard(w)
+			self.results.update((r[0], r) for r in response)
+			return None
+		return response
+
+	def call(self, w:int, request:tuple):
+		""" Send the request to the worker w and wait for its response.
+		"""
+		self.conns[w].send(request)
+		while w in self.pending:
+			self.receive(w)
+		return self.receive(w)
+
+	###
+	def startPool(self)->None:
+		""" Choose the offloaded models and start the pool if the estimated gain is high enough (see the general notes).
+		"""
+		workers = PARALLEL_WORKERS or (os.cpu_count() or 1) - 1
+
+		candidates = []
+		for m in self.flat_priority_list:
+			if self.count[m] and self.cost[m]/self.count[m] >= PARALLEL_MIN_COST and m not in self.receivers[m]:
+				try:
+					dumpState(m, getStateNames(m))
+				except Exception:
+					continue
+				candidates.append(m)
+
+		if workers < 1 or not candidates or 'fork' not in multiprocessing.get_all_start_methods():
+			self.stats['mode'] = 'serial'
+			return
+
+		### longest processing time first
+		load = [0.0]*min(workers, len(candidates))
+		assignment = [{} for w in load]
+		for m in sorted(candidates, key=lambda a: -self.cost[a]):
+			w = load.index(min(load))
+			load[w] += self.cost[m]
+			assignment[w][self.index[m]] = m
+
+		ctx = multiprocessing.get_context('fork')
+		try:
+			for models in assignment:
+				conn, child_conn = ctx.Pipe()
+				process = ctx.Process(target=serveReplicas, args=(child_conn, models), daemon=True)
+				process.start()
+				child_conn.close()
+				self.processes.append(process)
+				self.conns.append(conn)
+				for m in models.values():
+					self.worker[m] = len(self.conns)-1
+
+			### round trip time of the pool
+			t = time.perf_counter()
+			for w in range(len(self.conns)):
+				self.call(w, ('ping',))
+			rtt = (time.perf_counter() - t)/len(self.conns)
+		except (OSError, AssertionError, EOFError):
+			### no child process (daemonic process...)
+			self.stopPool()
+			self.stats['mode'] = 'serial'
+			return
+
+		serial, parallel = self.estimate(rtt)
+		self.stats.update(workers=len(self.conns), rtt=rtt, estimated_gain=serial/parallel if parallel else None)
+
+		if not parallel or serial < PARALLEL_MIN_GAIN*parallel:
+			self.stopPool()
+			self.stats['mode'] = 'serial'
+		else:
+			self.setExtTransitions(self.remoteExtTransition, self.worker)
+			self.stats.update(mode='pool', offloaded=[m.name for m in self.worker])
+
+	def estimate(self, rtt:float)->tuple:
+		""" Estimated serial and parallel durations of the warm-up steps with the offloaded models.
+		"""
+		serial = parallel = 0.0
+		for step in self.steps:
+			local = 0.0
+			load = [0.0]*len(self.conns)
+			for m, cost, external in step:
+				serial += cost
+				if m not in self.worker:
+					local += cost
+				elif external:
+					### the external transitions of the offloaded models are executed one at a time
+					local += cost + rtt
+				else:
+					load[self.worker[m]] += cost
+			### the batches of the workers overlap the local transitions
+			parallel += max(local, max(load) + rtt) if any(load) else local
+		return serial, parallel
+
+	def stopPool(self)->None:
+		""" Stop the workers of the pool.
+		"""
+		for conn in self.conns:
+			try:
+				conn.send(('stop',))
+				conn.close()
+			except OSError:
+				pass
+
+		for process in self.processes:
+			process.join(PARALLEL_STOP_TIMEOUT)
+			if process.is_alive():
+				process.terminate()
+
+		self.processes = []
+		self.conns = []
+		self.worker = {}
+		self.pending = set()
+		self.results = {}
+
+###--------------------------------------------------------------------Conservative
+
+def partitionModels(models:list, k:int, master=None)->list:
+	""" Partition of the flat priority list of models in k parts (lists of indexes) of about the same size.
+
+		The units of the partition are the coupled models of the master (their sub-models if they are bigger than a
+		part). The parts are grown from the first free unit by adding the free unit that has the most couplings
+		(see getReceivers) with the part, so that the couplings between the parts are few.
+	"""
+	size = -(-len(models)//k)
+
+	### ancestors of the models from the child of the master
+	paths = []
+	for m in models:
+		path = [m]
+		while getattr(path[0], 'parent', None) not in (None, master):
+			path.insert(0, path[0].parent)
+		paths.append(path)
+
+	depth = [0]*len(models)
+	while True:
+		units = {}
+		for i, path in enumerate(paths):
+			units.setdefault(path[min(depth[i], len(path)-1)], []).append(i)
+		big = [u for u in units.values() if len(u) > size and any(depth[i] < len(paths[i])-1 for i in u)]
+		if not big:
+			break
+		for u in big:
+			for i in u:
+				depth[i] += 1
+
+	units = sorted(units.values())
+	unit = {}
+	for u, indexes in enumerate(units):
+		for i in indexes:
+			unit[i] = u
+
+	index = dict((m, i) for i, m in enumerate(models))
+	links = [{} for u in units]
+	for i, m in enumerate(models):
+		for r in getReceivers(m):
+			if r in index and unit[index[r]] != unit[i]:
+				a, b = unit[i], unit[index[r]]
+				links[a][b] = links[a].get(b, 0) + 1
+				links[b][a] = links[b].get(a, 0) + 1
+
+	part = [None]*len(units)
+	parts = []
+	free = 0
+	for p in range(k):
+		parts.append([])
+		grown = {}
+		heap = []
+		while len(parts[p]) < size:
+			while heap and part[heap[0][1]] is not None:
+				heapq.heappop(heap)
+			if heap:
+				u = heapq.heappop(heap)[1]
+			else:
+				### seed of the part (or of a disconnected piece of the part)
+				while free < len(units) and part[free] is not None:
+					free += 1
+				if free == len(units):
+					break
+				u = free
+			part[u] = p
+			parts[p].extend(units[u])
+			for v, n in links[u].items():
+				if part[v] is None:
+					grown[v] = grown.get(v, 0) + n
+					heapq.heappush(heap, (-grown[v], v))
+
+	### units left by the last part
+	for u in range(len(units)):
+		if part[u] is None:
+			parts[-1].extend(units[u])
+
+	return [sorted(a) for a in parts if a]
+
+def servePartition(conn, models:list, indexes:list)->None:
+	""" Loop of a worker that simulates the part (indexes in the flat priority list) of the forked models.
+
+		Requests: ('status',), ('window', end, final, max_steps), ('step', t, [(index, [(port index, value)...])...], [index...]) and ('stop',).
+		Responses: ('ok', result) or ('error', traceback). The result of the stop request is the state of the models of the part.
+	"""
+	### plugins are triggered by the master only
+	PluginManager.disabled_event.extend(list(PluginManager.plugins))
+	PluginManager.bind_hooks()
+
+	index = dict((m, i) for i, m in enumerate(models))
+	local = [models[i] for i in indexes]
+	part = set(indexes)
+	clock = local[0].ts
+
+	### external transitions of the models of the other parts are sent to the master (they are forbidden in a window)
+	outbox = []
+	window = [False]
+	def send(m):
+		if window[0]:
+			raise ParallelError("The lookahead of the models coupled to %s is violated at %s"%(m.name, clock.Get()))
+		outbox.append((index[m], [(k, p.weak.GetValue()) for k, p in enumerate(m.IPorts) if p.weak.GetValue() is not None]))
+
+	boundary = []
+	for m in local:
+		for p in m.OPorts:
+			if hasattr(p, 'weak'):
+				hosts = p.weak.GetHosts()
+				hosts[:] = [(a, h, f if index[h] in part else send) for a, h, f in hosts]
+				if any(index[h] not in part for a, h, f in hosts) and m not in boundary:
+					boundary.append(m)
+
+	def status():
+		""" Next time of the part, its imminent models, next time of its boundary models and number of its active models.
+		"""
+		t = min(m.myTimeAdvance for m in local)
+		imminents = [index[m] for m in local if m.myTimeAdvance == t] if t != INFINITY else []
+		return (t, imminents, min((m.myTimeAdvance for m in boundary), default=INFINITY), sum(1 for m in local if m.timeNext != INFINITY))
+
+	def deliver(exts):
+		for i, inputs in exts:
+			m = models[i]
+			for k, v in inputs:
+				m.IPorts[k].weak.SetValue(v)
+			try:
+				execExtTransition(m)
+			finally:
+				for k, v in inputs:
+					m.IPorts[k].weak.SetValue(None)
+
+	while True:
+		try:
+			request = conn.recv()
+		except EOFError:
+			break
+
+		try:
+			if request[0] == 'window':
+				### steps of the part before the end of the window (where no message of another part can arrive)
+				end, final, max_steps = request[1:]
+				steps = 0
+				window[0] = True
+				try:
+					while steps < max_steps:
+						t = min(m.myTimeAdvance for m in local)
+						if not (t < end and t <= final):
+							break
+						clock.Set(t)
+						for m in [m for m in local if m.myTimeAdvance == t]:
+							execIntTransition(m)
+						steps += 1
+				finally:
+					window[0] = False
+				response = (steps, status())
+			elif request[0] == 'step':
+				### part of a coordinated step (external transitions of the messages of the other parts first)
+				del outbox[:]
+				clock.Set(request[1])
+				deliver(request[2])
+				for i in request[3]:
+					execIntTransition(models[i])
+				response = (list(outbox), status())
+			elif request[0] == 'status':
+				response = status()
+			else:
+				conn.send(('ok', dict((i, dumpState(models[i], getStateNames(models[i]))) for i in indexes)))
+				break
+			conn.send(('ok', response))
+		except Exception:
+			conn.send(('error', traceback.format_exc()))
+
+	conn.close()
+
+class SimStrategy7(SimStrategy3):
+	""" Strategy for DEVSimPy conservative parallel simulation of the partitions of the flat model in a process pool.
+	"""
+
+	### loop of the workers
+	serve = staticmethod(servePartition)
+
+	def __init__(self, simulator=None):
+		""" Constructor.
+		"""
+		SimStrategy3.__init__(self, simulator)
+
+		models = self.flat_priority_list
+		k = min(CONSERVATIVE_PARTITIONS or os.cpu_count() or 1, len(models))
+		self.parts = partitionModels(models, k, self.master) if k > 1 else [list(range(len(models)))]
+		self.part = {}
+		for p, indexes in enumerate(self.parts):
+			for i in indexes:
+				self.part[i] = p
+
+		### min lookahead of the models of each part coupled to the other parts
+		self.lookahead = [INFINITY]*len(self.parts)
+		cut = 0
+		index = dict((m, i) for i, m in enumerate(models))
+		for i, m in enumerate(models):
+			remote = [r for r in getReceivers(m) if self.part[index[r]] != self.part[i]]
+			if remote:
+				cut += len(remote)
+				p = self.part[i]
+				self.lookahead[p] = min(self.lookahead[p], float(getattr(m, 'LOOKAHEAD', 0.0)))
+
+		self.processes = []
+		self.conns = []
+
+		self.stats = {'strategy': 'conservative', 'mode': 'pool' if len(self.parts) > 1 else 'serial', 'partitions': len(self.parts),
+						'sizes': [len(a) for a in self.parts], 'cut': cut, 'lookahead': list(self.lookahead),
+						'rounds': 0, 'windows': 0, 'coordinated_steps': 0, 'events': 0}
+
+	def simulate(self, T = 100000000):
+		""" Simulate for T.
+		"""
+		if len(self.parts) < 2 or 'fork' not in multiprocessing.get_all_start_methods():
+			self.stats['mode'] = 'serial'
+			return SimStrategy3.simulate(self, T)
+
+		try:
+			self.startPool()
+			self.simulatePartitions(T)
+		finally:
+			self.stopPool()
+
+		self._simulator.terminate()
+
+	def simulatePartitions(self, T):
+		""" Rounds of windows and coordinated steps of the partitions (see the general notes).
+		"""
+		### ref to cpu time evaluation
+		t_start = time.time()
+		old_cpu_time = 0
+
+		budget = self._simulator.budget
+		if budget: budget.start()
+
+		activity = self._simulator.activity
+		final = INFINITY if self._simulator.ntl else T
+
+		status = [self.call(p, ('status',)) for p in range(len(self.conns))]
+
+		while not self._simulator.end_flag:
+
+			clock = min(s[0] for s in status)
+			if clock == INFINITY or clock > final:
+				break
+
+			### just for progress bar
+			self.master.timeLast = clock
+			activity.active = sum(s[3] for s in status)
+
+			### Optional sleep
+			if self._simulator.thread_sleep:
+				time.sleep(self._simulator._sleeptime)
+
+			elif self._simulator.thread_suspend:
+			### Optional suspend
+				while self._simulator.thread_suspend:
+					time.sleep(1.0)
+					old_cpu_time = self._simulator.cpu_time
+					t_start = time.time()
+
+			else:
+				### The SIM_VERBOSE event occurs
+				for f in Hooks.SIM_VERBOSE: f(self.master, None, clock = clock)
+
+				### no message between the parts before the end of the window
+				end = min(min(s[2], clock + la) for s, la in zip(status, self.lookahead))
+
+				if end > clock:
+					for p, conn in enumerate(self.conns):
+						conn.send(('window', end, final, CONSERVATIVE_MAX_WINDOW_STEPS))
+					### all the responses are received before an error is raised
+					responses = [conn.recv() for conn in self.conns]
+					events = 0
+					for p, (state, response) in enumerate(responses):
+						if state != 'ok':
+							raise ParallelError(response)
+						steps, status[p] = response
+						events += steps
+					self.stats['windows'] += 1
+				else:
+					events = 1
+					self.coordinatedStep(clock, status)
+					self.stats['coordinated_steps'] += 1
+
+				self.stats['rounds'] += 1
+				self.stats['events'] += events
+
+				### budgets of the simulation
+				reason = budget.step(clock, events) if budget else None
+				if reason:
+					self._simulator.stop(reason)
+					break
+
+				self._simulator.cpu_time = old_cpu_time + (time.time()-t_start)
+
+		clock = min(s[0] for s in status)
+		if clock != INFINITY:
+			self.master.timeLast = clock
+
+	def coordinatedStep(self, clock:float, status:list)->None:
+		""" Step of the imminent models of all the parts in the order of their priority (the messages between the parts
+			are delivered before the next transitions of their receivers).
+		"""
+		imminents = sorted(i for s in status if s[0] == clock for i in s[1])
+		pending = [[] for p in self.conns]
+
+		segments = []
+		for i in imminents:
+			if segments and segments[-1][0] == self.part[i]:
+				segments[-1][1].append(i)
+			else:
+				segments.append((self.part[i], [i]))
+
+		while segments:
+			p, indexes = segments.pop(0)
+			outbox, status[p] = self.call(p, ('step', clock, pending[p], indexes))
+			pending[p] = []
+			for i, inputs in outbox:
+				pending[self.part[i]].append((i, inputs))
+			if not segments:
+				### external transitions of the last messages
+				segments = [(q, []) for q in range(len(self.conns)) if pending[q]]
+
+	###
+	def receive(self, p:int):
+		""" Receive the response of the worker of the part p.
+		"""
+		state, response = self.conns[p].recv()
+		if state != 'ok':
+			raise ParallelError(response)
+		return response
+
+	def call(self, p:int, request:tuple):
+		""" Send the request to the worker of the part p and wait for its response.
+		"""
+		self.conns[p].send(request)
+		return self.receive(p)
+
+	def startPool(self)->None:
+		""" Fork a worker by part.
+		"""
+		ctx = multiprocessing.get_context('fork')
+		for indexes in self.parts:
+			conn, child_conn = ctx.Pipe()
+			process = ctx.Process(target=self.serve, args=(child_conn, self.flat_priority_list, indexes), daemon=True)
+			process.start()
+			child_conn.close()
+			self.processes.append(process)
+			self.conns.append(conn)
+
+	def stopPool(self)->None:
+		""" Stop the workers and get the final state of the models of their parts (if the simulation has not failed).
+		"""
+		for p, conn in enumerate(self.conns):
+			try:
+				for i, state in self.call(p, ('stop',)).items():
+					m = self.flat_priority_list[i]
+					for n, b in state.items():
+						setattr(m, n, pickle.loads(b))
+			except (OSError, EOFError, ParallelError):
+				pass
+			finally:
+				conn.close()
+
+		if self.conns:
+			self._simulator.activity.active = sum(1 for m in self.flat_priority_list if m.timeNext != INFINITY)
+
+		for process in self.processes:
+			process.join(PARALLEL_STOP_TIMEOUT)
+			if process.is_alive():
+				process.terminate()
+
+		self.processes = []
+		self.conns = []
+
+###--------------------------------------------------------------------Optimistic
+
+def inputKey(message:tuple)->tuple:
+	""" Key (t, k, priority of the sender, sequence number) of a message of the optimistic strategy.
+	"""
+	return message[0]
+
+class LogicalProcess:
+	""" Logical process of the optimistic strategy: part of the forked models simulated speculatively.
+
+		A step of the simulation is keyed by (t, k): the k-th step at the time t (a model scheduled at t by a
+		transition of the step (t, k) is imminent in the step (t, k+1)). The messages of the other parts are keyed
+		by (t, k, priority of the sender, sequence number) so that their external transitions are executed in the
+		order of the direct-coupling strategy.
+	"""
+
+	def __init__(self, models:list, indexes:list):
+		""" Constructor.
+		"""
+		self.models = models
+		self.index = dict((m, i) for i, m in enumerate(models))
+		self.local = [models[i] for i in indexes]
+		self.clock = self.local[0].ts
+		part = set(indexes)
+
+		### step of the next internal transition of the models (see the class doc)
+		self.k = dict.fromkeys(self.local, 0)
+		### messages received (sorted by key), lower bound of the key of the next step
+		self.inputs = []
+		self.low = (-INFINITY, 0)
+		### states saved before some steps, messages sent by the executed steps and by the rolled back ones (lazy cancellation)
+		self.snapshots = []
+		self.sent = []
+		self.lazy = {}
+		self.executed = []
+		### time of the last step forgotten by the fossil collection
+		self.floor = -INFINITY
+		self.outbox = []
+		self.since_save = TIMEWARP_SAVE_PERIOD
+
+		self.stats = {'steps': 0, 'rolled_back': 0, 'rollbacks': 0, 'max_rollback': 0, 'messages': 0, 'anti_messages': 0, 'snapshots': 0}
+
+		### the transitions of the step and the messages to the other parts
+		self.touched = set()
+		self.step = None
+		self.sender = 0
+		self.seq = 0
+		for m in self.local:
+			for p in m.OPorts:
+				if hasattr(p, 'weak'):
+					hosts = p.weak.GetHosts()
+					hosts[:] = [(a, h, self.localExtTransition if self.index[h] in part else self.send) for a, h, f in hosts]
+
+	###
+	def localExtTransition(self, m):
+		""" External transition of m (model of the part).
+		"""
+		execExtTransition(m)
+		self.touched.add(m)
+
+	def send(self, m):
+		""" Send the values of the input ports of m (model of another part) in a message.
+		"""
+		key = self.step + (self.sender, self.seq)
+		self.seq += 1
+		payload = pickle.dumps([(k, p.weak.GetValue()) for k, p in enumerate(m.IPorts) if p.weak.GetValue() is not None], pickle.HIGHEST_PROTOCOL)
+		message = (key, self.index[m], payload)
+
+		### lazy cancellation: a message of a rolled back step that is sent again is not cancelled
+		old = self.lazy.pop(key + (message[1],), None)
+		if old != message:
+			if old is not None:
+				self.outbox.append(('anti', old))
+				self.stats['anti_messages'] += 1
+			self.outbox.append(('msg', message))
+			self.stats['messages'] += 1
+		self.sent.append(message)
+
+	###
+	def nextStep(self)->tuple:
+		""" Key of the next step (local internal transitions or messages not processed).
+		"""
+		step = min(((m.myTimeAdvance, self.k[m]) for m in self.local), default=(INFINITY, 0))
+		i = bisect.bisect_left(self.inputs, self.low, key=inputKey)
+		if i < len(self.inputs) and self.inputs[i][0][:2] < step:
+			step = self.inputs[i][0][:2]
+		return step
+
+	def execStep(self, step:tuple)->None:
+		""" Execute the step: internal transitions of the imminent models and external transitions of the messages in the order of the priorities.
+		"""
+		if self.since_save >= TIMEWARP_SAVE_PERIOD:
+			self.snapshots.append((step, dict((self.index[m], dumpState(m, getStateNames(m))) for m in self.local), dict(self.k)))
+			self.since_save = 0
+			self.stats['snapshots'] += 1
+
+		t, k = step
+		self.clock.Set(t)
+		self.step = step
+		self.touched = set()
+
+		events = [(self.index[m], 1, m) for m in self.local if m.myTimeAdvance == t and self.k[m] == k]
+		i = bisect.bisect_left(self.inputs, step, key=inputKey)
+		j = bisect.bisect_left(self.inputs, (t, k+1), key=inputKey)
+		events.extend((key[2], 0, (key, r, payload)) for key, r, payload in self.inputs[i:j])
+		events.sort(key=lambda e: e[:2] if e[1] else e[:2] + e[2][0][3:] + (e[2][1],))
+
+		for priority, internal, event in events:
+			self.sender = priority
+			self.seq = 0
+			if internal:
+				execIntTransition(event)
+				self.touched.add(event)
+			else:
+				m = self.models[event[1]]
+				inputs = pickle.loads(event[2])
+				for n, v in inputs:
+					m.IPorts[n].weak.SetValue(v)
+				try:
+					execExtTransition(m)
+				finally:
+					for n, v in inputs:
+						m.IPorts[n].weak.SetValue(None)
+				self.touched.add(m)
+
+		for m in self.touched:
+			self.k[m] = k+1 if m.myTimeAdvance == t else 0
+
+		self.low = (t, k+1)
+		self.executed.append(step)
+		self.since_save += 1
+		self.stats['steps'] += 1
+
+	def rollback(self, step:tuple)->None:
+		""" Restore the state before the step (latest saved state) and keep the messages sent since then for the lazy cancellation.
+		"""
+		if not self.snapshots:
+			### nothing executed since the initial state
+			self.low = min(self.low, step)
+			return
+
+		### the first saved state is the initial one if no state is saved before the step
+		i = len([s for s in self.snapshots if s[0] <= step])
+		snapshot = self.snapshots[max(i-1, 0)]
+		if i:
+			del self.snapshots[i:]
+			self.since_save = 0
+		else:
+			del self.snapshots[:]
+			self.since_save = TIMEWARP_SAVE_PERIOD
+
+		for n, state in snapshot[1].items():
+			m = self.models[n]
+			for a, b in state.items():
+				setattr(m, a, pickle.loads(b))
+		self.k = dict(snapshot[2])
+
+		start = min(snapshot[0], step)
+		n = len(self.executed)
+		self.executed = [s for s in self.executed if s < start]
+		undone = n - len(self.executed)
+		self.stats['rollbacks'] += 1
+		self.stats['rolled_back'] += undone
+		self.stats['max_rollback'] = max(self.stats['max_rollback'], undone)
+
+		for message in [a for a in self.sent if a[0][:2] >= start]:
+			self.lazy[message[0] + (message[1],)] = message
+		self.sent = [a for a in self.sent if a[0][:2] < start]
+
+		self.low = start
+
+	def receive(self, kind:str, message:tuple)->None:
+		""" Insert the message (or annihilate it with its anti-message) and roll back if it is in the past of the part.
+		"""
+		if message[0][:2] < self.low:
+			self.rollback(message[0][:2])
+
+		i = bisect.bisect_left(self.inputs, message)
+		if kind == 'msg':
+			self.inputs.insert(i, message)
+		elif i < len(self.inputs) and self.inputs[i] == message:
+			del self.inputs[i]
+
+	def fossilCollection(self, gvt:tuple)->None:
+		""" Forget the states, the messages and the steps that can no longer be rolled back (before the gvt).
+		"""
+		i = len([s for s in self.snapshots if s[0] <= gvt])
+		if i > 1:
+			del self.snapshots[:i-1]
+		if self.snapshots:
+			start = min(self.snapshots[0][0], gvt)
+			self.inputs = self.inputs[bisect.bisect_left(self.inputs, start, key=inputKey):]
+			self.sent = [a for a in self.sent if a[0][:2] >= start]
+			i = bisect.bisect_left(self.executed, start)
+			if i:
+				self.floor = self.executed[i-1][0]
+				del self.executed[:i]
+
+	def run(self, inbox:list, gvt:tuple, max_steps:int, final:float)->tuple:
+		""" Receive the messages and execute at most max_steps steps before final.
+			Return the messages sent, the key of the next step, the time of the last step, the number of active models and the stats.
+		"""
+		self.fossilCollection(gvt)
+		self.outbox = []
+		for kind, message in inbox:
+			self.receive(kind, message)
+
+		for n in range(max_steps):
+			step = self.nextStep()
+			if step[0] == INFINITY or step[0] > final:
+				break
+			self.execStep(step)
+
+		### messages of the rolled back steps that have not been sent again (the next step is after them)
+		step = self.nextStep()
+		for key, message in list(self.lazy.items()):
+			if message[0][:2] < step:
+				del self.lazy[key]
+				self.outbox.append(('anti', message))
+				self.stats['anti_messages'] += 1
+
+		last = self.executed[-1][0] if self.executed else self.floor
+		return (self.outbox, step, last, sum(1 for m in self.local if m.timeNext != INFINITY), dict(self.stats))
+
+def serveLogicalProcess(conn, models:list, indexes:list)->None:
+	""" Loop of a worker that simulates the logical process of the part (indexes in the flat priority list) of the forked models.
+
+		Requests: ('run', inbox, gvt, max_steps, final) (see LogicalProcess.run) and ('stop',).
+		Responses: ('ok', result) or ('error', traceback). The result of the stop request is the state of the models of the part.
+	"""
+	### plugins are triggered by the master only
+	PluginManager.disabled_event.extend(list(PluginManager.plugins))
+	PluginManager.bind_hooks()
+
+	lp = LogicalProcess(models, indexes)
+
+	while True:
+		try:
+			request = conn.recv()
+		except EOFError:
+			break
+
+		try:
+			if request[0] == 'run':
+				response = lp.run(*request[1:])
+			else:
+				conn.send(('ok', dict((i, dumpState(models[i], getStateNames(models[i]))) for i in indexes)))
+				break
+			conn.send(('ok', response))
+		except Exception:
+			conn.send(('error', traceback.format_exc()))
+
+	conn.close()
+
+class SimStrategy8(SimStrategy7):
+	""" Strategy for DEVSimPy optimistic (Time Warp) parallel simulation of the partitions of the flat model in a process pool.
+	"""
+
+	### loop of the workers
+	serve = staticmethod(serveLogicalProcess)
+
+	def __init__(self, simulator=None):
+		""" Constructor.
+		"""
+		SimStrategy7.__init__(self, simulator)
+
+		self.stats = {'strategy': 'optimistic', 'mode': 'pool' if len(self.parts) > 1 else 'serial', 'partitions': len(self.parts),
+						'sizes': [len(a) for a in self.parts], 'cut': self.stats['cut'], 'gvt_rounds': 0,
+						'events_processed': 0, 'events_committed': 0, 'efficiency': None, 'rollbacks': 0, 'rolled_back_events': 0,
+						'max_rollback': 0, 'messages': 0, 'anti_messages': 0, 'snapshots': 0, 'by_partition': []}
+
+	def simulatePartitions(self, T):
+		""" GVT rounds: the logical processes run ahead on their messages, the master routes the new ones and computes the GVT.
+		"""
+		### ref to cpu time evaluation
+		t_start = time.time()
+		old_cpu_time = 0
+
+		budget = self._simulator.budget
+		if budget: budget.start()
+
+		activity = self._simulator.activity
+		final = INFINITY if self._simulator.ntl else T
+
+		inboxes = [[] for p in self.conns]
+		gvt = (-INFINITY, 0)
+		clock = -INFINITY
+		processed = 0
+
+		while not self._simulator.end_flag:
+
+			### Optional sleep
+			if self._simulator.thread_sleep:
+				time.sleep(self._simulator._sleeptime)
+
+			elif self._simulator.thread_suspend:
+			### Optional suspend
+				while self._simulator.thread_suspend:
+					time.sleep(1.0)
+					old_cpu_time = self._simulator.cpu_time
+					t_start = time.time()
+
+			else:
+				for p, conn in enumerate(self.conns):
+					conn.send(('run', inboxes[p], gvt, TIMEWARP_MAX_STEPS, final))
+
+				### all the responses are received before an error is raised
+				responses = [conn.recv() for conn in self.conns]
+				for state, response in responses:
+					if state != 'ok':
+						raise ParallelError(response)
+
+				inboxes = [[] for p in self.conns]
+				lvt = []
+				### the last steps of the previous rounds can have been rolled back since
+				clock = -INFINITY
+				for outbox, step, last, active, stats in (r[1] for r in responses):
+					lvt.append(step)
+					clock = max(clock, last)
+					for kind, message in outbox:
+						inboxes[self.part[message[1]]].append((kind, message))
+
+				### global virtual time: min of the next steps and of the messages in transit
+				gvt = min(lvt + [message[0][:2] for inbox in inboxes for kind, message in inbox])
+				self.stats['gvt_rounds'] += 1
+				self.updateStats([r[1][4] for r in responses])
+
+				### just for progress bar
+				if gvt[0] != INFINITY:
+					self.master.timeLast = gvt[0]
+				activity.active = sum(r[1][3] for r in responses)
+
+				### budgets of the simulation
+				events = self.stats['events_processed'] - processed
+				processed = self.stats['events_processed']
+				reason = budget.step(min(gvt[0], final), events) if budget else None
+				if reason:
+					self._simulator.stop(reason)
+					break
+
+				self._simulator.cpu_time = old_cpu_time + (time.time()-t_start)
+
+				if gvt[0] == INFINITY or gvt[0] > final:
+					break
+
+		### time of the last step (of the next one after the final time)
+		if gvt[0] != INFINITY:
+			self.master.timeLast = gvt[0]
+		elif clock != -INFINITY:
+			self.master.timeLast = clock
+
+	def updateStats(self, by_partition:list)->None:
+		""" Rollback statistics of the logical processes.
+		"""
+		self.stats['by_partition'] = by_partition
+		for name in ('rollbacks', 'messages', 'anti_messages', 'snapshots'):
+			self.stats[name] = sum(s[name] for s in by_partition)
+		self.stats['events_processed'] = sum(s['steps'] for s in by_partition)
+		self.stats['rolled_back_events'] = sum(s['rolled_back'] for s in by_partition)
+		self.stats['events_committed'] = self.stats['events_processed'] - self.stats['rolled_back_events']
+		self.stats['max_rollback'] = max(s['max_rollback'] for s in by_partition)
+		self.stats['efficiency'] = self.stats['events_committed']/self.stats['events_processed'] if self.stats['events_processed'] else None
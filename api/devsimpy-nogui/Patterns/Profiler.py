@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
+# Profiler.py --- Profiler of the atomic models of a simulation
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
+#
+# GENERAL NOTES AND REMARKS:
+#
+# The profiler replaces the outputFnc, intTransition, extTransition and
+# timeAdvance functions of each atomic model (instance attributes set at the
+# start of the simulation, once the strategy has bound the poke and peek of
+# the models) by wrappers that count the calls and accumulate the wall clock
+# time (perf_counter) and the CPU time of the simulation thread (thread_time)
+# of each call. The peek wrappers (peek and peek_all) measure the copies of
+# the received messages and count them by input port, the poke wrappers count
+# the sent messages by output port (without time: the poke of the
+# direct-coupling strategy runs the external transitions of the receivers).
+#
+# The counters are preallocated arrays indexed by the rank of the model (or
+# of the port) so that a call costs two clock reads and three array updates.
+# The time of peek is a part of the time of the transition that calls it.
+#
+# The transitions run in the forked workers of the parallel strategies
+# (multiprocess, conservative and optimistic) are not measured.
+#
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
+
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
+#
+# GLOBAL VARIABLES AND FUNCTIONS
+#
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
+
+import time
+from array import array
+
+### measured functions of the atomic models (peek is the copy of the received messages)
+PROFILED_FUNCTIONS = ('outputFnc', 'intTransition', 'extTransition', 'timeAdvance', 'peek')
+### functions of the kernel whose times are added in the total of a model (peek is called by them)
+TRANSITION_FUNCTIONS = PROFILED_FUNCTIONS[:-1]
+
+def zeros(typecode:str, n:int)->array:
+	return array(typecode, bytes(array(typecode).itemsize * n))
+
+class ModelProfiler:
+	""" Calls, wall clock and CPU times of the functions and messages by port of the atomic models of a simulation.
+	"""
+
+	def __init__(self):
+		""" Constructor.
+		"""
+		self.models = []
+		self.ports = []
+		self.calls = {}
+		self.wall = {}
+		self.cpu = {}
+		self.sent = None
+		self.received = None
+
+	def attach(self, models:list)->None:
+		""" Preallocate the counters and wrap the functions of the atomic models.
+		"""
+		self.models = list(models)
+		n = len(self.models)
+
+		self.calls = dict((name, zeros('q', n)) for name in PROFILED_FUNCTIONS)
+		self.wall = dict((name, zeros('d', n)) for name in PROFILED_FUNCTIONS)
+		self.cpu = dict((name, zeros('d', n)) for name in PROFILED_FUNCTIONS)
+
+		### rank of the ports (input and output ports of the models in their order)
+		index = {}
+		for i, m in enumerate(self.models):
+			for p in m.IPorts + m.OPorts:
+				index[p] = len(self.ports)
+				self.ports.append((i, p))
+		self.sent = zeros('q', len(self.ports))
+		self.received = zeros('q', len(self.ports))
+
+		for i, m in enumerate(self.models):
+			for name in TRANSITION_FUNCTIONS:
+				setattr(m, name, self.timed(getattr(m, name), name, i))
+			m.peek = self.timedPeek(m.peek, i, index)
+			if hasattr(m, 'peek_all'):
+				m.peek_all = self.timedPeekAll(m.peek_all, i, index)
+			m.poke = self.countedPoke(m.poke, index)
+
+	def timed(self, fct, name:str, i:int):
+		""" Wrapper of the function fct of the model i.
+		"""
+		calls = self.calls[name]
+		wall = self.wall[name]
+		cpu = self.cpu[name]
+		perf_counter = time.perf_counter
+		thread_time = time.thread_time
+
+		def wrapper(*args, **kwargs):
+			w = perf_counter()
+			c = thread_time()
+			try:
+				return fct(*args, **kwargs)
+			finally:
+				wall[i] += perf_counter() - w
+				cpu[i] += thread_time() - c
+				calls[i] += 1
+
+		return wrapper
+
+	def timedPeek(self, fct, i:int, index:dict):
+		""" Wrapper of the peek of the model i (the received messages are counted by port).
+		"""
+		wrapper = self.timed(fct, 'peek', i)
+		received = self.received
+
+		def peek(p, *args):
+			v = wrapper(p, *args)
+			if v is not None:
+				received[index[p]] += 1
+			return v
+
+		return peek
+
+	def timedPeekAll(self, fct, i:int, index:dict):
+		""" Wrapper of the peek_all of the model i (the received messages are counted by port).
+		"""
+		wrapper = self.timed(fct, 'peek', i)
+		received = self.received
+
+		def peek_all(*args):
+			L = wrapper(*args)
+			for p, v in L:
+				received[index[p]] += 1
+			return L
+
+		return peek_all
+
+	def countedPoke(self, fct, index:dict):
+		""" Wrapper of the poke of a model (the sent messages are counted by port).
+		"""
+		sent = self.sent
+
+		def poke(p, v):
+			sent[index[p]] += 1
+			return fct(p, v)
+
+		return poke
+
+	def toDict(self)->dict:
+		""" Tables of the models (the slowest first) and of their ports (with messages) for the report.
+		"""
+		columns = ['model', 'class']
+		for name in PROFILED_FUNCTIONS:
+			columns.extend([f'{name}_calls', f'{name}_wall', f'{name}_cpu'])
+		columns.extend(['total_wall', 'total_cpu', 'sent', 'received'])
+
+		sent = [0] * len(self.models)
+		received = [0] * len(self.models)
+		for k, (i, p) in enumerate(self.ports):
+			sent[i] += self.sent[k]
+			received[i] += self.received[k]
+
+		rows = []
+		for i, m in enumerate(self.models):
+			row = [m.name, type(m).__name__]
+			for name in PROFILED_FUNCTIONS:
+				row.extend([self.calls[name][i], self.wall[name][i], self.cpu[name][i]])
+			row.extend([sum(self.wall[name][i] for name in TRANSITION_FUNCTIONS), sum(self.cpu[name][i] for name in TRANSITION_FUNCTIONS), sent[i], received[i]])
+			rows.append(row)
+		rows.sort(key=lambda row: -row[-4])
+
+		ports = [[self.models[i].name, p.name, self.sent[k], self.received[k]] for k, (i, p) in enumerate(self.ports) if self.sent[k] or self.received[k]]
+
+		return {'columns': columns, 'rows': rows, 'ports': {'columns': ['model', 'port', 'sent', 'received'], 'rows': ports}}
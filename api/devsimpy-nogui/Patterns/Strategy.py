@@ -23,7 +23,7 @@
 
 import sys
 import time
-import copy
+import types
 import weakref
 import heapq
 import threading
@@ -33,8 +33,10 @@ import inspect
 if not hasattr(inspect, 'getargspec'):
     inspect.getargspec = inspect.getfullargspec
     
-from PluginManager import PluginManager #trigger_event
+from PluginManager import Hooks
 from Utilities import getOutDir
+from DomainInterface.Object import getMessageMode, readMessage, writeMessage
+from DEVSKernel.PyDEVS.simulator import updateActivity
 
 import builtins
 import re
@@ -46,8 +48,6 @@ for pydevs_dir, path in builtins.__dict__['DEVS_DIR_PATH_DICT'].items():
 		### split from DEVSKernel string and replace separator with point
 		d = re.split("DEVSKernel", path)[-1].replace(os.sep, '.')
 
-		### for py 3.X
-		import importlib
 		exec("%s = importlib.import_module('DEVSKernel%s.DEVS')"%(pydevs_dir,d))
 	
     #exec("import DEVSKernel%s.DEVS as %s"%(d,pydevs_dir))
@@ -126,11 +126,29 @@ class SimStrategy1(SimStrategy):
 		model = self._simulator.getMaster()
 		send = self._simulator.send
 
+		budget = self._simulator.budget
+		checkpoint = self._simulator.checkpoint
+
 		# Initialize the model --- set the simulation clock to 0.
 		send(model, (0, [], 0))
 
+		### checkpoints of the simulation (see Patterns/Checkpoint.py): the resumed simulation goes on from the restored models
+		if checkpoint:
+			checkpoint.start(self._simulator)
+			if checkpoint.resume: clock = model.myTimeAdvance
+
+		if budget: budget.start()
+
 		# Main loop repeatedly sends $(*,\,t)$ messages to the model's root DEVS.
-		while clock <= T:
+		while clock <= T and self._simulator.end_flag == False:
+
+			### budgets of the simulation
+			reason = budget.step(clock) if budget else None
+			if reason:
+				self._simulator.stop(reason)
+				break
+
+			if checkpoint: checkpoint.step(clock)
 
 			send(model, (1, model.immChildren, clock))
 			clock = model.myTimeAdvance
@@ -154,11 +172,16 @@ class SimStrategy2(SimStrategy):
 
 		master = self._simulator.getMaster()
 		send = self._simulator.send
+		budget = self._simulator.budget
+		checkpoint = self._simulator.checkpoint
 		#clock = master.myTimeAdvance
 
 		# Initialize the model --- set the simulation clock to 0.
 		send(master, (0, [], 0))
 
+		### checkpoints of the simulation (see Patterns/Checkpoint.py): the resumed simulation goes on from the restored models
+		if checkpoint: checkpoint.start(self._simulator)
+
 		clock = master.myTimeAdvance
 
 		### ref to cpu time evaluation
@@ -167,8 +190,11 @@ class SimStrategy2(SimStrategy):
 		### if suspend, we could store the future ref
 		old_cpu_time = 0
 
-		### stoping condition depend on the ntl (no time limit for the simulation)
-		condition = lambda clock: HasActiveChild(getFlatImmChildrenList(master, [])) if self._simulator.ntl else clock <= T
+		if budget: budget.start()
+
+		### stoping condition depend on the ntl (no time limit for the simulation): active atomic models counted by the solvers
+		activity = self._simulator.activity
+		condition = lambda clock: activity.active > 0 if self._simulator.ntl else clock <= T
 
 		# Main loop repeatedly sends $(*,\,t)$ messages to the model's root DEVS.
 		while condition(clock) and self._simulator.end_flag == False:
@@ -185,8 +211,16 @@ class SimStrategy2(SimStrategy):
 					t_start = time.time()
 
 			else:
+				### budgets of the simulation
+				reason = budget.step(clock) if budget else None
+				if reason:
+					self._simulator.stop(reason)
+					break
+
+				if checkpoint: checkpoint.step(clock)
+
 				# The SIM_VERBOSE event occurs
-				PluginManager.trigger_event("SIM_VERBOSE", clock = clock)
+				for f in Hooks.SIM_VERBOSE: f(clock = clock)
 
 				send(master, (1, {}, clock))
 
@@ -248,6 +282,8 @@ def serial_ext_transtion_manager(p):
 ###
 @Post_Poke
 def poke(p, v):
+	### the message is frozen in the 'frozen' and 'debug' message modes of the sender
+	v = writeMessage(v, getMessageMode(p.host))
 	p.weak.SetValue(v)
 
 	### just for plugin verbose
@@ -255,7 +291,8 @@ def poke(p, v):
 
 ###
 def peek(p):
-	return copy.deepcopy(p.weak.GetValue())
+	### deep copy of the message in the 'copy' message mode of the receiver, the (frozen) message else
+	return readMessage(p.weak.GetValue(), getMessageMode(p.host), p.host, p)
 
 def peek_all(self):
 	"""Retrives messages from all input port {\tt p}.
@@ -341,17 +378,28 @@ def FlatConnection(p1, p2):
 				for pp in p2.outLine:
 					FlatConnection(p, pp)
 
+def reschedule(m):
+	""" Update the entry of m in the event list of the direct-coupling strategy (after a change of its myTimeAdvance).
+	"""
+	eventList = m.ts.eventList
+	if eventList is not None:
+		eventList.update(m)
+
 def setAtomicModels(atomic_model_list, ts):
 	""" Set atomic DEVS model flat list and initialize it.
 	"""
 
 	for i,m in enumerate(atomic_model_list):
+		### all the models are active until their first transition
+		if m.timeNext == INFINITY:
+			m.timeNext = 0.0
+			updateActivity(m)
 		m.elapsed = m.timeLast = m.timeNext = 0.0
 		m.myTimeAdvance = m.timeAdvance()
 		m.poke = poke
 		m.peek = peek
-		funcType = type(PyDEVS.AtomicDEVS.peek_all)
-		m.peek_all = funcType(peek_all, m, PyDEVS.AtomicDEVS)
+		### bound method (the py2 unbound method type with a class argument no longer exists)
+		m.peek_all = types.MethodType(peek_all, m)
 		setattr(m, 'priority', i)
 		setattr(m, 'ts', ts())
 
@@ -383,16 +431,19 @@ def execExtTransition(m):
 
 	m.extTransition()
 
+	active = m.timeNext != INFINITY
 	m.timeLast = ts
 	m.myTimeAdvance = m.timeAdvance()
 	m.timeNext = m.timeLast+m.myTimeAdvance
 	if m.myTimeAdvance != INFINITY: m.myTimeAdvance += ts
 	m.elapsed = 0.0
+	if (m.timeNext != INFINITY) != active: updateActivity(m)
+	reschedule(m)
 
 	# The SIM_VERBOSE event occurs
-	PluginManager.trigger_event("SIM_VERBOSE", model=m, msg=1)
-	PluginManager.trigger_event("SIM_BLINK", model=m, msg=[{}])
-	PluginManager.trigger_event("SIM_TEST", model=m, msg=[{}])
+	for f in Hooks.SIM_VERBOSE: f(model=m, msg=1)
+	for f in Hooks.SIM_BLINK: f(model=m, msg=[{}])
+	for f in Hooks.SIM_TEST: f(model=m, msg=[{}])
 
 	return m
 
@@ -409,25 +460,83 @@ def execIntTransition(m):
 	m.elapsed = ts - m.timeLast
 
 	m.intTransition()
+	active = m.timeNext != INFINITY
 	m.timeLast = ts
 	m.myTimeAdvance = m.timeAdvance()
 	m.timeNext = m.timeLast+m.myTimeAdvance
 	if m.myTimeAdvance != INFINITY: m.myTimeAdvance += ts
 	m.elapsed = 0.0
+	if (m.timeNext != INFINITY) != active: updateActivity(m)
+	reschedule(m)
 
 	# The SIM_VERBOSE event occurs
-	PluginManager.trigger_event("SIM_VERBOSE", model=m, msg=0)
-	PluginManager.trigger_event("SIM_BLINK", model=m, msg=[1])
-	PluginManager.trigger_event("SIM_TEST", model=m, msg=[1])
+	for f in Hooks.SIM_VERBOSE: f(model=m, msg=0)
+	for f in Hooks.SIM_BLINK: f(model=m, msg=[1])
+	for f in Hooks.SIM_TEST: f(model=m, msg=[1])
 
 class Clock(object):
 	def __init__(self, time):
 		self._val = time
+		### event list of the flat models updated by their transitions (see SimStrategy3.simulate)
+		self.eventList = None
 	def Get(self):
 		return self._val
 	def Set(self, val):
 		self._val = val
 
+class EventHeap:
+	""" Event list of the flat models of the direct-coupling strategy.
+
+		Binary heap (heapq) of the entries [myTimeAdvance, priority, model]. A transition of a model pushes
+		its new entry and invalidates the previous one, which is skipped when it reaches the top of the heap.
+		The heap is rebuilt with the valid entries when the invalid ones are too many.
+	"""
+
+	def __init__(self, models:list):
+		""" Constructor (models in the order of their priority).
+		"""
+		### valid entry of each model by priority (None while the model is imminent)
+		self.entry = [[m.myTimeAdvance, m.priority, m] for m in models]
+		self.heap = list(self.entry)
+		heapq.heapify(self.heap)
+
+	def min(self)->float:
+		""" Return the smallest time of next event of the models.
+		"""
+		heap = self.heap
+		entry = self.entry
+		while heap and heap[0] is not entry[heap[0][1]]:
+			heapq.heappop(heap)
+		return heap[0][0] if heap else INFINITY
+
+	def update(self, m)->None:
+		""" Update the entry of m after a change of its time of next event.
+		"""
+		e = self.entry[m.priority]
+		tn = m.myTimeAdvance
+		if e is None or e[0] != tn:
+			e = [tn, m.priority, m]
+			self.entry[m.priority] = e
+			heapq.heappush(self.heap, e)
+			if len(self.heap) > 2*len(self.entry)+64:
+				self.heap = [a for a in self.entry if a is not None]
+				heapq.heapify(self.heap)
+
+	def popImminents(self)->list:
+		""" Remove and return the models which tied for the smallest time of next event (in the order of their priority).
+			Their transitions update their entries.
+		"""
+		heap = self.heap
+		entry = self.entry
+		tn = self.min()
+		L = []
+		while heap and heap[0][0] == tn:
+			e = heapq.heappop(heap)
+			if e is entry[e[1]]:
+				entry[e[1]] = None
+				L.append(e[2])
+		return L
+
 ###
 class SimStrategy3(SimStrategy):
 	""" Strategy 3 for DEVSimPy thread-based direct-coupled simulation
@@ -467,13 +576,22 @@ class SimStrategy3(SimStrategy):
 		### if suspend, we could store the future ref
 		old_cpu_time = 0
 
-		### stopping condition depend on the ntl (no time limit for the simulation)
-		condition = lambda clk: HasActiveChild(getFlatPriorityList(self.master, [])) if self._simulator.ntl else clk <= T
+		budget = self._simulator.budget
+		if budget: budget.start()
+
+		### checkpoints of the simulation (see Patterns/Checkpoint.py): the resumed simulation goes on from the restored models
+		checkpoint = self._simulator.checkpoint
+		if checkpoint: checkpoint.start(self._simulator)
+
+		### stopping condition depend on the ntl (no time limit for the simulation): active atomic models counted by the transitions
+		activity = self._simulator.activity
+		condition = lambda clk: activity.active > 0 if self._simulator.ntl else clk <= T
 
-		### simulation time and list of flat models ordered by devs priority
-		L = [m.myTimeAdvance for m in self.flat_priority_list if m.myTimeAdvance < INFINITY] or [INFINITY]
-		self.ts.Set(min(L))
-		formated_priority_list = [(1+i/10000.0, m, execIntTransition) for i,m in enumerate(self.flat_priority_list)]
+		### simulation time and event list of the flat models ordered by (myTimeAdvance, devs priority)
+		### updated by the transitions of the models (see reschedule): a step costs O(k log N) for k models that fire
+		eventList = EventHeap(self.flat_priority_list)
+		self.ts.eventList = eventList
+		self.ts.Set(eventList.min())
 
 		while condition(self.ts.Get()) and self._simulator.end_flag == False:
 
@@ -489,22 +607,24 @@ class SimStrategy3(SimStrategy):
 					t_start = time.time()
 
 			else:
+				### budgets of the simulation
+				reason = budget.step(self.ts.Get()) if budget else None
+				if reason:
+					self._simulator.stop(reason)
+					break
+
+				if checkpoint: checkpoint.step(self.ts.Get())
 
 				### The SIM_VERBOSE event occurs
-				PluginManager.trigger_event("SIM_VERBOSE", self.master, None, clock = self.ts.Get())
+				for f in Hooks.SIM_VERBOSE: f(self.master, None, clock = self.ts.Get())
 
-				### tree-like data structure ordered by devsimpy priority
-				priority_scheduler = [a for a in formated_priority_list if self.ts.Get() == a[1].myTimeAdvance]
-				heapq.heapify(priority_scheduler)
+				### tree-like data structure ordered by devsimpy priority (the imminent models are sorted by priority)
+				priority_scheduler = [(1+m.priority/10000.0, m, execIntTransition) for m in eventList.popImminents()]
 
-				### TODO: execute with process of model are parallel !
-				while(priority_scheduler):
-					### get most priority model and apply its internal transition
-					priority, model, transition_fct = heapq.heappop(priority_scheduler)
-					transition_fct(*(model,))
+				self.execImminents(priority_scheduler)
 
 				### update simulation time
-				self.ts.Set(min([m.myTimeAdvance for m in self.flat_priority_list]))
+				self.ts.Set(eventList.min())
 
 				### just for progress bar
 				self.master.timeLast = self.ts.Get() if self.ts.Get() != INFINITY else self.master.timeLast
@@ -512,6 +632,15 @@ class SimStrategy3(SimStrategy):
 
 		self._simulator.terminate()
 
+	def execImminents(self, priority_scheduler):
+		""" Apply the transitions of the imminent models in the order of their priority.
+			The multiprocess strategy (see ParallelStrategy.py) overrides it.
+		"""
+		while(priority_scheduler):
+			### get most priority model and apply its internal transition
+			priority, model, transition_fct = heapq.heappop(priority_scheduler)
+			transition_fct(*(model,))
+
 # A. Simulate forever.
 #    The termination_condition function never returns True.
 #
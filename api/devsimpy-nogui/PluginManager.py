@@ -12,6 +12,14 @@ import importlib
 import gettext
 _ = gettext.gettext
 
+class Hooks(object):
+	""" Plug-ins of the simulation events bound at the start of a simulation (see PluginManager.bind_hooks).
+		Each event is a tuple of functions called directly by the kernel (an empty tuple if the event has no enabled plug-in).
+	"""
+	SIM_VERBOSE = ()
+	SIM_BLINK = ()
+	SIM_TEST = ()
+
 class PluginManager(object):
 
 	#def __init__(self):
@@ -79,10 +87,26 @@ class PluginManager(object):
 			have registered themselves to the event. Any additional arguments or
 			keyword arguments you pass in will be passed to the plugins.
 		"""
-		for plugin in PluginManager.plugins[event]:
-			if event not in PluginManager.disabled_event:
+		if event not in PluginManager.disabled_event:
+			for plugin in PluginManager.plugins.get(event, ()):
 				plugin(*args, **kwargs)
 
+	@staticmethod
+	def bind(event)->tuple:
+		""" Return the tuple of the enabled plug-ins of the event (empty if it has none).
+		"""
+		if event in PluginManager.disabled_event:
+			return ()
+		return tuple(PluginManager.plugins.get(event, ()))
+
+	@staticmethod
+	def bind_hooks():
+		""" Bind the events of the Hooks class to their plug-ins (at the start of a simulation: the plug-ins
+			enabled or disabled during the simulation are taken into account by the next one).
+		"""
+		for event in [a for a in vars(Hooks) if a.isupper()]:
+			setattr(Hooks, event, PluginManager.bind(event))
+
 	@staticmethod
 	def load_plugins(modulename):
 		""" This reads a plugins list to load. It is so plug-in
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+"""
+Name: ResultChannel.py
+Brief description: Framed channel used to send the results of a simulation (collectors outputs, progress
+and final report) to the process that has started it, independently of the stdout.
+GENERAL NOTES AND REMARKS:
+
+A frame is a JSON object (with at least a 'type' key) encoded in utf-8 and prefixed by its length
+(4 bytes, big-endian). Frames are written on a binary stream (the file descriptor given by the -result_fd
+option of devsimpy-nogui.py) and decoded incrementally with the FrameReader class.
+
+GLOBAL VARIABLES AND FUNCTIONS:
+"""
+
+import json
+import struct
+import threading
+from datetime import date
+
+HEADER = struct.Struct('>I')
+
+def serialize(obj):
+	""" Default JSON serializer for values that are not natively serializable (numpy, date, Decimal...).
+	"""
+	if hasattr(obj, 'tolist'):
+		return obj.tolist()
+	elif isinstance(obj, date):
+		return obj.isoformat()
+	else:
+		return str(obj)
+
+def encode(frame:dict)->bytes:
+	""" Return the bytes of the frame.
+	"""
+	data = json.dumps(frame, default=serialize).encode('utf-8')
+	return HEADER.pack(len(data)) + data
+
+class FrameReader:
+	""" Incremental decoder of frames.
+	"""
+
+	def __init__(self):
+		""" Constructor.
+		"""
+		self._buffer = bytearray()
+
+	def feed(self, data:bytes)->list:
+		""" Add data and return the list of the completed frames.
+		"""
+		buffer = self._buffer
+		buffer += data
+
+		frames = []
+		pos = 0
+		while len(buffer) - pos >= HEADER.size:
+			size, = HEADER.unpack_from(buffer, pos)
+			end = pos + HEADER.size + size
+			if len(buffer) < end:
+				break
+			frames.append(json.loads(buffer[pos + HEADER.size:end]))
+			pos = end
+
+		del buffer[:pos]
+
+		return frames
+
+	def pending(self)->int:
+		""" Number of bytes of the incomplete frame.
+		"""
+		return len(self._buffer)
+
+class FrameWriter:
+	""" Thread safe writer of frames on a binary stream.
+	"""
+
+	def __init__(self, stream):
+		""" Constructor.
+		"""
+		self._stream = stream
+		self._lock = threading.Lock()
+
+	def write(self, frame:dict)->None:
+		""" Write the frame on the stream.
+		"""
+		data = encode(frame)
+		with self._lock:
+			self._stream.write(data)
+			self._stream.flush()
+
+	def close(self)->None:
+		""" Close the stream.
+		"""
+		with self._lock:
+			self._stream.close()
+
+class FrameSink:
+	""" Binary stream that decodes the frames written on it and gives them to a callback (in-process channel).
+	"""
+
+	def __init__(self, callback):
+		""" Constructor.
+		"""
+		self._reader = FrameReader()
+		self._callback = callback
+
+	def write(self, data:bytes)->None:
+		for frame in self._reader.feed(data):
+			self._callback(frame)
+
+	def flush(self)->None:
+		pass
+
+	def close(self)->None:
+		pass
+
+### channel of the current simulation (None if the results are printed on the stdout)
+_channel = None
+
+def open_channel(stream)->FrameWriter:
+	""" Send the next frames on the binary stream.
+	"""
+	global _channel
+	_channel = FrameWriter(stream)
+	return _channel
+
+def close_channel()->None:
+	""" Close the current channel.
+	"""
+	global _channel
+	if _channel is not None:
+		_channel.close()
+	_channel = None
+
+def is_open()->bool:
+	""" Return True if a channel is open.
+	"""
+	return _channel is not None
+
+def send(frame_type:str, **data)->bool:
+	""" Send a frame of type frame_type on the channel.
+
+		Return False if no channel is open (the caller has to print the data).
+	"""
+	if _channel is None:
+		return False
+
+	frame = {'type': frame_type}
+	frame.update(data)
+	_channel.write(frame)
+
+	return True
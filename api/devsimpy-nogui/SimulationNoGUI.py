@@ -21,8 +21,22 @@ import gettext
 import json
 import pusher
 
+import ResultChannel
+import ControlChannel
+
 _ = gettext.gettext
 
+### period (in s) of the progress evaluation during the simulation
+PROGRESS_PERIOD = 0.1
+### min period (in s) between two progress frames of a simulation without time limit (sent when the number of active models changes)
+ACTIVITY_PERIOD = 1.0
+
+def getActiveModels(thread)->int:
+    """ Number of active atomic models (with a finite timeNext) of the simulation thread (None if not counted by the kernel).
+    """
+    activity = getattr(thread, 'activity', None)
+    return activity.active if activity is not None else None
+
 
 path = os.path.join('Domain')
 if path not in sys.path:
@@ -66,9 +80,19 @@ class PrintPusher():
         pass
     
     def push(self, event, data):
-        print((json.dumps(data)))
+        ### frames are sent on the result channel if it is open (see devsimpy-nogui.py -result_fd)
+        if not ResultChannel.send(event, data=data):
+            print((json.dumps(data)))
     
-def makeSimulation(master, T, simu_name:str="", is_remote:bool=False, json_trace:bool=True):
+def isDeterministic(model)->bool:
+    """ Return True if all the atomic models of the model are deterministic (see DomainBehavior.isDeterministic).
+    """
+    if hasattr(model, 'getComponentSet'):
+        return all(isDeterministic(m) for m in model.getComponentSet())
+    else:
+        return model.isDeterministic() if hasattr(model, 'isDeterministic') else True
+
+def makeSimulation(master, T, simu_name:str="", is_remote:bool=False, json_trace:bool=True, budget=None, checkpoint=None, profiler=None, prof=False, timings=None):
     """
     """
     from InteractionSocket import InteractionManager
@@ -85,17 +109,22 @@ def makeSimulation(master, T, simu_name:str="", is_remote:bool=False, json_trace
     json_report['devs_instance'] = str(master)
     if isinstance(master, tuple):
         json_report['summary'] += "...DEVS instance not created: %s\n"%str(master)
-        sys.stdout.write(json.dumps(json_report))
+        if not ResultChannel.send('report', data=json_report):
+            sys.stdout.write(json.dumps(json_report))
         return False
     
     else:
         json_report['summary'] += "...DEVS instance created"
+
+    ### the results of a deterministic simulation can be reused (see api/result_cache.py)
+    json_report['deterministic'] = isDeterministic(master)
         
     # Start Simulation               
     json_report['summary'] += "...Performing DEVS simulation"
 
     CPUduration = 0.0
     interactionManager = None
+    thread = None
     try:
         
         # Pusher service for Simulation --> User communication
@@ -113,8 +142,11 @@ def makeSimulation(master, T, simu_name:str="", is_remote:bool=False, json_trace
         # Send to user 
         simuPusher.push('live_streams', {'live_streams': json_report['output']})
         
-        sim = runSimulation(master, T)
+        sim = runSimulation(master, T, budget, checkpoint, profiler, prof)
         thread = sim.Run()
+
+        ### the simulation can be cancelled through the control channel (see devsimpy-nogui.py -control_fd)
+        ControlChannel.register(thread)
         
         if is_remote:
             # Socket service for WebService <--> Simulation communication
@@ -127,12 +159,14 @@ def makeSimulation(master, T, simu_name:str="", is_remote:bool=False, json_trace
         
         if not builtins.__dict__['NTL']:
             while thread.isAlive() if hasattr(thread,'isAlive') else thread.is_alive():
+                ### wait for the simulation thread instead of spinning (it would compete for the GIL)
+                thread.join(PROGRESS_PERIOD)
                 new_real_time = time.time()
                 CPUduration = new_real_time - first_real_time
                 new_progress = 100.0*(float(thread.model.timeLast) / float(T)) if float(T) != 0 else 100.0
                 if new_progress - progress > 5:
                     progress = new_progress
-                    simuPusher.push('progress', {'progress':progress}) 
+                    simuPusher.push('progress', {'progress':progress, 'active_models':getActiveModels(thread)}) 
                 if not json_trace:
                     Printer(CPUduration)
 
@@ -140,7 +174,25 @@ def makeSimulation(master, T, simu_name:str="", is_remote:bool=False, json_trace
                 interactionManager.stop()
                 interactionManager.join()
                 
-            simuPusher.push('progress', {'progress':100}) 
+            simuPusher.push('progress', {'progress':100, 'active_models':getActiveModels(thread)}) 
+
+        else:
+            ### the final report is made after the end of the simulation (and the finish of the collectors)
+            ### the number of active models is the live metric of a simulation without time limit
+            active_models = None
+            last_push = 0.0
+            while thread.is_alive():
+                thread.join(PROGRESS_PERIOD)
+                new_active_models = getActiveModels(thread)
+                if new_active_models != active_models and time.time() - last_push >= ACTIVITY_PERIOD:
+                    active_models = new_active_models
+                    last_push = time.time()
+                    simuPusher.push('progress', {'progress':None, 'clock':thread.model.timeLast, 'active_models':active_models})
+            CPUduration = time.time() - first_real_time
+
+            if interactionManager != None:
+                interactionManager.stop()
+                interactionManager.join()
         
     except:
         json_report['summary'] += " *** EXCEPTION raised in simulation ***"
@@ -156,9 +208,45 @@ def makeSimulation(master, T, simu_name:str="", is_remote:bool=False, json_trace
             with open(os.path.join('logs',simu_name+'.report'), 'w') as f:
                 f.write(json.dumps(json_report))
 
-    json_report['summary'] += "...DEVS simulation completed!"
+    ### cancelled or exceeded budget (see Patterns/Budget.py): partial results (the finish() hooks of the models have been called)
+    termination_reason = getattr(thread, 'termination_reason', None)
+    ### a cancellation received once the simulation was terminating is ignored by the thread (see SimulationThread.stop)
+    cancelled = getattr(thread, 'cancelled', False) if thread is not None else ControlChannel.is_cancelled()
+    if cancelled or termination_reason == 'cancelled':
+        json_report['summary'] += "...DEVS simulation cancelled!"
+        json_report['status'] = 'CANCELLED'
+        termination_reason = 'cancelled'
+    elif termination_reason:
+        json_report['summary'] += "...DEVS simulation stopped (%s budget exceeded)!"%termination_reason
+        json_report['status'] = 'STOPPED'
+    else:
+        json_report['summary'] += "...DEVS simulation completed!"
+        json_report['status'] = 'COMPLETED'
+
+    json_report['termination_reason'] = termination_reason or 'completed'
+    if budget:
+        ### events (steps of the root coordinator) counted by the budget
+        json_report['events'] = budget.events
+        if not budget.isEmpty():
+            json_report['budget'] = budget.toDict()
+    if checkpoint:
+        json_report['checkpoint'] = checkpoint.toDict()
+    ### calls and times of the functions of the atomic models (see Patterns/Profiler.py)
+    if profiler:
+        json_report['model_profile'] = profiler.toDict()
+    ### cProfile stats of the simulation thread (see Decorators.hotshotit)
+    if isinstance(prof, str):
+        json_report['profile'] = prof
 
     json_report['duration'] = CPUduration
+    ### times of the load of the YAML file and of the DEVS instance (see devsimpy-nogui.py)
+    if timings:
+        json_report['timings'] = timings
+
+    ### statistics of the strategy if any (pool of the multiprocess strategy, see Patterns/ParallelStrategy.py)
+    strategy_stats = getattr(thread.getAlgorithm(), 'stats', None) if thread else None
+    if strategy_stats:
+        json_report['strategy_stats'] = strategy_stats
     
     ### inform that data file has been generated
     json_report['output'] = []
@@ -177,13 +265,15 @@ def makeSimulation(master, T, simu_name:str="", is_remote:bool=False, json_trace
         with open(os.path.join('logs',simu_name+'.report'), 'w') as f:
                 f.write(json.dumps(json_report))
 
+    ResultChannel.send('report', data=json_report)
+
     return True
 
 class runSimulation:
     """
     """
 
-    def __init__(self, master, time):
+    def __init__(self, master, time, budget=None, checkpoint=None, profiler=None, prof=False):
         """ Constructor.
         """
 
@@ -191,6 +281,13 @@ class runSimulation:
         self.master = master
         self.time = time
 
+        ### budgets of the simulation (see Patterns/Budget.py)
+        self.budget = budget
+        ### checkpoints of the simulation (see Patterns/Checkpoint.py)
+        self.checkpoint = checkpoint
+        ### profiler of the atomic models (see Patterns/Profiler.py)
+        self.profiler = profiler
+
         ### No time limit simulation (defined in the builtin dico from .devsimpy file)
         self.ntl = builtins.__dict__['NTL']
 
@@ -199,8 +296,8 @@ class runSimulation:
         self.dynamic_structure_flag = builtins.__dict__['DYNAMIC_STRUCTURE']
         self.real_time_flag = builtins.__dict__['REAL_TIME']
          
-        ### profiling simulation
-        self.prof = False
+        ### profiling simulation (True or the .prof file of the cProfile stats, see Decorators.hotshotit)
+        self.prof = prof
 
         self.verbose = False
 
@@ -235,6 +332,6 @@ class runSimulation:
             if not self.ntl:
                 self.master.FINAL_TIME = float(self.time)
             
-            self.thread = simulator_factory(self.master, self.selected_strategy, self.prof, self.ntl, self.verbose, self.dynamic_structure_flag, self.real_time_flag)
+            self.thread = simulator_factory(self.master, self.selected_strategy, self.prof, self.ntl, self.verbose, self.dynamic_structure_flag, self.real_time_flag, self.budget, self.checkpoint, self.profiler)
 
             return self.thread
@@ -20,6 +20,7 @@ import os
 import sys
 import builtins
 import json
+import time
 from datetime import date
 
 ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
@@ -54,7 +55,7 @@ builtin_dict = {'SPLASH_PNG': os.path.join(ABS_HOME_PATH, 'splash', 'splash.png'
 				'LOCAL_EDITOR': True, # for the use of local editor
 				'LOG_FILE': os.devnull, # log file (null by default)
 				'DEFAULT_SIM_STRATEGY': 'bag-based', #choose the default simulation strategy for PyDEVS
-				'PYDEVS_SIM_STRATEGY_DICT' : {'original':'SimStrategy1', 'bag-based':'SimStrategy2', 'direct-coupling':'SimStrategy3'}, # list of available simulation strategy for PyDEVS package
+				'PYDEVS_SIM_STRATEGY_DICT' : {'original':'SimStrategy1', 'bag-based':'SimStrategy2', 'direct-coupling':'SimStrategy3', 'multiprocess':'SimStrategy6', 'conservative':'SimStrategy7', 'optimistic':'SimStrategy8'}, # list of available simulation strategy for PyDEVS package
                 'PYPDEVS_SIM_STRATEGY_DICT' : {'classic':'SimStrategy4', 'parallel':'SimStrategy5'}, # list of available simulation strategy for PyPDEVS package
 				'PYPDEVS_221_SIM_STRATEGY_DICT' : {'classic':'SimStrategy4', 'parallel':'SimStrategy5'}, # list of available simulation strategy for PyPDEVS package
 				'HELP_PATH' : os.path.join('doc', 'html'), # path of help directory
@@ -69,7 +70,8 @@ builtin_dict = {'SPLASH_PNG': os.path.join(ABS_HOME_PATH, 'splash', 'splash.png'
 									'PyPDEVS_221':os.path.join(ABS_HOME_PATH,'DEVSKernel','PyPDEVS','pypdevs221' ,'src'),
 									'PyPDEVS':os.path.join(ABS_HOME_PATH,'DEVSKernel','PyPDEVS','old')},
 				'GUI_FLAG' : False,
-				'INFINITY' : float('inf')
+				'INFINITY' : float('inf'),
+				'MESSAGE_MODE' : 'copy' # message mode of the models: copy, frozen or debug (see DomainInterface/Object.py)
 				}
 
 # Sets the homepath variable to the directory where your application is located (sys.argv[0]).
@@ -86,7 +88,7 @@ from StandaloneNoGUI import StandaloneNoGUI
 #
 ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
 
-def simulate(devs, duration, simu_name, is_remote):
+def simulate(devs, duration, simu_name, is_remote, budget=None, checkpoint=None, profiler=None, prof=False, timings=None):
 	"""Simulate the devs model during a specific duration.
 
 	Args:
@@ -94,6 +96,11 @@ def simulate(devs, duration, simu_name, is_remote):
 		duration (_type_): _description_
 		simu_name (_type_): _description_
 		is_remote (bool): _description_
+		budget (Budget): budgets of the simulation (see Patterns/Budget.py)
+		checkpoint (Checkpoint): checkpoints of the simulation (see Patterns/Checkpoint.py)
+		profiler (ModelProfiler): profiler of the atomic models (see Patterns/Profiler.py)
+		prof (str): .prof file of the cProfile stats of the simulation (see Decorators.hotshotit)
+		timings (dict): times (in s) of the load of the YAML file and of the DEVS instance for the report
 	"""
 
 	from SimulationNoGUI import makeSimulation
@@ -103,7 +110,7 @@ def simulate(devs, duration, simu_name, is_remote):
 		duration = 0.0
 
 	### launch simulation
-	makeSimulation(devs, duration, simu_name, is_remote, True)
+	makeSimulation(devs, duration, simu_name, is_remote, True, budget, checkpoint, profiler, prof, timings)
 
 #-------------------------------------------------------------------
 if __name__ == '__main__':
@@ -121,8 +128,33 @@ if __name__ == '__main__':
 	# optional simulation_name for remote execution
 	parser.add_argument("-remote", help=_("Remote execution"), action="store_true")
 	parser.add_argument("-name", help=_("Simulation name"), type=str, default="")
+	# optional file descriptor on which the results are sent as frames (see ResultChannel.py)
+	parser.add_argument("-result_fd", help=_("File descriptor of the result channel"), type=int, default=None)
+	# optional file descriptor on which the control frames are received (see ControlChannel.py)
+	parser.add_argument("-control_fd", help=_("File descriptor of the control channel"), type=int, default=None)
+	# optional parameters of the blocks changed in memory before the simulation (the file is not modified)
+	parser.add_argument("-blockoverrides", help=_('Override parameters for this simulation only (ex. -blockoverrides <"{\"<label>\":{\"<key1>\":<val1>, etc.}, etc.}">)'), type=str, default="")
+	# optional budgets of the simulation (the simulation is stopped when one of them is exceeded)
+	parser.add_argument("-max_wall", help=_("Max wall clock time of the simulation (in s)"), type=float, default=None)
+	parser.add_argument("-max_events", help=_("Max number of events of the simulation"), type=int, default=None)
+	parser.add_argument("-max_time", help=_("Max simulation time"), type=float, default=None)
+	parser.add_argument("-max_rss", help=_("Max resident memory of the simulation process (in MB)"), type=float, default=None)
+	# optional checkpoints of the simulation (saved periodically, at a simulation time and when the simulation is stopped)
+	parser.add_argument("-checkpoint", help=_("Checkpoint file of the simulation"), type=str, default=None)
+	parser.add_argument("-checkpoint_period", help=_("Period of the checkpoints (in s of wall clock)"), type=float, default=None)
+	parser.add_argument("-checkpoint_at", help=_("Simulation time of a checkpoint"), type=float, default=None)
+	parser.add_argument("-resume", help=_("Checkpoint file of the resumed simulation"), type=str, default=None)
+	# optional profiler of the atomic models (calls and times of their functions in the report)
+	parser.add_argument("-profile_models", help=_("Profile the functions and the messages of the atomic models"), action="store_true")
+	# optional cProfile stats of the simulation (pstats file)
+	parser.add_argument("-profile", help=_("Profile the simulation with cProfile in the file (pstats)"), type=str, default=None)
 	# optional kernel for simulation kernel
+	### messages shared without copy between the models
+	parser.add_argument("-message_mode", help=_("Message mode of the models [copy|frozen|debug]"), type=str, choices=['copy', 'frozen', 'debug'], default='copy')
+
 	parser.add_argument("-kernel", help=_("Simulation kernel [pyDEVS|PyPDEVS]"), type=str, default="pyDEVS")
+	### simulation strategy of the pyDEVS kernel (the default one if None)
+	parser.add_argument("-strategy", help=_("Simulation strategy of the pyDEVS kernel [%s]")%'|'.join(builtin_dict['PYDEVS_SIM_STRATEGY_DICT']), type=str, choices=list(builtin_dict['PYDEVS_SIM_STRATEGY_DICT']), default=None)
 	# optional real time
 	parser.add_argument("-rt", help=_("Real time simulation (only for PyPDEVS)"), action="store_true")
 
@@ -141,6 +173,19 @@ if __name__ == '__main__':
 
 	args = parser.parse_args()
 
+	if args.result_fd is not None:
+		import ResultChannel
+		ResultChannel.open_channel(os.fdopen(args.result_fd, 'wb'))
+
+	if args.control_fd is not None:
+		import ControlChannel
+		ControlChannel.listen(args.control_fd)
+
+	builtins.__dict__['MESSAGE_MODE'] = args.message_mode
+
+	if args.strategy:
+		builtins.__dict__['DEFAULT_SIM_STRATEGY'] = args.strategy
+
 	if args.kernel:
 		if 'PyPDEVS' in args.kernel:
 			builtins.__dict__['DEFAULT_DEVS_DIRNAME'] = 'PyPDEVS_221'
@@ -153,7 +198,10 @@ if __name__ == '__main__':
 
 	assert os.path.exists(filename), _(f"ERROR: {filename} file does not exist!\n")
 	
+	### times of the load of the YAML file and of the DEVS instance (timings of the report)
+	start = time.perf_counter()
 	yamlHandler = YAMLHandler(filename)
+	yaml_load = time.perf_counter() - start
 
 	assert yamlHandler.filename_is_valid, _(f"ERROR: {filename} is invalid!\n")
 
@@ -193,7 +241,26 @@ if __name__ == '__main__':
 		# simulation
 		duration_val = args.simulation_time
 		duration = float('inf') if duration_val in ('ntl', 'inf') else int(duration_val)
+		if args.blockoverrides:
+			# model blocks are changed only for this simulation
+			yamlHandler.overrideYAMLBlockModelArgs(json.loads(args.blockoverrides))
+		start = time.perf_counter()
 		devs = yamlHandler.getDevsInstance()
+		timings = {'yaml_load': yaml_load, 'devs_instance': time.perf_counter() - start}
 		if devs:
-			simulate(devs, duration, args.name, args.remote)
+			from Patterns.Budget import Budget
+			budget = Budget(args.max_wall, args.max_events, args.max_time, args.max_rss)
+			checkpoint = None
+			if args.checkpoint or args.resume:
+				from Patterns.Checkpoint import Checkpoint, CHECKPOINT_STRATEGIES
+				strategy = builtins.__dict__['DEFAULT_SIM_STRATEGY']
+				assert strategy in CHECKPOINT_STRATEGIES, _(f"ERROR: checkpoints are not supported by the {strategy} strategy!\n")
+				assert not args.resume or os.path.exists(args.resume), _(f"ERROR: {args.resume} checkpoint does not exist!\n")
+				checkpoint = Checkpoint(args.checkpoint, args.checkpoint_period, args.checkpoint_at, args.resume)
+			profiler = None
+			if args.profile_models:
+				from Patterns.Profiler import ModelProfiler
+				profiler = ModelProfiler()
+			### the budget counts the events of the simulation even without limit (events of the report)
+			simulate(devs, duration, args.name, args.remote, budget, checkpoint, profiler, args.profile or False, timings)
 	
\ No newline at end of file
@@ -2,15 +2,27 @@
 Primary API route endpoints
 
 """
-from celery.result import AsyncResult
-from fastapi import Query, Depends, HTTPException, APIRouter, File, UploadFile
-from fastapi.responses import FileResponse
+from celery import group
+from celery.result import AsyncResult, GroupResult
+from fastapi import Query, Depends, HTTPException, APIRouter, File, UploadFile, Header
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, validator
-
-from .worker import execute_cmd, create_sim
+from redis import RedisError
+from typing import Optional, List, Dict
+
+from .worker import celery, submit_sim, batch_signatures, record_submission, is_sim_ready, SIM_READY_STATES, get_checkpoint_path
+from .scheduling import get_lanes_stats
+from .stream import read_events
+from .yaml_cache import yaml_cache, get_blocks_list, get_block_args, update_block_args
+from . import result_cache
+from . import profiles
+from . import metrics
+from .control import request_cancel
+from .catalog import FIELDS, get_catalog, list_entries, project
 from api.config import yaml_path_dir, users_path_dir
 
-import shutil, os, time
+import shutil, os, itertools, re, json
 
 # Init FastAPI router for API endpoints
 api_routes = APIRouter()
@@ -31,35 +43,56 @@ def getYAMLFile(filename:str, path:str=users_path_dir)->dict:
     filename_path = os.path.join(path, filename)
     return dict([(filename, open(filename_path, 'r').read())]) if os.path.exists(filename_path) else {}
 
-def getYAMLFiles(path:str=users_path_dir)->dict:
+def getYAMLFiles(path:str=users_path_dir, prefix:str="", offset:int=0, limit:int=None)->dict:
     """Get existing yaml files in path.
 
     Args:
         
         path (str, optional): Path that contains the YAML files. Defaults to users_path_dir.
+        
+        prefix (str, optional): Only the file names starting with prefix. Defaults to "".
+        
+        offset (int, optional): Index of the first file (in the sorted file names). Defaults to 0.
+        
+        limit (int, optional): Max number of files. Defaults to None (all the files).
 
     Returns:
         
         dict: JSON flow with file name as key and YAML description as value.
     """
-    return dict([(entry, open(os.path.join(path, entry), 'r').read())\
-                for entry in os.listdir(path)\
-                if entry.endswith('.yaml')])
+    entries, _ = list_entries([path], prefix, offset, limit)
+    return dict([(entry.name, project(entry, ('content',))['content']) for entry in entries])
 
-def getYAMLFilenames(path:str=users_path_dir)->dict:
+def getYAMLFilenames(path:str=users_path_dir, fields:tuple=('last modified', 'size'), prefix:str="", offset:int=0, limit:int=None)->dict:
     """Get all yaml file names in path.
 
     Args:
         
         path (str, optional): Path that contains the YAML files. Defaults to users_path_dir.
+        
+        fields (tuple, optional): Fields of the files (see api.catalog.FIELDS). Defaults to ('last modified', 'size').
+        
+        prefix (str, optional): Only the file names starting with prefix. Defaults to "".
+        
+        offset (int, optional): Index of the first file (in the sorted file names). Defaults to 0.
+        
+        limit (int, optional): Max number of files. Defaults to None (all the files).
 
     Returns:
         
-        dict: JSON flow with filename as key and a dict with YAML description,size and last modified date as value.
+        dict: JSON flow with filename as key and a dict with the fields (by default the last modified date and the size) as value.
+    """
+    entries, _ = list_entries([path], prefix, offset, limit)
+    return dict([(entry.name, project(entry, fields)) for entry in entries])
+
+def validate_fields(fields:str = Query("last modified,size", description=f"Comma separated fields of the files in {FIELDS}", example="size,hash,blocks"))->tuple:
+    """ Fields must be in api.catalog.FIELDS.
     """
-    return dict([(entry, {'last modified':str(time.ctime(os.path.getmtime(os.path.join(path, entry)))), 'size':str(os.path.getsize(os.path.join(path, entry))*0.001)+' ko'})\
-                for entry in os.listdir(path)\
-                if entry.endswith('.yaml')])
+    fields = tuple(field.strip() for field in fields.split(',') if field.strip())
+    unknown = [field for field in fields if field not in FIELDS]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown fields {unknown}. The possible fields are in {list(FIELDS)}")
+    return fields
 
 ############################################################################
 @api_routes.get("/")
@@ -77,30 +110,56 @@ def home():
 class ResponseModelGetYAML(BaseModel):
     success: bool= True
     content: dict= {}
+    total: Optional[int] = None
 
 @api_routes.get("/yaml/all", response_model=ResponseModelGetYAML)
-def get_all_stored_yaml():
+def get_all_stored_yaml(prefix:str=Query("", description="Only the file names starting with prefix", example="SimpleTrade"),
+                        offset:int=Query(0, ge=0, description="Index of the first file (in the sorted file names)"),
+                        limit:Optional[int]=Query(None, ge=0, description="Max number of files (all by default)")):
     """Get all existing YAML files stored in the server.
 
+    Args:
+        
+        prefix (str, optional): Only the file names starting with prefix. Defaults to "".
+        
+        offset (int, optional): Index of the first file. Defaults to 0.
+        
+        limit (int, optional): Max number of files. Defaults to None (all the files).
+
     Returns:
         
-        _type_: JSON with success (bool) as key and the YAML description as value.
+        _type_: JSON with success (bool) as key, the YAML description of the page as value and the total number of matching files.
     """
-    data = getYAMLFiles(yaml_path_dir) | getYAMLFiles(users_path_dir)
-    return { "success": True, "content": data }
+    entries, total = list_entries([yaml_path_dir, users_path_dir], prefix, offset, limit)
+    data = dict([(entry.name, project(entry, ('content',))['content']) for entry in entries])
+    return { "success": True, "content": data, "total": total }
 
 ############################################################################
 ### to use: https://.../yaml/filenames to have the filenamne of the static/yaml files
 @api_routes.get("/yaml/filenames", response_model=ResponseModelGetYAML)
-def get_stored_yaml_filenames():
+def get_stored_yaml_filenames(fields:tuple=Depends(validate_fields),
+                              prefix:str=Query("", description="Only the file names starting with prefix", example="SimpleTrade"),
+                              offset:int=Query(0, ge=0, description="Index of the first file (in the sorted file names)"),
+                              limit:Optional[int]=Query(None, ge=0, description="Max number of files (all by default)")):
     """Get all existing YAML file names stored in the server.
 
+    Args:
+        
+        fields (str, optional): Comma separated fields of the files (last modified, size, mtime, hash, blocks, content). Defaults to "last modified,size".
+        
+        prefix (str, optional): Only the file names starting with prefix. Defaults to "".
+        
+        offset (int, optional): Index of the first file. Defaults to 0.
+        
+        limit (int, optional): Max number of files. Defaults to None (all the files).
+
     Returns:
         
-        _type_: JSON with success (bool) as key and the list of the YAML file names as value.
+        _type_: JSON with success (bool) as key, the YAML file names of the page with their fields as value and the total number of matching files.
     """
-    data = getYAMLFilenames()
-    return { "success": True, "content": data }
+    entries, total = list_entries([users_path_dir], prefix, offset, limit)
+    data = dict([(entry.name, project(entry, fields)) for entry in entries])
+    return { "success": True, "content": data, "total": total }
 
 ############################################################################
 ### to use: https://.../yaml/SimpleTradeWithPredictions.yaml to have the description of SimpleTradeWithPredictions.yaml
@@ -152,9 +211,10 @@ def get_yaml_models_description(filename:str = Depends(validate_filename), model
         
         _type_: The list of the model names included in the model.
     """
-    args = ['-blockargs', str(model)] if model else ['-blockslist']
     path = yaml_path_dir if os.path.exists(os.path.join(yaml_path_dir, filename)) else users_path_dir
-    return execute_cmd(os.path.join(path, filename), args)
+    ### answered from the in-process cache of the YAML files (no devsimpy-nogui subprocess)
+    yaml_filename_path = os.path.join(path, filename)
+    return get_block_args(yaml_filename_path, str(model)) if model else get_blocks_list(yaml_filename_path)
 
 ############################################################################
 ### POST body (mode raw et type JSON) example:
@@ -204,12 +264,11 @@ async def update_yaml_file(request_data: UpdateYAMLQueryParam):
         source_file = os.path.join(yaml_path_dir,request_data.filename)
         destination_file = yaml_filename_path
         shutil.copy(source_file, destination_file)
+        get_catalog(users_path_dir).invalidate()
 
-    args = [
-        '-blockargs', str(request_data.model),
-        '-updateblockargs', str(request_data.args).replace("'", '"')
-    ]
-    return execute_cmd(yaml_filename_path, args)
+    output = update_block_args(yaml_filename_path, str(request_data.model), request_data.args)
+    get_catalog(os.path.dirname(yaml_filename_path)).invalidate()
+    return output
 
 ############################################################################
 ### to use: /yaml/upload
@@ -237,6 +296,7 @@ async def upload_yaml(file: UploadFile = File(..., description="YAML file to upl
     
     ### upload in the yaml dir
     file_path = save_uploaded_file(yaml_path_dir, file)
+    get_catalog(yaml_path_dir).invalidate()
     return {"success":True, "message": "File uploaded successfully", "file_path": file_path}
 
 ############################################################################
@@ -246,7 +306,17 @@ async def upload_yaml(file: UploadFile = File(..., description="YAML file to upl
 async def start_simulation(userid: str = Query("", title="User ID", description="ID of the user that wants to execute a simulation", example="jhon"),
                          duration: str = Query(..., title="Duration of the simulation", description="Duration of the simulation (ntl, inf or a digit is possible)", example="ntl"),
                          filename: str = Depends(validate_filename),
-                         tag: str = Query("", title="Tag", description="Meta data related to the app used by a user that requests the simulation", example="MyApp")):
+                         tag: str = Query("", title="Tag", description="Meta data related to the app used by a user that requests the simulation", example="MyApp"),
+                         max_wall: Optional[float] = Query(None, gt=0, description="Max wall clock time of the simulation (in s)"),
+                         max_events: Optional[int] = Query(None, gt=0, description="Max number of events of the simulation"),
+                         max_time: Optional[float] = Query(None, ge=0, description="Max simulation time"),
+                         max_rss: Optional[float] = Query(None, gt=0, description="Max resident memory of the simulation (in MB)"),
+                         checkpoint: bool = Query(False, description="Save a checkpoint of the simulation when it is stopped (and periodically)"),
+                         checkpoint_period: Optional[float] = Query(None, gt=0, description="Period of the checkpoints of the simulation (in s)"),
+                         checkpoint_at: Optional[float] = Query(None, ge=0, description="Simulation time of a checkpoint of the simulation"),
+                         resume: Optional[str] = Query(None, description="ID of the simulation whose checkpoint is resumed"),
+                         profile_models: bool = Query(False, description="Profile the functions and the messages of the atomic models (model_profile table in the report)"),
+                         profile: bool = Query(False, description="Profile the simulation with cProfile (see /simulation/{sim_id}/profile)")):
     """
     Start a simulation from a <filename> YAML model for <duration> simulation cycle.
     Warning: if userid is not empty, the filename userid_filename must exist. This endpoint dont create user file. For that, please use the /yaml/update/ endpoint. 
@@ -259,15 +329,64 @@ async def start_simulation(userid: str = Query("", title="User ID", description=
         filename (str): YAML file name corresponding to the model to simulate.
         
         tag (str): Meta data related to the app used by a user that requests the simulation.
+        
+        max_wall, max_events, max_time, max_rss (optional): Budgets of the simulation. It is stopped when one of them is exceeded (see termination_reason in the report).
+
+        checkpoint, checkpoint_period, checkpoint_at (optional): Checkpoints of the simulation, saved with its ID (see checkpoint in the report).
+
+        resume (str optional): ID of the simulation whose checkpoint is resumed (same model with possibly other args).
+
+        profile_models (bool optional): Calls, wall clock and CPU times of the functions of each atomic model and messages by port (model_profile in the report).
+
+        profile (bool optional): cProfile stats of the simulation served by /simulation/{sim_id}/profile (kept SIM_PROFILE_TTL seconds).
 
     Returns:
         
-        dict: simulation ID.
+        dict: simulation ID, cache_hit flag and the result of the simulation if it was cached.
     """
     yaml_filename_path = os.path.join(users_path_dir if userid else yaml_path_dir, userid+'_'+filename if userid else filename)
-    sim = create_sim.delay(str(yaml_filename_path), str(duration), str(userid))
 
-    return {"sim_id": sim.id}
+    budget = dict((name, value) for name, value in (('max_wall', max_wall), ('max_events', max_events), ('max_time', max_time), ('max_rss', max_rss)) if value is not None)
+    checkpoints = get_checkpoint_args(checkpoint, checkpoint_period, checkpoint_at, resume)
+
+    ### the result of the same (deterministic) simulation is returned immediately if it is in the cache (not for the checkpoints and the profiles)
+    ### the YAML file is loaded (and the model files hashed) in a thread to not block the event loop
+    cache_key = None if checkpoints or profile_models or profile else await run_in_threadpool(get_cache_key, yaml_filename_path, duration, budget=budget)
+    cached = get_cached_result(cache_key)
+    metrics.inc('devsimpy_simulation_requests_total', route="start", cache_hit=str(bool(cached)).lower())
+    if cached:
+        return {"sim_id": cached.pop('sim_id', None), "cache_hit": True, "sim_result": cached}
+
+    ### routed to the lane of its duration with the fair-share priority of the user and of the tag
+    sim = submit_sim(yaml_filename_path, duration, userid, tag, cache_key=cache_key, budget=budget, checkpoint=checkpoints, profile_models=profile_models, profile=profile)
+
+    return {"sim_id": sim.id, "cache_hit": False}
+
+def get_cache_key(yaml_filename_path:str, duration:str, overrides:dict=None, budget:dict=None)->str:
+    """Get the key of the simulation in the result cache (None if the YAML file can not be loaded).
+    """
+    try:
+        return result_cache.make_key(yaml_cache.get(yaml_filename_path), duration, overrides, budget=budget)
+    except Exception:
+        return None
+
+def get_checkpoint_args(save:bool=False, period:float=None, at:float=None, resume:str=None)->dict:
+    """Get the checkpoint args of a simulation (None if it has no checkpoint). The resumed checkpoint must exist.
+    """
+    if resume:
+        if not re.match(r'^[\w-]+$', resume) or not os.path.exists(get_checkpoint_path(resume)):
+            raise HTTPException(status_code=404, detail="Checkpoint not found!")
+
+    args = dict((name, value) for name, value in (('save', save), ('period', period), ('at', at), ('resume', resume)) if value not in (None, False, ""))
+    return args or None
+
+def get_cached_result(cache_key:str)->dict:
+    """Get the result of the simulation from the result cache (None if it is not cached or if the cache is not available).
+    """
+    try:
+        return result_cache.get(cache_key) if cache_key else None
+    except RedisError:
+        return None
 
 ############################################################################
 ### to use: /simulation/d2ad4871-5218-4c58-bd24-ec6201c5149b/status
@@ -296,6 +415,66 @@ async def get_simulation_status(sim_id:str):
     }
     return result
 
+############################################################################
+### to use: /simulation/d2ad4871-5218-4c58-bd24-ec6201c5149b/stream
+@api_routes.get("/simulation/{sim_id}/stream")
+async def stream_simulation(sim_id:str, last_event_id:str = Header(default="0")):
+    """
+    Stream the progress and the collectors outputs of a simulation while it runs (Server-Sent Events).
+
+    Args:
+        
+        sim_id (str): ID of the simulation to watch.
+        
+        last_event_id (str): ID of the last event received (Last-Event-ID header sent by the reconnecting clients).
+
+    Returns:
+        
+        StreamingResponse: text/event-stream with one event per frame (progress, output, report) and a last end event.
+    """
+    events = read_events(sim_id, last_event_id, is_ready=lambda: is_sim_ready(sim_id))
+    return StreamingResponse(events, media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+############################################################################
+### to use: /simulation/d2ad4871-5218-4c58-bd24-ec6201c5149b/profile?format=collapsed
+@api_routes.get("/simulation/{sim_id}/profile")
+def get_simulation_profile(sim_id:str,
+                           format:str = Query("collapsed", regex="^(collapsed|text|pstats)$", description="collapsed (flamegraph stacks), text (pstats report) or pstats (binary file)"),
+                           sort:str = Query("cumulative", description="Sort key of the text report (see pstats.Stats.sort_stats)", example="tottime"),
+                           limit:int = Query(50, gt=0, description="Number of functions of the text report")):
+    """
+    Get the cProfile stats of a simulation started with profile=true.
+
+    Args:
+        
+        sim_id (str): ID of the simulation.
+
+        format (str): collapsed stacks ('f1;f2;...;fn microseconds' lines for flamegraph.pl, speedscope or inferno), text report of pstats or pstats file (pstats.Stats).
+
+        sort (str): Sort key of the text report.
+
+        limit (int): Number of functions of the text report.
+
+    Returns:
+        
+        The collapsed stacks or the text report (text/plain) or the pstats file.
+    """
+    path = profiles.get_profile_path(sim_id)
+    if not re.match(r'^[\w-]+$', sim_id) or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Profile not found!")
+
+    if format == 'pstats':
+        return FileResponse(path, media_type="application/octet-stream", filename=f"{sim_id}{profiles.PROFILE_EXT}")
+
+    try:
+        if format == 'text':
+            return PlainTextResponse(profiles.get_text(path, sort, limit))
+        return PlainTextResponse(profiles.get_collapsed(path))
+    except KeyError:
+        raise HTTPException(status_code=422, detail=f"Unknown sort key {sort}!")
+    except Exception:
+        raise HTTPException(status_code=404, detail="Profile not readable!")
+
 ############################################################################
 @api_routes.get("/simulation/{sim_id}/cancel/")
 async def cancel_simulation(sim_id:str):
@@ -310,10 +489,241 @@ async def cancel_simulation(sim_id:str):
         
         dict: Confirmation about the canceled simulation.
     """
-    AsyncResult(sim_id).revoke(terminate=True)
+    ### the running simulation is stopped cooperatively (its finish() hooks are called and its partial results are kept
+    ### with the CANCELLED status) and the queued one will not start
+    try:
+        request_cancel(sim_id)
+    except RedisError:
+        raise HTTPException(status_code=503, detail="Cancellation service not available!")
+    AsyncResult(sim_id).revoke()
 
     result = {
         "sim_id": sim_id,
         "canceled": True,
     }
     return result
+
+############################################################################
+### POST body (mode raw et type JSON) example:
+### {"filename":"SimpleTrade.yaml", "duration":"100", "grid":{"Env":{"cash":[1000,10000]}}}
+### {"filename":"SimpleTrade.yaml", "duration":"100", "runs":[{"Env":{"cash":1000}}, {"Env":{"cash":10000,"M":2}}]}
+
+### max number of simulations of a batch
+BATCH_MAX_RUNS = int(os.environ.get("BATCH_MAX_RUNS", 1000))
+
+class BatchQueryParam(BaseModel):
+    userid: str = ""
+    tag: str = ""
+    filename: str = "SimpleTradeWithPredictions.yaml"
+    duration: str = "10"
+    runs: List[Dict[str, dict]] = []
+    grid: Dict[str, Dict[str, list]] = {}
+    resume: str = ""
+
+    @validator("filename")
+    def validate_filename(cls, value):
+        if not (value.endswith(".yaml") and (os.path.exists(os.path.join(yaml_path_dir,value)) or os.path.exists(os.path.join(users_path_dir,value)))):
+            raise ValueError(f"Filename must exist in {yaml_path_dir} or {users_path_dir} and end with '.yaml'")
+        return value
+
+def expand_grid(grid:dict)->list:
+    """Get the overrides ({label:{arg:val}}) of all the combinations of the values of the grid ({label:{arg:[val1, val2...]}}).
+    """
+    keys = [(label, arg) for label, args in grid.items() for arg in args]
+    runs = []
+    for values in itertools.product(*[grid[label][arg] for label, arg in keys]):
+        overrides = {}
+        for (label, arg), val in zip(keys, values):
+            overrides.setdefault(label, {})[arg] = val
+        runs.append(overrides)
+    return runs
+
+def check_overrides(yaml_filename_path:str, runs:list)->None:
+    """Check that the blocks and the args of the overrides of the runs exist in the YAML file.
+
+    Raises:
+
+        HTTPException: a block or an arg of a run is unknown (422).
+    """
+    blocks = get_blocks_list(yaml_filename_path)
+    if not blocks['success']:
+        raise HTTPException(status_code=422, detail=blocks['info'])
+    labels = json.loads(blocks['output'])
+
+    block_args = {}
+    for overrides in runs:
+        for label, new_args in overrides.items():
+            if label not in labels:
+                raise HTTPException(status_code=422, detail=f"Model {label} must belong to the list {labels}")
+            if label not in block_args:
+                block_args[label] = json.loads(get_block_args(yaml_filename_path, label)['output'])
+            unknown = [arg for arg in new_args if arg not in block_args[label]]
+            if unknown:
+                raise HTTPException(status_code=422, detail=f"Parameters {unknown} of {label} must belong to the list {list(block_args[label])}")
+
+@api_routes.post("/simulation/batch")
+async def start_batch(request_data: BatchQueryParam):
+    """
+    Start a batch of simulations of the same YAML model with different args of its blocks (parameter sweep).
+    The args are changed in memory by the worker for each simulation (the YAML file is not modified).
+
+    Args:
+        
+        userid (str): ID of the user that requests the simulations.
+        
+        tag (str): Meta data related to the app used by a user that requests the simulations.
+        
+        filename (str): YAML file name corresponding to the model to simulate.
+        
+        duration (str): Duration of the simulations.
+        
+        runs (list): Args of the blocks of each simulation ([{label:{arg:val}}, ...]).
+        
+        grid (dict): Values of the args of the blocks ({label:{arg:[val1, val2, ...]}}) to combine (one simulation per combination).
+
+        resume (str): ID of the simulation whose checkpoint is resumed by all the simulations (common prefix of the sweep).
+
+    Returns:
+        
+        dict: batch ID, simulation IDs and args of the simulations.
+    """
+    runs = request_data.runs + (expand_grid(request_data.grid) if request_data.grid else [])
+
+    if not runs:
+        runs = [{}]
+
+    if len(runs) > BATCH_MAX_RUNS:
+        raise HTTPException(status_code=422, detail=f"Too many simulations in the batch ({len(runs)} > {BATCH_MAX_RUNS})")
+
+    path = yaml_path_dir if os.path.exists(os.path.join(yaml_path_dir, request_data.filename)) else users_path_dir
+    yaml_filename_path = os.path.join(path, request_data.filename)
+
+    ### a bad block or arg is rejected before the simulations are queued (the YAML file is loaded in a thread)
+    await run_in_threadpool(check_overrides, yaml_filename_path, runs)
+
+    ### the simulations start from the checkpoint of their common prefix (the args changed since are kept)
+    checkpoints = get_checkpoint_args(resume=request_data.resume)
+
+    ### the priority of the i-th simulation of the batch is the one of the user with i more simulations in flight
+    batch = group(batch_signatures(yaml_filename_path, request_data.duration, runs, request_data.userid, request_data.tag, checkpoint=checkpoints)).apply_async()
+    ### to restore the batch from its ID (see /simulation/batch/{batch_id}/status)
+    batch.save()
+    metrics.inc('devsimpy_simulation_requests_total', len(runs), route="batch", cache_hit="false")
+
+    for sim in batch.results:
+        record_submission(sim.id, request_data.userid, request_data.tag)
+
+    return {"batch_id": batch.id, "sim_ids": [sim.id for sim in batch.results], "runs": runs}
+
+def get_batch(batch_id:str)->GroupResult:
+    """Get the batch of simulations from its ID.
+    """
+    batch = GroupResult.restore(batch_id, app=celery)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found!")
+    return batch
+
+############################################################################
+### to use: /simulation/batch/d2ad4871-5218-4c58-bd24-ec6201c5149b/status
+@api_routes.get("/simulation/batch/{batch_id}/status")
+async def get_batch_status(batch_id:str):
+    """
+    Get the status of a batch of simulations.
+
+    Args:
+        
+        batch_id (str): ID of the batch to retrieve.
+
+    Returns:
+        
+        dict: Information about the batch, including its ID, its aggregated status, the number of completed simulations and the status and result of each simulation.
+    """
+    batch = get_batch(batch_id)
+
+    runs = [{"sim_id": sim.id, "sim_status": sim.status, "sim_result": sim.result if sim.status in ("SUCCESS", "CANCELLED") else None} for sim in batch.results]
+    status = [run["sim_status"] for run in runs]
+
+    ### the batch is CANCELLED or FAILURE only once all its runs are in a final state (CANCELLED included)
+    if all(s == "SUCCESS" for s in status):
+        batch_status = "SUCCESS"
+    elif all(s in SIM_READY_STATES for s in status):
+        batch_status = "CANCELLED" if "REVOKED" in status or "CANCELLED" in status else "FAILURE"
+    elif all(s == "PENDING" for s in status):
+        batch_status = "PENDING"
+    else:
+        batch_status = "STARTED"
+
+    result = {
+        "batch_id": batch_id,
+        "batch_status": batch_status,
+        "completed": batch.completed_count(),
+        "total": len(runs),
+        "runs": runs,
+    }
+    return result
+
+############################################################################
+@api_routes.get("/simulation/batch/{batch_id}/cancel")
+async def cancel_batch(batch_id:str):
+    """
+    Cancel all the simulations of a batch.
+
+    Args:
+        
+        batch_id (str): ID of the batch to cancel.
+
+    Returns:
+        
+        dict: Confirmation about the canceled batch.
+    """
+    batch = get_batch(batch_id)
+
+    ### same cooperative cancellation as /simulation/{sim_id}/cancel/ for each simulation
+    try:
+        for sim in batch.results:
+            request_cancel(sim.id)
+    except RedisError:
+        raise HTTPException(status_code=503, detail="Cancellation service not available!")
+    batch.revoke()
+
+    result = {
+        "batch_id": batch_id,
+        "canceled": True,
+    }
+    return result
+
+############################################################################
+### to use: /simulation/queues
+@api_routes.get("/simulation/queues")
+async def get_simulation_queues():
+    """
+    Get the depth and the waiting time of the simulation lanes (short and long simulations) to size the workers.
+
+    Returns:
+        
+        dict: For each lane, the number of waiting simulations (by priority) and the statistics (mean, p50, p95, max) of the waiting times (in s) of the recent simulations.
+    """
+    try:
+        lanes = get_lanes_stats()
+    except RedisError:
+        raise HTTPException(status_code=503, detail="Queue statistics not available!")
+
+    return {"success": True, "lanes": lanes}
+
+############################################################################
+### to use: /metrics (scraped by Prometheus)
+@api_routes.get("/metrics")
+def get_metrics():
+    """
+    Get the operational metrics of the API and of the workers in the Prometheus text format (see api.metrics).
+
+    Returns:
+        
+        PlainTextResponse: queue depths, task wait and run times, subprocess spawn, YAML load and DEVS instantiation times, events/sec, result sizes and counters of the simulations.
+    """
+    try:
+        text = metrics.render()
+    except RedisError:
+        raise HTTPException(status_code=503, detail="Metrics not available!")
+
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -21,6 +21,7 @@ GET requests:
 
 * **/yaml/all** to have all static/yaml files description 
 * **/yaml/filenames** to have the filenamne of the static/yaml files
+* **/yaml/all** and **/yaml/filenames** accept *prefix*, *offset* and *limit* query params (pagination) and **/yaml/filenames** a *fields* one (ex. fields=size,hash,blocks)
 * **/yaml/<filename>.yaml** to have the description of filename.yaml
 * **/yaml/labels/<filename>.yaml** gives the filename.yaml file content
 * **/yaml/labels/**?filename=*filename.yaml*&model=*name* gives the name model inside the filename.yaml file
@@ -35,6 +36,11 @@ POST request:
 * **/simulation/start/**?filename=*filename.yaml*&duration=*d* to simulate the file name YAML file during d simulation step
 * **/simulation/start/**?filename=*filename.yaml*&duration=*d*&userid=*john* to simulate the file name YAML file during d simulation step with an user id john
 * **/simulation/status/d2ad4871-5218-4c58-bd24-ec6201c5149b** gives the status of the simulation d2ad4871-5218-4c58-bd24-ec6201c5149b (PENDING, SUCCESS, FAILED)
+* **/simulation/batch** (POST) starts a batch of simulations of the same YAML model with different args of its blocks {"filename":"*filename.yaml*", "duration":"*d*", "grid":{"*name*":{*"arg":[val1, val2]*}}} or {..., "runs":[{"*name*":{*"arg":val*}}]}
+* **/simulation/batch/<batch_id>/status** and **/simulation/batch/<batch_id>/cancel** give the aggregated status of the batch (with the result of each simulation) and cancel all its simulations
+* **/simulation/queues** gives the depth and the waiting times of the short and long simulation lanes
+* **/metrics** gives the operational metrics of the API and of the workers (queue depths, wait and run times, events/sec...) in the Prometheus text format
+* **/simulation/d2ad4871-5218-4c58-bd24-ec6201c5149b/stream** streams the progress and the outputs of the simulation d2ad4871-5218-4c58-bd24-ec6201c5149b while it runs (Server-Sent Events)
 """
 
 def create_app():
@@ -0,0 +1,133 @@
+"""
+Operational metrics of the API and of the workers (Prometheus text format)
+
+The workers (and the API) add their observations to Redis hashes (one metrics:<name> hash by metric, HINCRBY and
+HINCRBYFLOAT in a pipeline), so the counters of all the processes are aggregated without another service and
+/metrics renders them in the Prometheus text exposition format. A histogram keeps its cumulative buckets, sum and
+count by label set in the fields '<le>|<labels>', 'sum|<labels>' and 'count|<labels>'. The queue depths are gauges
+read from the lanes when /metrics is scraped (see api.scheduling).
+
+The metrics are best effort: an observation that can not be recorded (Redis not available) is dropped.
+
+"""
+import redis
+
+from api.config import redis_url
+from api import scheduling
+
+METRICS_PREFIX = "metrics:"
+
+### buckets of the histograms
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+SPAWN_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+RATE_BUCKETS = (10.0, 100.0, 1e3, 1e4, 1e5, 1e6, 1e7)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+
+### name: (type, help, buckets of the histograms)
+METRICS = {
+    'devsimpy_task_wait_seconds': ('histogram', "Time between the submission and the start of a simulation task.", TIME_BUCKETS),
+    'devsimpy_task_run_seconds': ('histogram', "Run time of a simulation task.", TIME_BUCKETS),
+    'devsimpy_subprocess_spawn_seconds': ('histogram', "Time to spawn the devsimpy-nogui process of a simulation (subprocess mode).", SPAWN_BUCKETS),
+    'devsimpy_yaml_load_seconds': ('histogram', "Time to load the YAML file of a simulation.", TIME_BUCKETS),
+    'devsimpy_devs_instance_seconds': ('histogram', "Time to make the DEVS instance of a simulation (Diagram.makeDEVSInstance).", TIME_BUCKETS),
+    'devsimpy_simulation_events_per_second': ('histogram', "Events (simulation steps) per second of a simulation.", RATE_BUCKETS),
+    'devsimpy_result_bytes': ('histogram', "Size of the result payload of a simulation.", SIZE_BUCKETS),
+    'devsimpy_simulation_events_total': ('counter', "Events (simulation steps) of the simulations.", None),
+    'devsimpy_simulations_total': ('counter', "Simulations run by the workers by status.", None),
+    'devsimpy_simulation_requests_total': ('counter', "Simulations requested to the API (cache hits included).", None),
+}
+
+_client = None
+
+def client()->redis.Redis:
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(redis_url)
+    return _client
+
+def metric_key(name:str)->str:
+    return METRICS_PREFIX + name
+
+def format_labels(labels:dict)->str:
+    return ','.join(f'{k}="{str(v)}"' for k, v in sorted(labels.items()))
+
+def format_value(value:float)->str:
+    return repr(float(value)) if value != float('inf') else '+Inf'
+
+def observe(name:str, value:float, **labels)->bool:
+    """Add the value to the histogram name (with labels).
+
+    Returns:
+
+        bool: False if the value can not be recorded.
+    """
+    kind, description, buckets = METRICS[name]
+    fields = format_labels(labels)
+    key = metric_key(name)
+    try:
+        with client().pipeline(transaction=False) as pipe:
+            for le in buckets:
+                if value <= le:
+                    pipe.hincrby(key, f"{format_value(le)}|{fields}", 1)
+            pipe.hincrby(key, f"+Inf|{fields}", 1)
+            pipe.hincrby(key, f"count|{fields}", 1)
+            pipe.hincrbyfloat(key, f"sum|{fields}", value)
+            pipe.execute()
+    except redis.RedisError:
+        return False
+    return True
+
+def inc(name:str, value:float=1, **labels)->bool:
+    """Increment the counter name (with labels).
+
+    Returns:
+
+        bool: False if the value can not be recorded.
+    """
+    try:
+        client().hincrbyfloat(metric_key(name), format_labels(labels), value)
+    except redis.RedisError:
+        return False
+    return True
+
+def sample(name:str, labels:str, value)->str:
+    return f"{name}{{{labels}}} {value}" if labels else f"{name} {value}"
+
+def render()->str:
+    """Render the metrics in the Prometheus text format (raise RedisError if Redis is not available).
+    """
+    r = client()
+    with r.pipeline(transaction=False) as pipe:
+        for name in METRICS:
+            pipe.hgetall(metric_key(name))
+        values = dict(zip(METRICS, pipe.execute()))
+
+    lines = []
+    for name, (kind, description, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        fields = dict((k.decode('utf-8'), v.decode('utf-8')) for k, v in values[name].items())
+        if kind == 'counter':
+            for labels, value in sorted(fields.items()):
+                lines.append(sample(name, labels, format_value(value)))
+            continue
+        for labels in sorted(f.split('|', 1)[1] for f in fields if f.startswith('count|')):
+            for le in [format_value(le) for le in buckets] + ['+Inf']:
+                bucket_labels = ','.join(l for l in (labels, f'le="{le}"') if l)
+                lines.append(sample(f"{name}_bucket", bucket_labels, fields.get(f"{le}|{labels}", 0)))
+            lines.append(sample(f"{name}_sum", labels, format_value(fields.get(f"sum|{labels}", 0))))
+            lines.append(sample(f"{name}_count", labels, fields[f"count|{labels}"]))
+
+    ### depth of the lanes by priority (see /simulation/queues)
+    name = 'devsimpy_queue_depth'
+    lines.append(f"# HELP {name} Simulation tasks waiting in a lane by priority.")
+    lines.append(f"# TYPE {name} gauge")
+    with r.pipeline(transaction=False) as pipe:
+        keys = [(lane, priority, key) for lane in scheduling.LANES for priority, key in scheduling.queue_keys(lane).items()]
+        for lane, priority, key in keys:
+            pipe.llen(key)
+        depths = pipe.execute()
+    for (lane, priority, key), depth in zip(keys, depths):
+        lines.append(sample(name, format_labels({'lane': lane, 'priority': priority}), depth))
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,187 @@
+"""
+In-process access to devsimpy-nogui
+
+"""
+import contextlib
+import importlib
+import io
+import json
+import os
+import runpy
+import sys
+import threading
+import traceback
+
+from api.config import devsimpy_nogui
+from api.catalog import file_hash
+
+devsimpy_nogui_dir = os.path.dirname(devsimpy_nogui)
+
+### the devsimpy-nogui modules are importable (after the api ones)
+if devsimpy_nogui_dir not in sys.path:
+    sys.path.append(devsimpy_nogui_dir)
+
+import ResultChannel
+import ControlChannel
+from ResultChannel import FrameReader
+
+### modules imported once for all by a warm process (the heavy part of a devsimpy-nogui startup)
+WARM_MODULES = ('Container', 'SimulationNoGUI', 'Patterns.Strategy', 'Patterns.Factory', 'DEVSKernel.PyDEVS.simulator')
+
+_lock = threading.Lock()
+_warm = False
+
+def is_warm()->bool:
+    """Return True if the devsimpy-nogui modules are already loaded in the current process.
+    """
+    return _warm
+
+def warm_up()->bool:
+    """Load the devsimpy-nogui builtins and modules in the current process.
+
+    The devsimpy-nogui.py script is executed without its __main__ block, so only its
+    builtins and imports are performed.
+
+    Returns:
+
+        bool: True if the process is warm.
+    """
+    global _warm
+
+    with _lock:
+        if not _warm:
+            argv = sys.argv
+            try:
+                runpy.run_path(devsimpy_nogui, run_name='devsimpy_nogui')
+            finally:
+                sys.argv = argv
+
+            for module in WARM_MODULES:
+                importlib.import_module(module)
+
+            _warm = True
+
+    return _warm
+
+def execute(yaml_filename:str, args:list, on_frame=None, on_start=None)->dict:
+    """Execute devsimpy-nogui with args on the yaml file in the current process.
+
+    The stdout and stderr are captured like with the subprocess (see api.worker.execute_cmd)
+    and the simulation threads are joined like the interpreter does at exit.
+
+    Args:
+
+        yaml_filename (str): YAML file to execute with devsimpy-nogui
+
+        args (list): Params passed to the devsimpy-nogui.
+
+        on_frame (callable, optional): Called with each frame of the result channel. Defaults to None (no channel).
+
+        on_start (callable, optional): Called with the function that cancels the simulation when it starts. Defaults to None.
+
+    Returns:
+
+        dict: including the result of the execution (same format as api.worker.execute_cmd).
+    """
+    warm_up()
+
+    argv = sys.argv
+    buffer = io.StringIO()
+    threads = set(threading.enumerate())
+    success = True
+
+    if on_frame:
+        ResultChannel.open_channel(ResultChannel.FrameSink(on_frame))
+
+    ### the control channel is the ControlChannel module itself (no pipe in the same process)
+    ControlChannel.reset()
+    if on_start:
+        on_start(ControlChannel.cancel)
+
+    try:
+        sys.argv = [devsimpy_nogui, yaml_filename] + [str(a) for a in args]
+        with contextlib.redirect_stdout(buffer), contextlib.redirect_stderr(buffer):
+            try:
+                runpy.run_path(devsimpy_nogui, run_name='__main__')
+            finally:
+                for thread in threading.enumerate():
+                    if thread not in threads and not thread.daemon:
+                        thread.join()
+    except SystemExit as info:
+        success = info.code in (None, 0)
+    except Exception:
+        buffer.write(traceback.format_exc())
+        success = False
+    finally:
+        sys.argv = argv
+        ResultChannel.close_channel()
+
+    output = buffer.getvalue().encode('utf-8')
+
+    if success:
+        return {'success': True, 'output': output, "info": ""}
+    else:
+        return {'success': False, 'output': "", "info": str(output)}
+
+def load_yaml_index(yaml_filename:str)->dict:
+    """Load the YAML file in the current process and extract its blocks and their args.
+
+    Args:
+
+        yaml_filename (str): YAML file to load.
+
+    Returns:
+
+        dict: with 'blocks' (list of the block labels as given by -blockslist), 'args' (dict of the -blockargs JSON of each block),
+        'hash' (sha256 of the content of the file with the couplings) and 'sources' (model file of each block, see api.result_cache).
+    """
+    warm_up()
+
+    from InteractionYAML import YAMLHandler
+
+    with _lock:
+        yamlHandler = YAMLHandler(yaml_filename)
+
+    if yamlHandler.filename_is_valid != True:
+        raise ValueError(f"ERROR: {yaml_filename} is invalid!\n")
+
+    blocks = yamlHandler.getYAMLBlockModelsList()
+    args = {label: json.dumps(yamlHandler.getYAMLBlockModelArgs(label), default=ResultChannel.serialize) for label in blocks}
+    ### the .amd archive of the block (python file included) or its python file
+    sources = {}
+    for block in yamlHandler.diagram.GetFlatCodeBlockShapeList():
+        model_path = getattr(block, 'model_path', '')
+        sources[str(block.label)] = model_path if model_path and os.path.isfile(model_path) else getattr(block, 'python_path', '')
+
+    return {'blocks': json.dumps(blocks), 'args': args, 'hash': file_hash(yaml_filename), 'sources': sources}
+
+def update_yaml_block_args(yaml_filename:str, label:str, new_args:dict)->dict:
+    """Update (and save) the args of the block label of the YAML file in the current process.
+
+    Args:
+
+        yaml_filename (str): YAML file to update.
+
+        label (str): Label of the block.
+
+        new_args (dict): New values of the args.
+
+    Returns:
+
+        dict: the update report of InteractionYAML.YAMLHandler.setYAMLBlockModelArgs.
+    """
+    warm_up()
+
+    from InteractionYAML import YAMLHandler
+
+    with _lock:
+        yamlHandler = YAMLHandler(yaml_filename)
+
+        if yamlHandler.filename_is_valid != True:
+            raise ValueError(f"ERROR: {yaml_filename} is invalid!\n")
+
+        models_list = yamlHandler.getYAMLBlockModelsList()
+        if label not in models_list:
+            raise ValueError(f"ERROR: Model must belong to the list {models_list}\n")
+
+        return yamlHandler.setYAMLBlockModelArgs(label, new_args)
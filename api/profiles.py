@@ -0,0 +1,131 @@
+"""
+cProfile stats of the simulations
+
+A simulation started with profile=true writes the cProfile stats of its simulation thread in
+SIM_PROFILE_DIR/<sim_id>.prof (see devsimpy-nogui -profile and Decorators.hotshotit). The API serves the pstats file,
+its text report and the collapsed stacks built from it (one 'f1;f2;...;fn weight' line per stack, the input format of
+flamegraph.pl, speedscope or inferno). The profiles are removed after SIM_PROFILE_TTL seconds and the oldest ones
+beyond SIM_PROFILE_MAX_BYTES (at the start of each profiled simulation).
+
+"""
+import io
+import os
+import pstats
+import time
+
+from api.config import profiles_path_dir
+
+### time (in s) during which a profile is kept
+SIM_PROFILE_TTL = int(os.environ.get("SIM_PROFILE_TTL", 24*3600))
+### max size (in bytes) of all the profiles
+SIM_PROFILE_MAX_BYTES = int(os.environ.get("SIM_PROFILE_MAX_BYTES", 256*1024*1024))
+
+PROFILE_EXT = ".prof"
+### max depth of the collapsed stacks (the deeper calls are added to the last frame)
+MAX_STACK_DEPTH = 256
+### min time (in s) of a collapsed stack (the shorter calls are added to their caller)
+MIN_STACK_TIME = 1e-6
+
+def get_profile_path(sim_id:str)->str:
+    """Get the profile file of the simulation.
+    """
+    return os.path.join(profiles_path_dir, f"{sim_id}{PROFILE_EXT}")
+
+def cleanup(ttl:int=SIM_PROFILE_TTL, max_bytes:int=SIM_PROFILE_MAX_BYTES, now:float=None)->int:
+    """Remove the expired profiles and the oldest ones beyond max_bytes.
+
+    Returns:
+
+        int: number of removed profiles.
+    """
+    now = time.time() if now is None else now
+    profiles = []
+    try:
+        entries = list(os.scandir(profiles_path_dir))
+    except OSError:
+        return 0
+    for entry in entries:
+        if entry.name.endswith(PROFILE_EXT):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            profiles.append((stat.st_mtime, stat.st_size, entry.path))
+
+    ### the newest first: the oldest ones are removed when the total size is exceeded
+    profiles.sort(reverse=True)
+    removed = 0
+    total = 0
+    for mtime, size, path in profiles:
+        total += size
+        if now - mtime > ttl or total > max_bytes:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+def frame_name(func:tuple)->str:
+    """Name of the frame of the function (filename, line, name) of the stats.
+    """
+    filename, line, name = func
+    if filename == '~':
+        ### built-in function
+        label = name
+    else:
+        label = f"{name} ({os.path.basename(filename)}:{line})"
+    return label.replace(';', ':')
+
+def get_text(path:str, sort:str="cumulative", limit:int=50)->str:
+    """Text report of the stats (the first limit functions by sort).
+    """
+    out = io.StringIO()
+    stats = pstats.Stats(path, stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+def get_collapsed(path:str)->str:
+    """Collapsed stacks of the stats with their own time in microseconds.
+
+    cProfile keeps the callers of each function, not the stacks: the time of a function is split between its callers
+    in proportion to the cumulative time of the calls of each caller (the usual approximation of the tools that build
+    flamegraphs from pstats). The recursive calls are not expanded.
+    """
+    stats = pstats.Stats(path).stats
+
+    ### callees of each function with the cumulative time of their calls
+    callees = {}
+    for func, (cc, nc, tt, ct, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+
+    weights = {}
+
+    def walk(func, stack:list, funcs:set, cumulative:float):
+        cc, nc, tt, ct, callers = stats[func]
+        ratio = cumulative / ct if ct > 0 else 0.0
+        stack.append(frame_name(func))
+        funcs.add(func)
+        key = ';'.join(stack)
+        weights[key] = weights.get(key, 0.0) + tt * ratio
+        for callee, edge_ct in callees.get(func, ()):
+            if callee in funcs:
+                continue
+            if len(stack) >= MAX_STACK_DEPTH or edge_ct * ratio < MIN_STACK_TIME:
+                weights[key] += edge_ct * ratio
+            else:
+                walk(callee, stack, funcs, edge_ct * ratio)
+        funcs.discard(func)
+        stack.pop()
+
+    for func, (cc, nc, tt, ct, callers) in stats.items():
+        if not callers:
+            walk(func, [], set(), ct)
+
+    lines = []
+    for key, seconds in weights.items():
+        us = int(round(seconds * 1e6))
+        if us > 0:
+            lines.append(f"{key} {us}")
+    return '\n'.join(sorted(lines)) + '\n'
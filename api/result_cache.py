@@ -0,0 +1,165 @@
+"""
+Content-addressed cache of the simulation results backed by Redis
+
+A result is keyed by the sha256 of the content of the YAML file (blocks, args and couplings), of the model file of each
+block (.amd archive or python file), of the effective args of the blocks (with the overrides), the duration, the
+kernel and the strategy of the simulation: editing the couplings of the YAML file or the model of a block changes the
+key. Only the results of the deterministic simulations (see SimulationNoGUI.isDeterministic) are stored, with a TTL
+and a max total size (oldest entries evicted first).
+
+"""
+import builtins
+import hashlib
+import json
+import os
+import time
+
+import redis
+
+from api.config import redis_url
+from api.catalog import file_hash
+
+### time (in s) during which a result is kept
+SIM_CACHE_TTL = int(os.environ.get("SIM_CACHE_TTL", 24*3600))
+### max size (in bytes) of a result and of all the results
+SIM_CACHE_MAX_ENTRY_BYTES = int(os.environ.get("SIM_CACHE_MAX_ENTRY_BYTES", 8*1024*1024))
+SIM_CACHE_MAX_BYTES = int(os.environ.get("SIM_CACHE_MAX_BYTES", 256*1024*1024))
+
+CACHE_PREFIX = "simcache:"
+### sorted set of the keys by time of storage, hash of their size and running total of the sizes
+INDEX_KEY = CACHE_PREFIX + "index"
+SIZES_KEY = CACHE_PREFIX + "sizes"
+TOTAL_KEY = CACHE_PREFIX + "total"
+
+_client = None
+### hashes of the model files by (path, mtime, size)
+_sources = {}
+
+def client()->redis.Redis:
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(redis_url)
+    return _client
+
+def source_hash(path:str)->str:
+    """Hash of the content of the model file of a block ('' if it does not exist).
+    """
+    try:
+        st = os.stat(path)
+    except (OSError, TypeError, ValueError):
+        return ''
+    key = (path, st.st_mtime_ns, st.st_size)
+    h = _sources.get(key)
+    if h is None:
+        try:
+            h = file_hash(path)
+        except OSError:
+            return ''
+        if len(_sources) > 4096:
+            _sources.clear()
+        _sources[key] = h
+    return h
+
+def make_key(index:dict, duration:str, overrides:dict=None, kernel:str="pyDEVS", strategy:str=None, budget:dict=None)->str:
+    """Make the key of a simulation.
+
+    Args:
+
+        index (dict): Blocks, args, hash and model files of the YAML file (see api.nogui.load_yaml_index).
+
+        duration (str): Duration of the simulation.
+
+        overrides (dict, optional): Args of the blocks changed for the simulation. Defaults to None.
+
+        kernel (str, optional): Simulation kernel. Defaults to "pyDEVS".
+
+        strategy (str, optional): Simulation strategy. Defaults to None (the devsimpy-nogui default one).
+
+        budget (dict, optional): Budgets of the simulation. Defaults to None.
+
+    Returns:
+
+        str: sha256 of the simulation.
+    """
+    args = {label: json.loads(a) for label, a in index['args'].items()}
+    for label, new_args in (overrides or {}).items():
+        args.setdefault(label, {}).update(new_args)
+
+    content = {
+        'yaml': index.get('hash'),
+        'blocks': json.loads(index['blocks']),
+        'sources': {label: source_hash(path) for label, path in index.get('sources', {}).items()},
+        'args': args,
+        'duration': str(duration),
+        'kernel': kernel,
+        'strategy': strategy or builtins.__dict__.get('DEFAULT_SIM_STRATEGY', ''),
+        'budget': budget or {},
+    }
+
+    data = json.dumps(content, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+def get(key:str)->dict:
+    """Get the cached result of the simulation (None if not in the cache).
+    """
+    data = client().get(CACHE_PREFIX + key)
+    return json.loads(data) if data else None
+
+def put(key:str, result:dict)->bool:
+    """Store the result of the simulation and evict the oldest results if the cache is too big.
+    """
+    data = json.dumps(result)
+    size = len(data)
+
+    if size > SIM_CACHE_MAX_ENTRY_BYTES:
+        return False
+
+    r = client()
+    now = time.time()
+
+    ### a result stored again replaces the previous one in the total
+    old_size = int(r.hget(SIZES_KEY, key) or 0)
+
+    with r.pipeline() as pipe:
+        pipe.set(CACHE_PREFIX + key, data, ex=SIM_CACHE_TTL)
+        pipe.zadd(INDEX_KEY, {key: now})
+        pipe.hset(SIZES_KEY, key, size)
+        pipe.incrby(TOTAL_KEY, size - old_size)
+        total = pipe.execute()[-1]
+
+    ### expired entries
+    for expired in r.zrangebyscore(INDEX_KEY, 0, now - SIM_CACHE_TTL):
+        total -= evict(expired.decode())
+
+    while total > SIM_CACHE_MAX_BYTES:
+        oldest = r.zrange(INDEX_KEY, 0, 0)
+        if not oldest:
+            break
+        total -= evict(oldest[0].decode())
+
+    return True
+
+def evict(key:str)->int:
+    """Remove the result from the cache and return its size (0 if it has already been removed).
+    """
+    r = client()
+    size = int(r.hget(SIZES_KEY, key) or 0)
+    with r.pipeline() as pipe:
+        pipe.delete(CACHE_PREFIX + key)
+        pipe.zrem(INDEX_KEY, key)
+        pipe.hdel(SIZES_KEY, key)
+        removed = pipe.execute()[-1]
+
+    ### only the client that removed the size decreases the total (concurrent evictions of the same key)
+    if not removed:
+        return 0
+    r.decrby(TOTAL_KEY, size)
+    return size
+
+def is_deterministic(frames:list)->bool:
+    """Return True if the report of the simulation (last report frame) says that it is deterministic.
+    """
+    reports = [frame for frame in frames if frame.get('type') == 'report']
+    report = reports[-1]['data'] if reports else {}
+    ### a simulation stopped by its wall clock or memory budget depends on the load of the worker
+    return report.get('deterministic', False) and report.get('success', False) and report.get('termination_reason', 'completed') in ('completed', 'max_events', 'max_time')
@@ -0,0 +1,141 @@
+"""
+Fair-share scheduling of the simulations
+
+The simulations are routed to two lanes (Celery queues): the short one for a numeric duration lower than
+SIM_LONG_DURATION and the long one for the bigger durations and the ntl/inf ones (served by a dedicated pool).
+In a lane, the priority of a simulation depends on the number of simulations of the same user and of the same tag
+that are already in flight, so that a user that submits hundreds of runs does not starve the others.
+
+The in-flight simulations and the waiting times of the lanes are kept in Redis.
+
+"""
+import os
+import time
+
+import redis
+
+from api.config import redis_url
+
+SHORT_QUEUE = os.environ.get("SIM_SHORT_QUEUE", "sim_short")
+LONG_QUEUE = os.environ.get("SIM_LONG_QUEUE", "sim_long")
+LANES = (SHORT_QUEUE, LONG_QUEUE)
+
+### numeric duration from which a simulation is routed to the long lane
+SIM_LONG_DURATION = float(os.environ.get("SIM_LONG_DURATION", 1000))
+### number of in-flight simulations of a user (or a tag) that lowers the priority of its next ones by one step
+FAIR_SHARE_STEP = int(os.environ.get("FAIR_SHARE_STEP", 4))
+### time (in s) after which an in-flight simulation is forgotten (revoked before its start...)
+INFLIGHT_TTL = 24*3600
+### number of waiting times kept by lane
+WAIT_SAMPLES = 1000
+
+### priorities of the redis transport (0 is the highest one)
+PRIORITY_STEPS = list(range(10))
+MAX_PRIORITY = PRIORITY_STEPS[-1]
+
+_client = None
+
+def client()->redis.Redis:
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(redis_url)
+    return _client
+
+def inflight_key(kind:str, value:str)->str:
+    return f"sim:inflight:{kind}:{value}"
+
+def wait_key(lane:str)->str:
+    return f"sim:wait:{lane}"
+
+def get_lane(duration:str)->str:
+    """Get the lane of a simulation from its duration hint.
+    """
+    try:
+        return SHORT_QUEUE if float(duration) < SIM_LONG_DURATION else LONG_QUEUE
+    except ValueError:
+        ### ntl or inf
+        return LONG_QUEUE
+
+def fair_keys(userid:str="", tag:str="")->list:
+    """Keys of the in-flight simulations of the user and of the tag.
+    """
+    keys = []
+    if userid:
+        keys.append(inflight_key('user', userid))
+    if tag:
+        keys.append(inflight_key('tag', tag))
+    return keys
+
+def fair_priority(inflight:int)->int:
+    """Priority of a simulation submitted after inflight simulations of its user (or tag).
+    """
+    return min(MAX_PRIORITY, inflight // FAIR_SHARE_STEP)
+
+def get_inflight(userid:str="", tag:str="")->int:
+    """Get the number of in-flight simulations of the user or of the tag (the biggest one).
+    """
+    r = client()
+    now = time.time()
+    inflight = 0
+    for key in fair_keys(userid, tag):
+        r.zremrangebyscore(key, 0, now - INFLIGHT_TTL)
+        inflight = max(inflight, r.zcard(key))
+    return inflight
+
+def get_priority(userid:str="", tag:str="")->int:
+    """Get the priority of the next simulation of the user with the tag (0 if nothing is in flight for them).
+    """
+    return fair_priority(get_inflight(userid, tag))
+
+def submitted(sim_id:str, userid:str="", tag:str="")->None:
+    """Count the simulation as in flight for the user and the tag.
+    """
+    now = time.time()
+    with client().pipeline() as pipe:
+        for key in fair_keys(userid, tag):
+            pipe.zadd(key, {sim_id: now})
+            pipe.expire(key, INFLIGHT_TTL)
+        pipe.execute()
+
+def done(sim_id:str, userid:str="", tag:str="")->None:
+    """Remove the simulation from the in-flight ones of the user and the tag.
+    """
+    with client().pipeline() as pipe:
+        for key in fair_keys(userid, tag):
+            pipe.zrem(key, sim_id)
+        pipe.execute()
+
+def started(lane:str, submitted_at:float)->None:
+    """Record the waiting time of a simulation of the lane.
+    """
+    wait = max(0.0, time.time() - submitted_at)
+    with client().pipeline() as pipe:
+        pipe.lpush(wait_key(lane), wait)
+        pipe.ltrim(wait_key(lane), 0, WAIT_SAMPLES-1)
+        pipe.execute()
+
+def queue_keys(lane:str)->dict:
+    """Redis keys of the lane by priority (see the priority_steps of the redis transport).
+    """
+    return {priority: lane if priority == 0 else f"{lane}\x06\x16{priority}" for priority in PRIORITY_STEPS}
+
+def get_lanes_stats()->dict:
+    """Get the depth (by priority) and the waiting times of the recent simulations of each lane.
+    """
+    r = client()
+    stats = {}
+    for lane in LANES:
+        depths = {priority: r.llen(key) for priority, key in queue_keys(lane).items()}
+        waits = sorted(float(w) for w in r.lrange(wait_key(lane), 0, -1))
+        stats[lane] = {
+            'depth': sum(depths.values()),
+            'depth_by_priority': dict((p, d) for p, d in depths.items() if d),
+            'wait': {
+                'samples': len(waits),
+                'mean': sum(waits)/len(waits) if waits else None,
+                'p50': waits[len(waits)//2] if waits else None,
+                'p95': waits[min(len(waits)-1, int(len(waits)*0.95))] if waits else None,
+                'max': waits[-1] if waits else None,
+            }
+        }
+    return stats
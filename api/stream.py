@@ -0,0 +1,128 @@
+"""
+Live streams of the simulations backed by Redis streams
+
+The worker appends the frames of a simulation (progress, collectors outputs, report) to the
+sim:<sim_id>:events stream as soon as they arrive and many clients can read it without any load on the worker.
+
+"""
+import asyncio
+import json
+import os
+import time
+
+import redis
+import redis.asyncio
+
+from api.config import redis_url
+
+### max number of events kept by a stream (approximately)
+STREAM_MAXLEN = 10000
+### time (in s) during which a stream is kept after the end of its simulation
+STREAM_TTL = 3600
+### time (in ms) of a blocking read before a keep alive is sent to the client
+STREAM_BLOCK = 15000
+### max time (in s) during which a client waits for a stream that does not exist (simulation not started or unknown)
+STREAM_MAX_WAIT = float(os.environ.get("STREAM_MAX_WAIT", 3600))
+
+def stream_key(sim_id:str)->str:
+    """Redis key of the stream of the simulation.
+    """
+    return f"sim:{sim_id}:events"
+
+class Publisher:
+    """Append the frames of a simulation to its stream (used by the worker).
+    """
+
+    _client = None
+
+    def __init__(self, sim_id:str):
+        self.key = stream_key(sim_id)
+
+    @classmethod
+    def client(cls)->redis.Redis:
+        ### one connection pool per (forked) worker process
+        if cls._client is None:
+            cls._client = redis.Redis.from_url(redis_url)
+        return cls._client
+
+    def publish(self, frame:dict)->None:
+        """Append the frame to the stream.
+        """
+        self.client().xadd(self.key, {'type': frame.get('type', ''), 'frame': json.dumps(frame)}, maxlen=STREAM_MAXLEN, approximate=True)
+
+    def end(self, status:str)->None:
+        """Append the last event of the stream and make it expire.
+        """
+        client = self.client()
+        client.xadd(self.key, {'type': 'end', 'frame': json.dumps({'type': 'end', 'status': status})}, maxlen=STREAM_MAXLEN, approximate=True)
+        client.expire(self.key, STREAM_TTL)
+
+def format_event(event_id:str, event_type:str, data:str)->str:
+    """Format a Server-Sent Event.
+    """
+    return f"id: {event_id}\nevent: {event_type}\ndata: {data}\n\n"
+
+def parse_id(event_id:str)->tuple:
+    """(time in ms, sequence number) of an event ID of a stream.
+    """
+    ms, _, seq = event_id.partition('-')
+    return (int(ms), int(seq or 0))
+
+async def is_past_end(client, key:str, last_id:str)->bool:
+    """Return True if the last event of the stream is its end event and the client has already received it.
+    """
+    last = await client.xrevrange(key, count=1)
+    if not last or last[0][1].get('type') != 'end':
+        return False
+    try:
+        return parse_id(last_id) >= parse_id(last[0][0])
+    except ValueError:
+        return False
+
+async def read_events(sim_id:str, last_id:str="0", is_ready=None):
+    """Yield the Server-Sent Events of the simulation from last_id until its end.
+
+    Args:
+
+        sim_id (str): ID of the simulation.
+
+        last_id (str, optional): ID of the last event received by the client. Defaults to "0" (all the events).
+
+        is_ready (callable, optional): Return True if the simulation is over (used when its stream does not exist).
+        It is a blocking call (result backend) run in a thread.
+    """
+    key = stream_key(sim_id)
+    client = redis.asyncio.Redis.from_url(redis_url, decode_responses=True)
+    start = time.monotonic()
+
+    try:
+        ### client reconnected after the end of the stream (EventSource with the Last-Event-ID of the end event)
+        if last_id != "0" and await is_past_end(client, key, last_id):
+            return
+
+        while True:
+            response = await client.xread({key: last_id}, block=STREAM_BLOCK, count=100)
+
+            if not response:
+                ### stream without new events: already read up to its end event
+                if await is_past_end(client, key, last_id):
+                    return
+                ### stream without events (not started yet, expired or published by an old worker)
+                if not await client.exists(key):
+                    if is_ready is not None and await asyncio.to_thread(is_ready):
+                        yield format_event(last_id, 'end', json.dumps({'type': 'end', 'status': 'UNKNOWN'}))
+                        return
+                    if time.monotonic() - start > STREAM_MAX_WAIT:
+                        yield format_event(last_id, 'end', json.dumps({'type': 'end', 'status': 'TIMEOUT'}))
+                        return
+                yield ": keep-alive\n\n"
+                continue
+
+            for _, entries in response:
+                for event_id, fields in entries:
+                    last_id = event_id
+                    yield format_event(event_id, fields['type'], fields['frame'])
+                    if fields['type'] == 'end':
+                        return
+    finally:
+        await client.close()
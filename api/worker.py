@@ -1,48 +1,335 @@
+import json
 import os
+import selectors
 import subprocess
+import threading
+import time
 
-from celery import Celery
+from celery import Celery, states
+from celery.result import AsyncResult
+from celery.exceptions import Ignore
+from celery.signals import worker_init, worker_process_init
+from celery.utils.log import get_task_logger
+from redis import RedisError
 
 celery = Celery(__name__)
 celery.conf.broker_url = os.environ.get("CELERY_BROKER_URL", "redis://localhost:6379")
 celery.conf.result_backend = os.environ.get("CELERY_RESULT_BACKEND", "redis://localhost:6379")
 
-from api.config import devsimpy_nogui
+from api.config import devsimpy_nogui, checkpoints_path_dir
+from api import nogui
+from api.stream import Publisher
+from api import result_cache
+from api import profiles
+from api import metrics
+from api.control import CancelListener, Controller
+from api import scheduling
 
-@celery.task(name="create_sim")
-def create_sim(yaml_filename:str, duration:str, name:str=""):
+### lanes of the simulations (see api.scheduling) with priorities in a lane and one task reserved at a time
+### by a pool process so that the priorities apply to the waiting tasks
+celery.conf.task_default_queue = scheduling.SHORT_QUEUE
+celery.conf.broker_transport_options = {'priority_steps': scheduling.PRIORITY_STEPS, 'queue_order_strategy': 'priority'}
+celery.conf.worker_prefetch_multiplier = 1
+
+logger = get_task_logger(__name__)
+
+### 'subprocess': one python devsimpy-nogui.py process per task (default)
+### 'warm': simulations run in the pool processes of the worker that have already imported devsimpy-nogui
+worker_mode = os.environ.get("DEVSIMPY_WORKER_MODE", "subprocess")
+
+if worker_mode == 'warm':
+    ### warm processes are recycled after K tasks or when their resident memory (in KiB) grows too much
+    celery.conf.worker_max_tasks_per_child = int(os.environ.get("DEVSIMPY_MAX_TASKS_PER_CHILD", 100))
+    celery.conf.worker_max_memory_per_child = int(os.environ.get("DEVSIMPY_MAX_MEMORY_PER_CHILD", 512000))
+
+### budgets applied to all the simulations of the worker (a smaller budget can be given for a simulation)
+BUDGET_DEFAULTS = {budget: os.environ.get(f"SIM_{budget.upper()}") for budget in ('max_wall', 'max_events', 'max_time', 'max_rss')}
+
+### final state of the cancelled simulations (custom state kept with their partial results)
+CANCELLED = "CANCELLED"
+### CANCELLED is not in celery.states.READY_STATES: AsyncResult.ready() stays False for a cancelled simulation
+SIM_READY_STATES = states.READY_STATES | frozenset([CANCELLED])
+
+### frames kept in the result of a simulation (collectors outputs and report)
+RESULT_FRAMES = ('output', 'report')
+
+def is_sim_ready(sim_id:str)->bool:
+    """Return True if the simulation is over (including cancelled, use it instead of AsyncResult.ready).
+    """
+    return AsyncResult(sim_id, app=celery).state in SIM_READY_STATES
+
+def get_budget(budget:dict=None)->dict:
+    """Get the effective budgets of a simulation (the smallest of the given one and of the worker one).
+    """
+    effective = {}
+    for name, default in BUDGET_DEFAULTS.items():
+        values = [float(v) for v in ((budget or {}).get(name), default) if v not in (None, "")]
+        if values:
+            effective[name] = min(values)
+    return effective
+
+def get_checkpoint_path(sim_id:str)->str:
+    """Get the checkpoint file of the simulation (see devsimpy-nogui -checkpoint and -resume).
+    """
+    return os.path.join(checkpoints_path_dir, f"{sim_id}.ckpt")
+
+@worker_init.connect
+@worker_process_init.connect
+def warm_up(**kwargs):
+    """Import devsimpy-nogui modules once for all in the worker processes.
+
+    The main worker process is warmed before the pool is forked so that pool processes (and the recycled ones)
+    start warm. If it fails, the simulations are executed in a subprocess.
+    """
+    if worker_mode == 'warm':
+        try:
+            nogui.warm_up()
+        except Exception:
+            logger.exception("devsimpy-nogui warm up failed, the subprocess mode is used.")
+
+@celery.task(name="create_sim", bind=True)
+def create_sim(self, yaml_filename:str, duration:str, name:str="", overrides:dict=None, cache_key:str=None, budget:dict=None, tag:str="", lane:str=None, submitted_at:float=None, checkpoint:dict=None, profile_models:bool=False, profile:bool=False):
     """Create a simulation
 
     Args:
         yaml_filename (str): YAML filemane to simulate.
         duration (str): Duration of the simulation.
         name (str Optional): Name of the simuation.
+        overrides (dict Optional): Args of the blocks ({label:{arg:val}}) changed only for this simulation.
+        cache_key (str Optional): Key of the simulation in the result cache (see api.result_cache).
+        budget (dict Optional): Budgets of the simulation (max_wall in s, max_events, max_time, max_rss in MB).
+        tag (str Optional): Tag of the app that requests the simulation (fair share, see api.scheduling).
+        lane (str Optional): Lane (queue) of the simulation.
+        submitted_at (float Optional): Time of the submission of the simulation (waiting time of the lane).
+        checkpoint (dict Optional): Checkpoints of the simulation (save: True, period in s, at simulation time, resume: ID of the resumed simulation).
+        profile_models (bool Optional): Profile the functions and the messages of the atomic models (model_profile in the report).
+        profile (bool Optional): Profile the simulation with cProfile (see /simulation/{sim_id}/profile).
 
     Returns:
         _type_: dict including the result of the simulation.
     """
+    if lane and submitted_at:
+        try:
+            scheduling.started(lane, submitted_at)
+        except RedisError:
+            logger.warning("Waiting time of the simulation %s not recorded", self.request.id)
+        metrics.observe('devsimpy_task_wait_seconds', max(0.0, time.time() - submitted_at), lane=lane)
+
+    start = time.perf_counter()
+    try:
+        return run_sim(self, yaml_filename, duration, name, overrides, cache_key, budget, checkpoint, profile_models, profile)
+    finally:
+        metrics.observe('devsimpy_task_run_seconds', time.perf_counter() - start, lane=lane or "")
+        try:
+            if self.request.id:
+                scheduling.done(self.request.id, name, tag)
+        except RedisError:
+            logger.warning("Simulation %s not removed from the in-flight ones", self.request.id)
+
+def run_sim(task, yaml_filename:str, duration:str, name:str="", overrides:dict=None, cache_key:str=None, budget:dict=None, checkpoint:dict=None, profile_models:bool=False, profile:bool=False):
+    """Simulate the yaml file in the create_sim task (see create_sim for the args).
+    """
     args = [str(duration)]
-    
-    if name: 
+
+    if name:
         args.extend(['-name',str(name)])
-      
-    output = execute_cmd(yaml_filename, args)
+
+    if overrides:
+        args.extend(['-blockoverrides', json.dumps(overrides)])
+
+    ### the simulation is stopped (with its termination reason in the report) when a budget is exceeded
+    for option, value in get_budget(budget).items():
+        args.extend([f'-{option}', str(int(value) if option == 'max_events' else value)])
+
+    ### the checkpoint of the simulation is saved in the file of its ID (and it can be resumed from the one of another simulation)
+    if checkpoint:
+        if task.request.id and (checkpoint.get('save') or checkpoint.get('period') or checkpoint.get('at') is not None):
+            os.makedirs(checkpoints_path_dir, exist_ok=True)
+            args.extend(['-checkpoint', get_checkpoint_path(task.request.id)])
+            if checkpoint.get('period'):
+                args.extend(['-checkpoint_period', str(checkpoint['period'])])
+            if checkpoint.get('at') is not None:
+                args.extend(['-checkpoint_at', str(checkpoint['at'])])
+        if checkpoint.get('resume'):
+            args.extend(['-resume', get_checkpoint_path(checkpoint['resume'])])
+
+    if profile_models:
+        args.append('-profile_models')
+
+    ### the cProfile stats of the simulation are saved in the file of its ID (the expired ones are removed)
+    if profile and task.request.id:
+        os.makedirs(profiles.profiles_path_dir, exist_ok=True)
+        profiles.cleanup()
+        args.extend(['-profile', profiles.get_profile_path(task.request.id)])
+
+    ### frames (progress, collectors outputs and report) sent by the simulation on the result channel
+    frames = []
+    ### and forwarded to the live stream of the simulation (see /simulation/{sim_id}/stream)
+    publisher = Publisher(task.request.id) if task.request.id else None
+
+    def on_frame(frame:dict):
+        frames.append(frame)
+        if publisher:
+            try:
+                publisher.publish(frame)
+            except RedisError:
+                logger.warning("Frame not published on the stream %s", publisher.key)
+
+    ### cancellation requests (see /simulation/{sim_id}/cancel/) forwarded to the simulation
+    controller = Controller()
+    listener = None
+    if task.request.id:
+        try:
+            listener = CancelListener(task.request.id, controller.cancel)
+            if listener.is_requested():
+                controller.cancel()
+            listener.start()
+        except RedisError:
+            logger.warning("Simulation %s can not be cancelled", task.request.id)
+            listener = None
+
+    status = "FAILURE"
+    try:
+        if controller.requested:
+            ### cancelled before its start
+            output = {'success': False, 'output': "", "info": "Simulation cancelled before its start"}
+            cancelled = True
+        else:
+            output = execute_sim(yaml_filename, args, on_frame=on_frame, on_start=controller.attach)
+            cancelled = any(frame.get('type') == 'report' and frame['data'].get('status') == CANCELLED for frame in frames)
+        status = CANCELLED if cancelled else "SUCCESS" if output['success'] else "FAILURE"
+    finally:
+        if listener:
+            listener.stop()
+        if publisher:
+            try:
+                publisher.end(status)
+            except RedisError:
+                logger.warning("End of the stream %s not published", publisher.key)
 
     if output['success']:
-        # Decode and clean the binary result from the subprocess
-        data = output['output'].decode('utf-8')
-        data = data.replace("'", "\"").replace("\n", "")
-        data = "[" + data.replace("}{", "},{") + "]"  # Enclose individual objects in an array
-        output['output'] = data
+        # the stdout of the simulation (user prints) is kept apart from the results
+        output['info'] = output['output'].decode('utf-8', errors='replace')
+        ### the progress frames are only useful while the simulation runs (see the live stream)
+        output['output'] = json.dumps([frame for frame in frames if frame.get('type') in RESULT_FRAMES])
+
+    if overrides:
+        output['overrides'] = overrides
+
+    record_metrics(frames, output, status)
+
+    if status == CANCELLED:
+        ### partial results of the simulation with the CANCELLED state (kept by the backend)
+        output['status'] = status
+        task.update_state(state=status, meta=output)
+        raise Ignore()
+
+    ### only the results of deterministic simulations are cached
+    if cache_key and output['success'] and result_cache.is_deterministic(frames):
+        try:
+            result_cache.put(cache_key, dict(output, sim_id=task.request.id))
+        except RedisError:
+            logger.warning("Result of the simulation %s not cached", task.request.id)
 
     return output
 
-def execute_cmd(yaml_filename:str,args:list):
+def record_metrics(frames:list, output:dict, status:str):
+    """Record the metrics of the simulation (see api.metrics) from its report and its result.
+    """
+    metrics.inc('devsimpy_simulations_total', status=status)
+    report = next((frame['data'] for frame in frames if frame.get('type') == 'report'), None) or {}
+
+    timings = report.get('timings') or {}
+    if timings.get('yaml_load') is not None:
+        metrics.observe('devsimpy_yaml_load_seconds', timings['yaml_load'])
+    if timings.get('devs_instance') is not None:
+        metrics.observe('devsimpy_devs_instance_seconds', timings['devs_instance'])
+
+    events = report.get('events')
+    if events:
+        metrics.inc('devsimpy_simulation_events_total', events)
+        if report.get('duration'):
+            metrics.observe('devsimpy_simulation_events_per_second', events / report['duration'])
+
+    if output.get('success'):
+        metrics.observe('devsimpy_result_bytes', len(output['output']))
+
+def submit_sim(yaml_filename:str, duration:str, userid:str="", tag:str="", **kwargs):
+    """Submit a create_sim task in the lane of its duration with the fair-share priority of the user and of the tag.
+
+    Args:
+        yaml_filename (str): YAML filemane to simulate.
+        duration (str): Duration of the simulation.
+        userid (str Optional): ID of the user.
+        tag (str Optional): Tag of the app that requests the simulation.
+        kwargs: Other args of create_sim (overrides, cache_key, budget, checkpoint, profile_models, profile).
+
+    Returns:
+        _type_: AsyncResult of the task.
+    """
+    signature = sim_signature(yaml_filename, duration, userid, tag, **kwargs)
+    sim = signature.apply_async()
+    record_submission(sim.id, userid, tag)
+    return sim
+
+def sim_signature(yaml_filename:str, duration:str, userid:str="", tag:str="", priority:int=None, **kwargs):
+    """Signature of a create_sim task routed to its lane with its fair-share priority (see submit_sim).
+    The priority is given for the simulations of a batch (see batch_signatures).
+    """
+    lane = scheduling.get_lane(duration)
+    if priority is None:
+        try:
+            priority = scheduling.get_priority(userid, tag)
+        except RedisError:
+            priority = 0
+
+    kwargs.update(tag=tag, lane=lane, submitted_at=time.time())
+    return create_sim.signature((str(yaml_filename), str(duration), str(userid)), kwargs, queue=lane, priority=priority)
+
+def batch_signatures(yaml_filename:str, duration:str, runs:list, userid:str="", tag:str="", **kwargs)->list:
+    """Signatures of the simulations of a batch (one by overrides of runs). The i-th simulation is submitted after the
+    in-flight ones of the user and the i-1 previous ones of the batch: its priority goes down as if they were in flight.
+    """
+    try:
+        inflight = scheduling.get_inflight(userid, tag)
+    except RedisError:
+        inflight = 0
+    return [sim_signature(yaml_filename, duration, userid, tag, priority=scheduling.fair_priority(inflight + i), overrides=overrides, **kwargs)
+            for i, overrides in enumerate(runs)]
+
+def record_submission(sim_id:str, userid:str="", tag:str=""):
+    """Count the submitted simulation as in flight for its user and its tag.
+    """
+    try:
+        scheduling.submitted(sim_id, userid, tag)
+    except RedisError:
+        logger.warning("Simulation %s not counted in the in-flight ones", sim_id)
+
+def execute_sim(yaml_filename:str, args:list, on_frame=None, on_start=None):
+    """Execute the simulation of the yaml file with args in a warm process if possible or in a subprocess.
+
+    Args:
+        yaml_filename (str): YAML file to execute with devsimpy-nogui
+        args (list): Params passed to the devsimpy-nogui.
+        on_frame (callable Optional): Called with each frame of the result channel as soon as it arrives.
+        on_start (callable Optional): Called with the function that cancels the simulation when it starts.
+
+    Returns:
+        _type_: dict including the result of the execution (simulation)
+    """
+    if worker_mode == 'warm' and nogui.is_warm():
+        return nogui.execute(yaml_filename, args, on_frame=on_frame, on_start=on_start)
+    else:
+        return execute_cmd(yaml_filename, args, on_frame=on_frame, on_start=on_start)
+
+def execute_cmd(yaml_filename:str,args:list,on_frame=None,on_start=None):
     """Execute the cmd to simulate the yaml file with args.
 
     Args:
         yaml_filename (str): YAML file to execute with devsimpy-nogui
         args (list): Params passed to the devsimpy-nogui.
+        on_frame (callable Optional): Called with each frame of the result channel as soon as it arrives.
+        on_start (callable Optional): Called with the function that cancels the simulation when it starts.
 
     Returns:
         _type_: dict including the result of the execution (simulation)
@@ -50,6 +337,9 @@ def execute_cmd(yaml_filename:str,args:list):
     # Command to be executed
     cmd = ["python", devsimpy_nogui, yaml_filename] + args
 
+    if on_frame:
+        return execute_cmd_with_channel(cmd, on_frame, on_start)
+
     ## execute command using check_out
     try:
         result = subprocess.check_output(cmd, stderr=subprocess.STDOUT)
@@ -58,4 +348,76 @@ def execute_cmd(yaml_filename:str,args:list):
     else:
         output = {'success': True, 'output': result, "info":""}
 
-    return output
\ No newline at end of file
+    return output
+
+def execute_cmd_with_channel(cmd:list, on_frame, on_start=None):
+    """Execute the cmd with a result channel (pipe) on which devsimpy-nogui sends its frames
+    and a control channel (pipe) on which it receives the cancellation.
+
+    The frames are decoded incrementally while the stdout (and stderr) of the process is collected apart.
+
+    Args:
+        cmd (list): Command to be executed.
+        on_frame (callable): Called with each frame of the result channel.
+        on_start (callable Optional): Called with the function that cancels the simulation when it starts.
+
+    Returns:
+        _type_: dict including the result of the execution (simulation)
+    """
+    r, w = os.pipe()
+    control_r, control_w = os.pipe()
+    start = time.perf_counter()
+    try:
+        process = subprocess.Popen(cmd + ['-result_fd', str(w), '-control_fd', str(control_r)], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, pass_fds=(w, control_r))
+    except Exception:
+        os.close(control_w)
+        raise
+    finally:
+        ### the ends belong to the child now (EOF on r when it exits)
+        os.close(w)
+        os.close(control_r)
+    metrics.observe('devsimpy_subprocess_spawn_seconds', time.perf_counter() - start)
+
+    control_lock = threading.Lock()
+
+    def cancel():
+        with control_lock:
+            if process.poll() is None:
+                try:
+                    os.write(control_w, nogui.ResultChannel.encode({'type': 'cancel'}))
+                except OSError:
+                    pass
+
+    if on_start:
+        on_start(cancel)
+
+    reader = nogui.FrameReader()
+    stdout = bytearray()
+
+    with os.fdopen(r, 'rb', buffering=0) as channel, selectors.DefaultSelector() as selector:
+        selector.register(channel, selectors.EVENT_READ)
+        selector.register(process.stdout, selectors.EVENT_READ)
+
+        while selector.get_map():
+            for key, _ in selector.select():
+                data = os.read(key.fd, 65536)
+                if not data:
+                    selector.unregister(key.fileobj)
+                elif key.fileobj is channel:
+                    for frame in reader.feed(data):
+                        on_frame(frame)
+                else:
+                    stdout += data
+
+    process.stdout.close()
+    returncode = process.wait()
+
+    with control_lock:
+        os.close(control_w)
+
+    if returncode:
+        output = {'success': False, 'output': "", "info": str(bytes(stdout))}
+    else:
+        output = {'success': True, 'output': bytes(stdout), "info":""}
+
+    return output
@@ -0,0 +1,123 @@
+"""
+LRU cache of the YAML files index (blocks and args) used by the YAML inspection endpoints
+
+A YAML file is loaded once in the API process (see api.nogui.load_yaml_index) and its entry is
+valid while the path, the modification time and the size of the file are unchanged.
+
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from api import nogui
+from ResultChannel import serialize
+
+### max number of YAML files and max size (in bytes of JSON) kept in the cache
+YAML_CACHE_SIZE = int(os.environ.get("YAML_CACHE_SIZE", 128))
+YAML_CACHE_BYTES = int(os.environ.get("YAML_CACHE_BYTES", 32*1024*1024))
+
+def file_key(path:str)->tuple:
+    """Key of the current version of the file.
+    """
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+def index_size(index:dict)->int:
+    """Size of the JSON strings of the index.
+    """
+    return len(index['blocks']) + sum(len(args) for args in index['args'].values())
+
+class YAMLCache:
+    """Bounded LRU cache of the YAML files index.
+    """
+
+    def __init__(self, maxsize:int=YAML_CACHE_SIZE, maxbytes:int=YAML_CACHE_BYTES):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path:str)->dict:
+        """Get the index of the YAML file (loaded if it is not in the cache or if it has changed).
+        """
+        path = os.path.abspath(path)
+        key = file_key(path)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and entry[0] == key:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        index = nogui.load_yaml_index(path)
+
+        with self._lock:
+            self._pop(path)
+            self._entries[path] = (key, index)
+            self.nbytes += index_size(index)
+            ### the last entry is kept even if it is too big
+            while len(self._entries) > 1 and (len(self._entries) > self.maxsize or self.nbytes > self.maxbytes):
+                self._pop(next(iter(self._entries)))
+
+        return index
+
+    def invalidate(self, path:str)->None:
+        """Remove the YAML file from the cache.
+        """
+        with self._lock:
+            self._pop(os.path.abspath(path))
+
+    def clear(self)->None:
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def _pop(self, path:str)->None:
+        entry = self._entries.pop(path, None)
+        if entry:
+            self.nbytes -= index_size(entry[1])
+
+    def __len__(self):
+        return len(self._entries)
+
+yaml_cache = YAMLCache()
+
+def get_blocks_list(yaml_filename:str)->dict:
+    """Get the labels of the blocks of the YAML file (same result as execute_cmd with -blockslist).
+    """
+    try:
+        index = yaml_cache.get(yaml_filename)
+    except Exception as info:
+        return {'success': False, 'output': "", "info": str(info)}
+    return {'success': True, 'output': index['blocks'], "info": ""}
+
+def get_block_args(yaml_filename:str, label:str)->dict:
+    """Get the args of the block label of the YAML file (same result as execute_cmd with -blockargs).
+    """
+    try:
+        index = yaml_cache.get(yaml_filename)
+    except Exception as info:
+        return {'success': False, 'output': "", "info": str(info)}
+
+    if label not in index['args']:
+        return {'success': False, 'output': "", "info": f"ERROR: Model must belong to the list {index['blocks']}\n"}
+
+    return {'success': True, 'output': index['args'][label], "info": ""}
+
+def update_block_args(yaml_filename:str, label:str, new_args:dict)->dict:
+    """Update the args of the block label of the YAML file (same result as execute_cmd with -blockargs -updateblockargs).
+    """
+    try:
+        result = nogui.update_yaml_block_args(yaml_filename, label, new_args)
+    except Exception as info:
+        return {'success': False, 'output': "", "info": str(info)}
+    finally:
+        yaml_cache.invalidate(yaml_filename)
+
+    return {'success': True, 'output': json.dumps(result, default=serialize), "info": ""}
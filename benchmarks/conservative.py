@@ -0,0 +1,192 @@
+"""
+Benchmark of the conservative parallel strategy with the number of partitions (worker processes)
+
+CLUSTERS coupled models of WORKERS CPU-heavy workers are coupled in a ring: the workers of a cluster send their
+messages to the collector and to the delay of their cluster, and the delay sends them to the next cluster after
+DELAY (its lookahead). The speedup is the ratio between the duration of the direct-coupling simulation and the
+one of the conservative simulation with P partitions (the number of cores of the machine is the useful max).
+
+Usage (from the root of the repository):
+
+    python benchmarks/conservative.py [P ...] [-T duration] [-clusters n] [-workers n] [-work n] [-delay d]
+
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import nogui
+
+nogui.warm_up()
+
+from DomainInterface.DomainBehavior import DomainBehavior
+from DomainInterface.DomainStructure import DomainStructure
+from DomainInterface.MasterModel import Master
+from DomainInterface.Object import Message
+from Patterns.Factory import simulator_factory
+import Patterns.ParallelStrategy as ParallelStrategy
+
+import builtins
+
+class Worker(DomainBehavior):
+    """Worker that computes during WORK iterations at each period and sends the result.
+    """
+
+    def __init__(self, period=1.0, work=1000):
+        DomainBehavior.__init__(self)
+        self.period = period
+        self.work = work
+        self.value = 0
+        self.initPhase('ACTIVE', period)
+        ### the outputs are sent every period
+        self.LOOKAHEAD = period
+
+    def outputFnc(self):
+        self.poke(self.OPorts[0], Message([self.value, 0, 0], self.timeNext))
+
+    def intTransition(self):
+        self.value = sum(i*i % 7 for i in range(self.work + self.value % 7))
+        self.holdIn('ACTIVE', self.period)
+
+    def timeAdvance(self):
+        return self.getSigma()
+
+class Collector(DomainBehavior):
+    """Collector that counts the messages.
+    """
+
+    def __init__(self):
+        DomainBehavior.__init__(self)
+        self.count = 0
+        self.initPhase('IDLE', INFINITY)
+
+    def extTransition(self, *args):
+        self.count += 1
+        self.passivate()
+
+    def intTransition(self):
+        self.passivate()
+
+    def timeAdvance(self):
+        return self.getSigma()
+
+class Delay(DomainBehavior):
+    """Delay that sends the number of its received messages DELAY after the first one of a period.
+    """
+
+    def __init__(self, delay=1.0):
+        DomainBehavior.__init__(self)
+        self.delay = delay
+        self.count = 0
+        self.initPhase('IDLE', INFINITY)
+        ### the outputs are not sent before DELAY after an input (unless they are already scheduled)
+        self.LOOKAHEAD = delay
+
+    def extTransition(self, *args):
+        self.count += 1
+        ### the first message of a period starts it
+        if self.phaseIs('SEND'):
+            self.holdIn('SEND', self.getSigma() - self.elapsed)
+        else:
+            self.holdIn('SEND', self.delay)
+
+    def outputFnc(self):
+        self.poke(self.OPorts[0], Message([self.count, 0, 0], self.timeNext))
+
+    def intTransition(self):
+        self.passivate()
+
+    def timeAdvance(self):
+        return self.getSigma()
+
+class Cluster(DomainStructure):
+    pass
+
+def build(clusters:int, workers:int, work:int, delay:float)->tuple:
+    """Build the ring of clusters.
+
+    Returns:
+
+        tuple: master model and list of the collectors and delays.
+    """
+    master = Master()
+    master.name = 'master'
+    counters = []
+    groups = []
+
+    for c in range(clusters):
+        group = Cluster()
+        group.name = f'cluster{c}'
+        group.addInPort()
+        group.addOutPort()
+        master.addSubModel(group)
+        groups.append(group)
+
+        collector = Collector()
+        collector.name = f'collector{c}'
+        collector.addInPort()
+        group.addSubModel(collector)
+
+        d = Delay(delay)
+        d.name = f'delay{c}'
+        d.addInPort()
+        d.addOutPort()
+        group.addSubModel(d)
+        group.connectPorts(d.OPorts[0], group.OPorts[0])
+        group.connectPorts(group.IPorts[0], collector.IPorts[0])
+        counters.extend((collector, d))
+
+        for i in range(workers):
+            ### periods in [1, 2[ so that the workers are not all imminent at the same time
+            worker = Worker(period=1.0 + (i % 10)/10.0, work=work)
+            worker.name = f'worker{c}_{i}'
+            worker.addOutPort()
+            group.addSubModel(worker)
+            group.connectPorts(worker.OPorts[0], collector.IPorts[0])
+            group.connectPorts(worker.OPorts[0], d.IPorts[0])
+
+    for c, group in enumerate(groups):
+        master.connectPorts(group.OPorts[0], groups[(c+1) % clusters].IPorts[0])
+
+    return master, counters
+
+def bench(partitions:int, T:float, clusters:int, workers:int, work:int, delay:float)->dict:
+    """Simulate the ring during T with the conservative strategy (direct-coupling one for 1 partition).
+    """
+    master, counters = build(clusters, workers, work, delay)
+    builtins.__dict__['NTL'] = False
+    master.FINAL_TIME = float(T)
+    ParallelStrategy.CONSERVATIVE_PARTITIONS = partitions
+
+    start = time.perf_counter()
+    thread = simulator_factory(master, 'conservative' if partitions > 1 else 'direct-coupling', False, False, False, False, False)
+    thread.join()
+    elapsed = time.perf_counter() - start
+
+    stats = getattr(thread.getAlgorithm(), 'stats', {})
+    return {'partitions': partitions, 'seconds': elapsed, 'counts': [m.count for m in counters],
+            'windows': stats.get('windows', 0), 'coordinated_steps': stats.get('coordinated_steps', 0)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('partitions', nargs='*', type=int, default=[4, 8, 16], help='numbers of partitions')
+    parser.add_argument('-T', type=float, default=20.0, help='duration of the simulations')
+    parser.add_argument('-clusters', type=int, default=16, help='number of clusters')
+    parser.add_argument('-workers', type=int, default=50, help='number of workers by cluster')
+    parser.add_argument('-work', type=int, default=2000, help='number of iterations of a transition of a worker')
+    parser.add_argument('-delay', type=float, default=1.0, help='delay (lookahead) between the clusters')
+    args = parser.parse_args()
+
+    print(f"cores: {os.cpu_count()}")
+    print(f"{'P':>4} {'seconds':>10} {'speedup':>8} {'windows':>8} {'steps':>8} {'same':>5}")
+    ref = bench(1, args.T, args.clusters, args.workers, args.work, args.delay)
+    print(f"{1:>4} {ref['seconds']:>10.3f} {1.0:>8.2f} {'-':>8} {'-':>8} {'-':>5}")
+    for p in args.partitions:
+        r = bench(p, args.T, args.clusters, args.workers, args.work, args.delay)
+        print(f"{p:>4} {r['seconds']:>10.3f} {ref['seconds']/r['seconds']:>8.2f} {r['windows']:>8} {r['coordinated_steps']:>8} {str(r['counts'] == ref['counts']):>5}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmark of the PyDEVS hierarchical simulation (bag-based strategy) with the number of atomic models
+
+N generators with different periods are spread in coupled models of GROUP_SIZE generators. Each generator sends
+its messages to the collector of its coupled model. The events/sec are the number of transitions (internal and
+external) of the atomic models per second of simulation.
+
+Usage (from the root of the repository):
+
+    python benchmarks/coupled_solver.py [N ...] [-T duration] [-group size] [-strategy bag-based]
+
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import nogui
+
+nogui.warm_up()
+
+from DomainInterface.DomainBehavior import DomainBehavior
+from DomainInterface.DomainStructure import DomainStructure
+from DomainInterface.MasterModel import Master
+from DomainInterface.Object import Message
+from Patterns.Factory import simulator_factory
+
+import builtins
+
+### default number of generators by coupled model
+GROUP_SIZE = 100
+
+class Generator(DomainBehavior):
+    """Generator that sends its counter with a period.
+    """
+
+    def __init__(self, period=1.0):
+        DomainBehavior.__init__(self)
+        self.period = period
+        self.count = 0
+        self.initPhase('ACTIVE', period)
+
+    def outputFnc(self):
+        self.poke(self.OPorts[0], Message([self.count, 0, 0], self.timeNext))
+
+    def intTransition(self):
+        self.count += 1
+        self.holdIn('ACTIVE', self.period)
+
+    def timeAdvance(self):
+        return self.getSigma()
+
+class Collector(DomainBehavior):
+    """Collector that counts the messages.
+    """
+
+    def __init__(self):
+        DomainBehavior.__init__(self)
+        self.count = 0
+        self.initPhase('IDLE', INFINITY)
+
+    def extTransition(self, *args):
+        self.count += 1
+        self.passivate()
+
+    def intTransition(self):
+        self.passivate()
+
+    def timeAdvance(self):
+        return self.getSigma()
+
+class Group(DomainStructure):
+    pass
+
+def build(n:int, group_size:int=GROUP_SIZE)->tuple:
+    """Build the master model with n generators.
+
+    Returns:
+
+        tuple: master model and list of the atomic models.
+    """
+    master = Master()
+    master.name = 'master'
+    atomics = []
+
+    for g in range(0, n, group_size):
+        group = Group()
+        group.name = f'group{g}'
+        master.addSubModel(group)
+
+        collector = Collector()
+        collector.name = f'collector{g}'
+        collector.addInPort()
+        group.addSubModel(collector)
+        atomics.append(collector)
+
+        for i in range(g, min(n, g+group_size)):
+            ### periods in [1, 2[ so that the imminent models are a small part of the models
+            gen = Generator(period=1.0 + (i % 97)/97.0)
+            gen.name = f'gen{i}'
+            gen.addOutPort()
+            group.addSubModel(gen)
+            group.connectPorts(gen.OPorts[0], collector.IPorts[0])
+            atomics.append(gen)
+
+    return master, atomics
+
+def bench(n:int, T:float, strategy:str, group_size:int=GROUP_SIZE)->dict:
+    """Simulate the model with n generators during T.
+    """
+    master, atomics = build(n, group_size)
+    builtins.__dict__['NTL'] = False
+    master.FINAL_TIME = float(T)
+
+    start = time.perf_counter()
+    thread = simulator_factory(master, strategy, False, False, False, False, False)
+    thread.join()
+    elapsed = time.perf_counter() - start
+
+    events = sum(m.count for m in atomics)
+    return {'n': n, 'events': events, 'seconds': elapsed, 'events/s': events/elapsed if elapsed else 0.0}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('n', nargs='*', type=int, default=[100, 1000, 10000], help='numbers of generators')
+    parser.add_argument('-T', type=float, default=20.0, help='duration of the simulations')
+    parser.add_argument('-group', type=int, default=GROUP_SIZE, help='number of generators by coupled model')
+    parser.add_argument('-strategy', default='bag-based', help='simulation strategy')
+    args = parser.parse_args()
+
+    print(f"{'N':>8} {'events':>10} {'seconds':>10} {'events/s':>12}")
+    for n in args.n:
+        r = bench(n, args.T, args.strategy, args.group)
+        print(f"{r['n']:>8} {r['events']:>10} {r['seconds']:>10.3f} {r['events/s']:>12.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark of the plug-in hooks of the simulation events of the PyDEVS kernel
+
+A transition triggers the SIM_VERBOSE, SIM_BLINK and SIM_TEST events. The script prints the cost (in ns) of these three
+events per transition when they are dispatched by PluginManager.trigger_event at each call and when they are bound at
+the start of the simulation (PluginManager.bind_hooks), without plug-in and with one plug-in by event. It then prints
+the events/sec of a direct-coupling simulation of N generators without plug-in.
+
+Usage (from the root of the repository):
+
+    python benchmarks/plugin_hooks.py [N ...] [-T duration] [-calls n]
+
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import nogui
+
+nogui.warm_up()
+
+from PluginManager import PluginManager, Hooks
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from coupled_solver import bench
+
+EVENTS = ('SIM_VERBOSE', 'SIM_BLINK', 'SIM_TEST')
+
+def dispatched(m):
+    """Events of a transition dispatched at each call.
+    """
+    PluginManager.trigger_event("SIM_VERBOSE", model=m, msg=0)
+    PluginManager.trigger_event("SIM_BLINK", model=m, msg=[1])
+    PluginManager.trigger_event("SIM_TEST", model=m, msg=[1])
+
+def bound(m):
+    """Events of a transition bound at the start of the simulation (as in Patterns/Strategy.py).
+    """
+    for f in Hooks.SIM_VERBOSE: f(model=m, msg=0)
+    for f in Hooks.SIM_BLINK: f(model=m, msg=[1])
+    for f in Hooks.SIM_TEST: f(model=m, msg=[1])
+
+def plugin(*args, **kwargs):
+    pass
+
+def cost(fct, n:int)->float:
+    """Cost (in ns) of a call of fct (best of 5 runs of n calls).
+    """
+    return min(timeit.repeat(lambda: fct(None), number=n, repeat=5)) / n * 1e9
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('n', nargs='*', type=int, default=[1000, 10000], help='numbers of generators')
+    parser.add_argument('-T', type=float, default=20.0, help='duration of the simulations')
+    parser.add_argument('-calls', type=int, default=200000, help='number of measured transitions')
+    args = parser.parse_args()
+
+    print(f"{'plug-ins':>10} {'dispatched (ns)':>16} {'bound (ns)':>11} {'gain':>6}")
+    for plugins in (0, 1):
+        for event in EVENTS:
+            PluginManager.plugins[event] = [plugin] * plugins
+        PluginManager.bind_hooks()
+        d = cost(dispatched, args.calls)
+        b = cost(bound, args.calls)
+        print(f"{plugins:>10} {d:>16.1f} {b:>11.1f} {d/b:>6.1f}")
+
+    for event in EVENTS:
+        PluginManager.plugins.pop(event, None)
+
+    print()
+    print(f"{'N':>8} {'events':>10} {'seconds':>10} {'events/s':>12}")
+    for n in args.n:
+        r = bench(n, args.T, 'direct-coupling')
+        print(f"{r['n']:>8} {r['events']:>10} {r['seconds']:>10.3f} {r['events/s']:>12.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""
+Benchmark of a population of N homogeneous agents: N atomic models vs one Population model (vectorized)
+
+Each agent consumes one unit of energy at each period (periods in [1, 2[) and sleeps when it has no more energy.
+A feeder gives FOOD units of energy to all the agents every 3 time units. The events/sec are the number of
+transitions of the agents (internal and external) per second of simulation.
+
+Usage (from the root of the repository):
+
+    python benchmarks/population.py [N ...] [-T duration] [-strategy direct-coupling]
+
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import nogui
+
+nogui.warm_up()
+
+import numpy
+
+from DomainInterface.DomainBehavior import DomainBehavior
+from DomainInterface.MasterModel import Master
+from DomainInterface.Object import Message
+from DomainInterface.Population import Population
+from Patterns.Factory import simulator_factory
+
+import builtins
+
+### energy given to the agents by the feeder
+FOOD = 2
+### initial energy of the agents
+ENERGY = 5
+
+def period(i:int)->float:
+    ### a few periods so that the agents are due by large groups
+    return 1.0 + (i % 4)/4.0
+
+class Feeder(DomainBehavior):
+    """Feeder that sends FOOD units of energy every 3 time units.
+    """
+
+    def __init__(self):
+        DomainBehavior.__init__(self)
+        self.initPhase('ACTIVE', 3.0)
+
+    def outputFnc(self):
+        self.poke(self.OPorts[0], Message([FOOD, 0, 0], self.timeNext))
+
+    def intTransition(self):
+        self.holdIn('ACTIVE', 3.0)
+
+    def timeAdvance(self):
+        return self.getSigma()
+
+class Agent(DomainBehavior):
+    """Agent that consumes its energy.
+    """
+
+    def __init__(self, period=1.0):
+        DomainBehavior.__init__(self)
+        self.period = period
+        self.energy = ENERGY
+        self.count = 0
+        self.initPhase('ACTIVE', period)
+
+    def intTransition(self):
+        self.count += 1
+        self.energy -= 1
+        if self.energy > 0:
+            self.holdIn('ACTIVE', self.period)
+        else:
+            self.passivateIn('SLEEP')
+
+    def extTransition(self, *args):
+        msg = self.peek(self.IPorts[0], *args)
+        self.count += 1
+        self.energy += self.getMsgValue(msg)[0]
+        if self.phaseIs('SLEEP'):
+            self.holdIn('ACTIVE', self.period)
+        else:
+            self.holdIn('ACTIVE', self.getSigma() - self.elapsed)
+
+    def timeAdvance(self):
+        return self.getSigma()
+
+class Agents(Population):
+    """Population of agents that consume their energy.
+    """
+
+    FIELDS = [('period', 'f8'), ('energy', 'i8'), ('count', 'i8')]
+
+    def __init__(self, size=100):
+        Population.__init__(self, size)
+        m = self.members
+        m['period'] = [period(i) for i in range(size)]
+        m['energy'] = ENERGY
+        self.holdMembersIn(slice(None), m['period'])
+
+    def route(self, p, msg):
+        ### the food of the feeder is for all the agents
+        return numpy.arange(self.size), self.getMsgValue(msg)[0]
+
+    def memberIntTransition(self, idx):
+        m = self.members
+        m['count'][idx] += 1
+        m['energy'][idx] -= 1
+        self.holdMembersIn(idx, numpy.where(m['energy'][idx] > 0, m['period'][idx], INFINITY))
+
+    def memberExtTransition(self, idx, p, values, e):
+        m = self.members
+        m['count'][idx] += 1
+        m['energy'][idx] += values
+        ### the sleeping agents wake up, the others keep their remaining time
+        sleep = m['sigma'][idx] == INFINITY
+        self.holdMembersIn(idx, numpy.where(sleep, m['period'][idx], m['sigma'][idx] - e))
+
+def build(n:int, vectorized:bool)->tuple:
+    """Build the master model with the feeder and n agents.
+
+    Returns:
+
+        tuple: master model and function that returns the counts and energies of the agents.
+    """
+    master = Master()
+    master.name = 'master'
+
+    feeder = Feeder()
+    feeder.name = 'feeder'
+    feeder.addOutPort()
+    master.addSubModel(feeder)
+
+    if vectorized:
+        agents = Agents(n)
+        agents.name = 'agents'
+        agents.addInPort()
+        master.addSubModel(agents)
+        master.connectPorts(feeder.OPorts[0], agents.IPorts[0])
+        return master, lambda: (agents.members['count'].tolist(), agents.members['energy'].tolist())
+
+    atomics = []
+    for i in range(n):
+        agent = Agent(period(i))
+        agent.name = f'agent{i}'
+        agent.addInPort()
+        master.addSubModel(agent)
+        master.connectPorts(feeder.OPorts[0], agent.IPorts[0])
+        atomics.append(agent)
+    return master, lambda: ([a.count for a in atomics], [a.energy for a in atomics])
+
+def bench(n:int, T:float, strategy:str, vectorized:bool)->dict:
+    """Simulate the n agents during T.
+    """
+    master, result = build(n, vectorized)
+    builtins.__dict__['NTL'] = False
+    master.FINAL_TIME = float(T)
+
+    start = time.perf_counter()
+    thread = simulator_factory(master, strategy, False, False, False, False, False)
+    thread.join()
+    elapsed = time.perf_counter() - start
+
+    counts, energies = result()
+    events = sum(counts)
+    return {'n': n, 'events': events, 'seconds': elapsed, 'events/s': events/elapsed if elapsed else 0.0, 'result': (counts, energies)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('n', nargs='*', type=int, default=[100, 1000, 10000], help='numbers of agents')
+    parser.add_argument('-T', type=float, default=20.0, help='duration of the simulations')
+    parser.add_argument('-strategy', default='direct-coupling', help='simulation strategy')
+    args = parser.parse_args()
+
+    print(f"{'N':>8} {'events':>10} {'atomic (s)':>11} {'population (s)':>15} {'speedup':>8} {'same':>5}")
+    for n in args.n:
+        a = bench(n, args.T, args.strategy, False)
+        p = bench(n, args.T, args.strategy, True)
+        print(f"{n:>8} {a['events']:>10} {a['seconds']:>11.3f} {p['seconds']:>15.3f} {a['seconds']/p['seconds']:>8.1f} {str(a['result'] == p['result']):>5}")
+
+if __name__ == '__main__':
+    main()
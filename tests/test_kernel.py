@@ -0,0 +1,564 @@
+import builtins, importlib.util, json, os
+from collections import defaultdict
+
+import numpy
+import pytest
+
+from api import nogui
+
+#############################################################
+# Tests of the devsimpy-nogui kernel executed in-process
+# (the models are built in the test, without YAML file)
+#############################################################
+
+nogui.warm_up()
+INFINITY = builtins.__dict__['INFINITY']
+
+import ControlChannel, ResultChannel
+from Container import Diagram
+from Domain.Generator.RandomGenerator import RandomGenerator
+from DomainInterface.DomainBehavior import DomainBehavior
+from DomainInterface.DomainStructure import DomainStructure
+from DomainInterface.MasterModel import Master
+from DomainInterface.Population import Population
+from DomainInterface.Object import FrozenDict, FrozenList, FrozenMessage, Message, MessageMutationError, readMessage, writeMessage
+from Patterns.Budget import Budget
+from Patterns.Checkpoint import Checkpoint, CheckpointError, read
+from Patterns.Factory import simulator_factory
+from Patterns.Profiler import ModelProfiler
+from Patterns.Strategy import EventHeap
+from PluginManager import Hooks, PluginManager
+from SimulationNoGUI import isDeterministic, makeSimulation
+
+class Generator(DomainBehavior):
+    """Send its counter every period up to limit messages."""
+    def __init__(self, period, limit):
+        DomainBehavior.__init__(self)
+        self.period = period
+        self.limit = limit
+        self.count = 0
+        self.initPhase('ACTIVE', period)
+    def outputFnc(self):
+        self.poke(self.OPorts[0], Message([self.count, self.name], self.timeNext))
+    def intTransition(self):
+        self.count += 1
+        if self.count >= self.limit:
+            self.passivate()
+        else:
+            self.holdIn('ACTIVE', self.period)
+    def timeAdvance(self):
+        return self.getSigma()
+
+class Relay(DomainBehavior):
+    """Send the number of received messages 0.5 after each input."""
+    def __init__(self):
+        DomainBehavior.__init__(self)
+        self.received = []
+        self.initPhase('IDLE', INFINITY)
+    def extTransition(self, *args):
+        for p in self.IPorts:
+            msg = self.peek(p, *args)
+            if msg is not None:
+                self.received.append(msg.value)
+        self.holdIn('SEND', 0.5)
+    def outputFnc(self):
+        self.poke(self.OPorts[0], Message([len(self.received), self.name], self.timeNext))
+    def intTransition(self):
+        self.passivate()
+    def timeAdvance(self):
+        return self.getSigma()
+
+class Sink(DomainBehavior):
+    """Log the received messages."""
+    def __init__(self):
+        DomainBehavior.__init__(self)
+        self.log = []
+        self.initPhase('IDLE', INFINITY)
+    def extTransition(self, *args):
+        for i, p in enumerate(self.IPorts):
+            msg = self.peek(p, *args)
+            if msg is not None:
+                self.log.append((i, msg.value, msg.time))
+        self.passivate()
+    def intTransition(self):
+        self.passivate()
+    def timeAdvance(self):
+        return self.getSigma()
+
+class Generators(Population):
+    """Population of generators (see Generator) sending [indexes, counters]."""
+    FIELDS = [('period', 'f8'), ('limit', 'i8'), ('count', 'i8')]
+    def __init__(self, periods, limits):
+        Population.__init__(self, len(periods))
+        self.members['period'] = periods
+        self.members['limit'] = limits
+        self.holdMembersIn(numpy.arange(self.size), self.members['period'])
+    def memberOutputFnc(self, idx):
+        self.pokeMembers(self.OPorts[0], idx, self.members['count'][idx])
+    def memberIntTransition(self, idx):
+        self.members['count'][idx] += 1
+        done = self.members['count'][idx] >= self.members['limit'][idx]
+        self.holdMembersIn(idx, numpy.where(done, INFINITY, self.members['period'][idx]))
+
+def build(groups:int=3, generators:int=4, limit:int=6):
+    """Master model of groups (coupled models) of generators and a relay sending to a sink."""
+    master = Master()
+    master.name = 'master'
+    Diagram().setBlock(master)
+    sink = Sink()
+    sink.name = 'sink'
+    sink.addInPort()
+    sink.addInPort()
+    master.addSubModel(sink)
+    for g in range(groups):
+        group = DomainStructure()
+        group.name = f'group{g}'
+        group.addOutPort()
+        master.addSubModel(group)
+        relay = Relay()
+        relay.name = f'relay{g}'
+        relay.addInPort()
+        relay.addOutPort()
+        group.addSubModel(relay)
+        for i in range(generators):
+            gen = Generator(1.0 + (i % 3)*0.5 + g*0.25, limit + i)
+            gen.name = f'gen{g}_{i}'
+            gen.addOutPort()
+            group.addSubModel(gen)
+            group.connectPorts(gen.OPorts[0], relay.IPorts[0])
+        group.connectPorts(relay.OPorts[0], group.OPorts[0])
+        master.connectPorts(group.OPorts[0], sink.IPorts[g % 2])
+    return master, sink
+
+def simulate(master, T:float, strategy:str="bag-based", budget=None, ntl:bool=False, checkpoint=None):
+    """Simulate the master model up to T (or up to its end with ntl) and return the simulation thread."""
+    master.FINAL_TIME = T
+    thread = simulator_factory(master, strategy, False, ntl, False, False, False, budget, checkpoint)
+    thread.join()
+    return thread
+
+def output(sink:Sink)->str:
+    ### the frozen messages are tuples
+    return json.dumps(sink.log)
+
+@pytest.fixture
+def reference():
+    master, sink = build()
+    simulate(master, 20.0)
+    return output(sink)
+
+@pytest.fixture
+def reports(monkeypatch):
+    """Reports sent on the result channel by makeSimulation."""
+    monkeypatch.setitem(builtins.__dict__, 'NTL', False)
+    frames = []
+    ResultChannel.open_channel(ResultChannel.FrameSink(frames.append))
+    ControlChannel.reset()
+    yield lambda: [frame['data'] for frame in frames if frame['type'] == 'report']
+    ControlChannel.reset()
+    ResultChannel.close_channel()
+
+# docker-compose exec web python -m pytest -k "test_frame_reader"
+def test_frame_reader():
+    frames = [{'type': 'output', 'data': [1, 2.5, "é"]}, {'type': 'progress', 'progress': 50}, {'type': 'report', 'data': {}}]
+    data = b''.join(ResultChannel.encode(frame) for frame in frames)
+
+    ### frames split at any byte
+    reader = ResultChannel.FrameReader()
+    decoded = []
+    for i in range(len(data)):
+        decoded += reader.feed(data[i:i+1])
+    assert decoded == frames and reader.pending() == 0
+
+    ### truncated last frame
+    reader = ResultChannel.FrameReader()
+    assert reader.feed(data[:-1]) == frames[:-1]
+    assert reader.pending() == len(ResultChannel.encode(frames[-1])) - 1
+    assert reader.feed(data[-1:]) == frames[-1:]
+
+# docker-compose exec web python -m pytest -k "test_result_channel"
+def test_result_channel():
+    ### without channel the caller prints the data
+    assert not ResultChannel.is_open() and not ResultChannel.send('output', data=1)
+
+    frames = []
+    ResultChannel.open_channel(ResultChannel.FrameSink(frames.append))
+    try:
+        assert ResultChannel.send('output', label='out', data={'values': (1, 2)})
+        assert ResultChannel.send('report', data={'success': True})
+    finally:
+        ResultChannel.close_channel()
+    assert frames == [{'type': 'output', 'label': 'out', 'data': {'values': [1, 2]}}, {'type': 'report', 'data': {'success': True}}]
+    assert not ResultChannel.is_open()
+
+# docker-compose exec web python -m pytest -k "test_deterministic"
+def test_deterministic():
+    master = Master()
+    master.addSubModel(RandomGenerator(seed=1))
+    assert isDeterministic(master)
+    master.addSubModel(RandomGenerator())
+    assert not isDeterministic(master)
+
+    ### a seeded generator gives the same values
+    values = lambda gen: [gen.random.randint(gen.minValue, gen.maxValue) for i in range(10)]
+    assert values(RandomGenerator(seed=1)) == values(RandomGenerator(seed=1))
+
+# docker-compose exec web python -m pytest -k "test_cancelled_simulation"
+def test_cancelled_simulation(reports):
+    master, sink = build(generators=2, limit=100000)
+    ### the cancellation requested before the start is applied when the simulation thread is registered
+    ControlChannel.cancel()
+    assert makeSimulation(master, 1e6)
+    report = reports()[-1]
+    assert report['status'] == 'CANCELLED' and report['termination_reason'] == 'cancelled'
+    assert master.timeLast < 1e6
+
+    ### a completed simulation
+    ControlChannel.reset()
+    master, sink = build()
+    assert makeSimulation(master, 20)
+    report = reports()[-1]
+    assert report['status'] == 'COMPLETED' and report['termination_reason'] == 'completed' and sink.log
+
+    ### a cancellation received once the simulation is terminating is ignored
+    master, sink = build()
+    thread = simulate(master, 20.0)
+    thread.cancel()
+    assert thread.terminating and not thread.cancelled and thread.termination_reason is None
+    assert not thread.stop('max_wall')
+
+# docker-compose exec web python -m pytest -k "test_control_channel"
+def test_control_channel():
+    ControlChannel.reset()
+    read_fd, write_fd = os.pipe()
+    listener = ControlChannel.listen(read_fd)
+    try:
+        os.write(write_fd, ResultChannel.encode({'type': 'unknown'}))
+        os.write(write_fd, ResultChannel.encode({'type': 'cancel'}))
+    finally:
+        os.close(write_fd)
+    listener.join(5)
+    os.close(read_fd)
+    assert ControlChannel.is_cancelled()
+    ControlChannel.reset()
+    assert not ControlChannel.is_cancelled()
+
+# docker-compose exec web python -m pytest -k "test_budget"
+def test_budget(monkeypatch):
+    budget = Budget(max_events=3, max_time=10.0)
+    budget.start()
+    assert [budget.step(t) for t in (1.0, 2.0, 3.0)] == [None, None, None]
+    assert budget.step(4.0) == Budget.MAX_EVENTS
+    budget.start()
+    assert budget.step(11.0) == Budget.MAX_TIME
+
+    budget = Budget(max_wall=0.0)
+    budget.start()
+    assert budget.step(0.0) == Budget.MAX_WALL
+
+    ### the memory is evaluated every CHECK_PERIOD events
+    monkeypatch.setattr('Patterns.Budget.CHECK_PERIOD', 2)
+    budget = Budget(max_rss=1.0)
+    budget.start()
+    assert budget.step(0.0) is None and budget.step(0.0) == Budget.MAX_RSS
+    assert Budget().isEmpty() and not budget.isEmpty()
+
+# docker-compose exec web python -m pytest -k "test_budget_simulation"
+def test_budget_simulation(reports):
+    master, sink = build(limit=100000)
+    assert makeSimulation(master, 1e6, budget=Budget(max_events=10))
+    report = reports()[-1]
+    assert report['status'] == 'STOPPED' and report['termination_reason'] == Budget.MAX_EVENTS
+    assert report['budget']['max_events'] == 10 and report['budget']['events'] == 11
+
+# docker-compose exec web python -m pytest -k "test_coupled_solver"
+def test_coupled_solver():
+    ### each generator sends to its own port of the sink through the output ports of its group
+    master = Master()
+    master.name = 'master'
+    Diagram().setBlock(master)
+    sink = Sink()
+    sink.name = 'sink'
+    master.addSubModel(sink)
+    expected = []
+    for g in range(3):
+        group = DomainStructure()
+        group.name = f'group{g}'
+        master.addSubModel(group)
+        for i in range(4):
+            period, limit = 1.0 + i*0.5 + g*0.25, 3 + i
+            gen = Generator(period, limit)
+            gen.name = f'gen{g}_{i}'
+            gen.addOutPort()
+            group.addSubModel(gen)
+            group.addOutPort()
+            group.connectPorts(gen.OPorts[0], group.OPorts[i])
+            port = len(sink.IPorts)
+            sink.addInPort()
+            master.connectPorts(group.OPorts[i], sink.IPorts[port])
+            expected += [(port, [k, gen.name], period*(k+1)) for k in range(limit)]
+
+    simulate(master, 100.0)
+    assert sorted(sink.log) == sorted(expected)
+
+# docker-compose exec web python -m pytest -k "test_fan_out"
+def test_fan_out():
+    ### an output port coupled to two ports of a sink and, through the output port of its group, to another sink
+    master = Master()
+    master.name = 'master'
+    Diagram().setBlock(master)
+    group = DomainStructure()
+    group.name = 'group'
+    group.addOutPort()
+    master.addSubModel(group)
+    gen = Generator(1.0, 3)
+    gen.name = 'gen'
+    gen.addOutPort()
+    group.addSubModel(gen)
+    sinks = []
+    for name, parent in (('sink0', group), ('sink1', master)):
+        sink = Sink()
+        sink.name = name
+        sink.addInPort()
+        sink.addInPort()
+        parent.addSubModel(sink)
+        sinks.append(sink)
+    group.connectPorts(gen.OPorts[0], sinks[0].IPorts[0])
+    group.connectPorts(gen.OPorts[0], sinks[0].IPorts[1])
+    group.connectPorts(gen.OPorts[0], group.OPorts[0])
+    master.connectPorts(group.OPorts[0], sinks[1].IPorts[1])
+
+    simulate(master, 10.0)
+    assert gen.OPorts[0].routes == ((sinks[0], tuple(sinks[0].IPorts)), (group, (group.OPorts[0],)))
+    assert sinks[0].log == [(p, [k, 'gen'], k+1.0) for k in range(3) for p in (0, 1)]
+    assert sinks[1].log == [(1, [k, 'gen'], k+1.0) for k in range(3)]
+
+# docker-compose exec web python -m pytest -k "test_bound_dispatch"
+def test_bound_dispatch(monkeypatch):
+    ### same output with the solvers bound to the models and with the dispatch of each message
+    logs = []
+    for flag in (True, False):
+        monkeypatch.setattr('DEVSKernel.PyDEVS.simulator.WITH_BOUND_DISPATCH', flag)
+        master, sink = build()
+        simulate(master, 20.0)
+        assert (master._receive.__name__ == 'dispatch') != flag
+        logs.append(sink.log)
+    assert logs[0] and logs[0] == logs[1]
+
+# docker-compose exec web python -m pytest -k "test_message_modes"
+@pytest.mark.parametrize("mode", ["frozen", "debug"])
+def test_message_modes(reference, mode, monkeypatch):
+    monkeypatch.setitem(builtins.__dict__, 'MESSAGE_MODE', mode)
+    master, sink = build()
+    simulate(master, 20.0)
+    assert output(sink) == reference
+
+# docker-compose exec web python -m pytest -k "test_frozen_message"
+def test_frozen_message():
+    value = {'values': [1, 2], 'tags': {'a'}}
+    msg = writeMessage(Message(value, 1.0), 'frozen')
+    assert isinstance(msg, FrozenMessage) and isinstance(msg.value, FrozenDict) and isinstance(msg.value['values'], FrozenList)
+    assert readMessage(msg, 'frozen') is msg
+    with pytest.raises(TypeError):
+        msg.value['values'] = []
+    with pytest.raises(AttributeError):
+        msg.value = None
+
+    ### the receivers in copy mode get a mutable copy
+    copied = readMessage(msg, 'copy')
+    assert type(copied) is Message and copied.value == {'values': [1, 2], 'tags': frozenset({'a'})}
+    copied.value['values'].append(3)
+    assert msg.value['values'] == (1, 2)
+
+    ### an object which can not be frozen modified after its sending
+    ### an array is shared without copy unless it is a view of a buffer of the sender
+    values = numpy.arange(4)
+    frozen = writeMessage(Message([values, values[1:3]], 1.0), 'frozen').value
+    assert numpy.shares_memory(frozen[0], values) and not numpy.shares_memory(frozen[1], values)
+    values[1] = 10
+    assert frozen[1].tolist() == [1, 2] and not frozen[0].flags.writeable
+
+    msg = writeMessage(FrozenMessage(bytearray(b'ab'), 1.0), 'debug')
+    msg.value[0] = 0
+    with pytest.raises(MessageMutationError):
+        readMessage(msg, 'debug')
+
+# docker-compose exec web python -m pytest -k "test_ntl"
+@pytest.mark.parametrize("strategy", ["bag-based", "direct-coupling"])
+def test_ntl(strategy):
+    ### the simulation without time limit stops when no atomic model is active
+    master, sink = build()
+    simulate(master, 100.0, strategy)
+    expected = output(sink)
+    master, sink = build()
+    thread = simulate(master, INFINITY, strategy, ntl=True)
+    assert output(sink) == expected and thread.activity.active == 0
+
+# docker-compose exec web python -m pytest -k "test_multiprocess"
+def test_multiprocess(reference, monkeypatch):
+    ### light models are simulated serially
+    master, sink = build()
+    thread = simulate(master, 20.0, "multiprocess")
+    assert output(sink) == reference and thread.getAlgorithm().stats['mode'] == 'serial'
+
+    ### all the models offloaded to the pool
+    for name, value in (('WARMUP_STEPS', 5), ('MIN_COST', 0.0), ('MIN_GAIN', 0.0), ('WORKERS', 2)):
+        monkeypatch.setattr(f'Patterns.ParallelStrategy.PARALLEL_{name}', value)
+    master, sink = build()
+    thread = simulate(master, 20.0, "multiprocess")
+    stats = thread.getAlgorithm().stats
+    assert output(sink) == reference and stats['mode'] == 'pool' and stats['remote_int'] > 0
+
+# docker-compose exec web python -m pytest -k "test_parallel_tunables"
+def test_parallel_tunables(monkeypatch):
+    ### the tunables are read from the environment (a copy of the module is loaded)
+    monkeypatch.setenv('PARALLEL_WORKERS', '3')
+    monkeypatch.setenv('PARALLEL_MIN_GAIN', '2.5')
+    monkeypatch.setenv('CONSERVATIVE_PARTITIONS', '')
+    import Patterns.ParallelStrategy
+    spec = importlib.util.spec_from_file_location('ParallelStrategyEnv', Patterns.ParallelStrategy.__file__)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    assert module.PARALLEL_WORKERS == 3 and module.PARALLEL_MIN_GAIN == 2.5 and module.CONSERVATIVE_PARTITIONS is None
+    assert module.TIMEWARP_SAVE_PERIOD == 8
+
+# docker-compose exec web python -m pytest -k "test_conservative"
+@pytest.mark.parametrize("lookahead", [0.0, 0.5])
+def test_conservative(reference, lookahead, monkeypatch):
+    ### the relays do not send before 0.5 after an input: the groups are simulated in windows
+    monkeypatch.setattr(Relay, 'LOOKAHEAD', lookahead, raising=False)
+    monkeypatch.setattr('Patterns.ParallelStrategy.CONSERVATIVE_PARTITIONS', 3)
+    master, sink = build()
+    thread = simulate(master, 20.0, "conservative")
+    stats = thread.getAlgorithm().stats
+    assert output(sink) == reference and stats['partitions'] > 1
+    assert (stats['windows'] > 0) == (lookahead > 0)
+
+# docker-compose exec web python -m pytest -k "test_optimistic"
+@pytest.mark.parametrize("save_period", [1, 8])
+def test_optimistic(reference, save_period, monkeypatch):
+    ### the states are restored from the snapshot of each step or from older ones (and replayed)
+    monkeypatch.setattr('Patterns.ParallelStrategy.CONSERVATIVE_PARTITIONS', 3)
+    monkeypatch.setattr('Patterns.ParallelStrategy.TIMEWARP_SAVE_PERIOD', save_period)
+    master, sink = build()
+    thread = simulate(master, 20.0, "optimistic")
+    stats = thread.getAlgorithm().stats
+    assert output(sink) == reference and stats['partitions'] > 1 and stats['gvt_rounds'] > 0
+    assert stats['events_committed'] == stats['events_processed'] - stats['rolled_back_events']
+
+# docker-compose exec web python -m pytest -k "test_population"
+def test_population():
+    ### same messages as the atomic generators (the members due at the same time send one message)
+    periods, limits = [1.0 + (i % 3)*0.5 for i in range(7)], [3 + i for i in range(7)]
+    logs = [build_population(periods, limits, strategy) for strategy in ("bag-based", "direct-coupling")]
+    received = [(int(i), int(v), t) for port, (idx, values), t in logs[0] for i, v in zip(idx, values)]
+    expected = [(i, k, periods[i]*(k+1)) for i in range(7) for k in range(limits[i])]
+    assert sorted(received) == sorted(expected) and len(logs[0]) < len(expected)
+
+    ### the direct-coupling strategy does not set the time of the first message of a model (see setAtomicModels)
+    values = lambda log: [(idx.tolist(), values.tolist()) for port, (idx, values), t in log]
+    assert values(logs[0]) == values(logs[1])
+
+def build_population(periods:list, limits:list, strategy:str)->list:
+    """Log of the sink of a population of generators."""
+    master = Master()
+    master.name = 'master'
+    Diagram().setBlock(master)
+    population = Generators(periods, limits)
+    population.name = 'population'
+    population.addOutPort()
+    master.addSubModel(population)
+    sink = Sink()
+    sink.name = 'sink'
+    sink.addInPort()
+    master.addSubModel(sink)
+    master.connectPorts(population.OPorts[0], sink.IPorts[0])
+
+    simulate(master, 100.0, strategy)
+    return sink.log
+
+# docker-compose exec web python -m pytest -k "test_checkpoint_resume"
+@pytest.mark.parametrize("strategy", ["bag-based", "direct-coupling"])
+@pytest.mark.parametrize("at", [3.0, 7.6])
+def test_checkpoint_resume(reference, strategy, at, tmp_path):
+    path = str(tmp_path / "sim.ckpt")
+
+    master, sink = build()
+    checkpoint = Checkpoint(path, at=at)
+    simulate(master, 20.0, strategy, checkpoint=checkpoint)
+    assert checkpoint.saves == 1 and checkpoint.time >= at
+
+    ### the resumed simulation goes on from the checkpoint (the log of the sink included)
+    master, sink = build()
+    checkpoint = Checkpoint(resume=path)
+    simulate(master, 20.0, strategy, checkpoint=checkpoint)
+    assert checkpoint.resumed_time >= at
+    assert output(sink) == reference
+
+    ### not a checkpoint file
+    (tmp_path / "sim.txt").write_text("sim")
+    with pytest.raises(CheckpointError):
+        read(str(tmp_path / "sim.txt"))
+
+# docker-compose exec web python -m pytest -k "test_strategies"
+@pytest.mark.parametrize("strategy", ["direct-coupling"])
+def test_strategies(reference, strategy):
+    master, sink = build()
+    simulate(master, 20.0, strategy)
+    assert output(sink) == reference
+
+# docker-compose exec web python -m pytest -k "test_event_heap"
+def test_event_heap():
+    class Model:
+        def __init__(self, priority, tn):
+            self.priority = priority
+            self.myTimeAdvance = tn
+    models = [Model(i, tn) for i, tn in enumerate([2.0, 1.0, 1.0, INFINITY])]
+    heap = EventHeap(models)
+    assert heap.min() == 1.0 and heap.popImminents() == models[1:3]
+
+    ### the previous entries of the updated models are skipped
+    for i in range(100):
+        models[0].myTimeAdvance = 3.0 + i
+        heap.update(models[0])
+    models[1].myTimeAdvance = 4.0
+    heap.update(models[1])
+    assert len(heap.heap) < 100
+    assert heap.popImminents() == [models[1]] and heap.popImminents() == [models[0]] and heap.min() == INFINITY
+
+# docker-compose exec web python -m pytest -k "test_plugin_hooks"
+@pytest.mark.parametrize("strategy", ["bag-based", "direct-coupling"])
+def test_plugin_hooks(strategy, monkeypatch):
+    monkeypatch.setattr(PluginManager, 'plugins', defaultdict(list))
+    monkeypatch.setattr(PluginManager, 'disabled_event', [])
+    for event in ('SIM_VERBOSE', 'SIM_BLINK', 'SIM_TEST'):
+        monkeypatch.setattr(Hooks, event, getattr(Hooks, event))
+
+    ### without plug-in the events are empty tuples
+    PluginManager.bind_hooks()
+    assert Hooks.SIM_VERBOSE == Hooks.SIM_BLINK == Hooks.SIM_TEST == ()
+    assert not PluginManager.plugins
+
+    ### the plug-ins are bound at the start of the simulation
+    calls = []
+    PluginManager.register('SIM_BLINK')(lambda *args, **kwargs: calls.append(kwargs))
+    master, sink = build()
+    simulate(master, 20.0, strategy)
+    assert len(Hooks.SIM_BLINK) == 1 and calls
+
+    PluginManager.disabled_event.append('SIM_BLINK')
+    PluginManager.bind_hooks()
+    assert Hooks.SIM_BLINK == ()
+
+# docker-compose exec web python -m pytest -k "test_model_profile"
+def test_model_profile(reference, reports):
+    master, sink = build()
+    assert makeSimulation(master, 20.0, profiler=ModelProfiler())
+    profile = reports()[-1]['model_profile']
+    rows = {row[0]: dict(zip(profile['columns'], row)) for row in profile['rows']}
+
+    ### the profiled simulation gives the same output
+    assert output(sink) == reference and len(rows) == 3*(4+1)+1
+    assert rows['gen0_0']['outputFnc_calls'] == rows['gen0_0']['sent'] == 6 and rows['gen0_0']['class'] == 'Generator'
+    assert rows['sink']['received'] == len(sink.log) and rows['sink']['sent'] == 0
+    assert profile['rows'][0][-4] == max(row['total_wall'] for row in rows.values())
@@ -0,0 +1,496 @@
+import asyncio, cProfile, hashlib, json, os, re, shutil, time
+
+import pytest
+import redis.asyncio
+
+from api import catalog, endpoints, metrics, nogui, profiles, result_cache, scheduling, stream, worker
+from api.config import yaml_path_dir
+from api.yaml_cache import YAMLCache, get_blocks_list, get_block_args
+
+#############################################################
+# Tests of the services of the API without Redis server
+#############################################################
+
+YAML_FILENAME = os.path.join(yaml_path_dir, "save_model.yaml")
+
+def stream_id(event_id:str)->tuple:
+    return tuple(int(n) for n in event_id.split('-'))
+
+class FakeRedis:
+    """In-memory Redis client with the commands used by the tested services."""
+
+    def __init__(self):
+        self.data = {}
+        self.ttl = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = str(value).encode()
+        self.ttl[key] = ex
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def exists(self, key):
+        return int(key in self.data)
+
+    def expire(self, key, seconds):
+        self.ttl[key] = seconds
+        return key in self.data
+
+    def xadd(self, key, fields, maxlen=None, approximate=True):
+        entries = self.data.setdefault(key, [])
+        event_id = f"{len(entries)+1}-0"
+        entries.append((event_id, {k: str(v) for k, v in fields.items()}))
+        return event_id
+
+    def incrby(self, key, amount=1):
+        value = int(self.data.get(key, b'0')) + amount
+        self.data[key] = str(value).encode()
+        return value
+
+    def decrby(self, key, amount=1):
+        return self.incrby(key, -amount)
+
+    def hset(self, key, field, value):
+        self.data.setdefault(key, {})[field.encode()] = str(value).encode()
+
+    def hget(self, key, field):
+        return self.data.get(key, {}).get(field.encode())
+
+    def hdel(self, key, field):
+        return int(self.data.get(key, {}).pop(field.encode(), None) is not None)
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def hincrby(self, key, field, value):
+        return self.hincrbyfloat(key, field, value)
+
+    def hincrbyfloat(self, key, field, value):
+        fields = self.data.setdefault(key, {})
+        new = float(fields.get(field.encode(), b'0')) + value
+        fields[field.encode()] = str(int(new) if new == int(new) else new).encode()
+        return new
+
+    def zadd(self, key, mapping):
+        self.data.setdefault(key, {}).update(mapping)
+
+    def zrem(self, key, member):
+        return int(self.data.get(key, {}).pop(member, None) is not None)
+
+    def zrange(self, key, start, stop):
+        members = sorted(self.data.get(key, {}).items(), key=lambda item: item[1])
+        return [m.encode() for m, score in members[start:stop+1 if stop != -1 else None]]
+
+    def zrangebyscore(self, key, low, high):
+        return [m.encode() for m, score in sorted(self.data.get(key, {}).items(), key=lambda item: item[1]) if low <= score <= high]
+
+    def zremrangebyscore(self, key, low, high):
+        zset = self.data.get(key, {})
+        for member in [m for m, score in zset.items() if low <= score <= high]:
+            del zset[member]
+
+    def zcard(self, key):
+        return len(self.data.get(key, {}))
+
+    def lpush(self, key, value):
+        self.data.setdefault(key, []).insert(0, str(value).encode())
+
+    def ltrim(self, key, start, stop):
+        self.data[key] = self.data.get(key, [])[start:stop+1 if stop != -1 else None]
+
+    def lrange(self, key, start, stop):
+        return self.data.get(key, [])[start:stop+1 if stop != -1 else None]
+
+    def llen(self, key):
+        return len(self.data.get(key, []))
+
+class FakePipeline:
+    """Pipeline of a FakeRedis (the commands are executed by execute)."""
+
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def __getattr__(self, name):
+        command = getattr(self.client, name)
+        return lambda *args, **kwargs: self.commands.append((command, args, kwargs))
+
+    def execute(self):
+        commands, self.commands = self.commands, []
+        return [command(*args, **kwargs) for command, args, kwargs in commands]
+
+class FakeAsyncRedis:
+    """Asynchronous client (with decoded responses) of the data of a FakeRedis."""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def xread(self, streams, block=None, count=None):
+        response = []
+        for key, last_id in streams.items():
+            entries = [e for e in self.client.data.get(key, []) if stream_id(e[0]) > stream_id(last_id)][:count]
+            if entries:
+                response.append((key, entries))
+        return response
+
+    async def xrevrange(self, key, count=None):
+        return list(reversed(self.client.data.get(key, [])))[:count]
+
+    async def exists(self, key):
+        return self.client.exists(key)
+
+    async def close(self):
+        pass
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(stream.Publisher, '_client', client)
+    monkeypatch.setattr(result_cache, '_client', client)
+    monkeypatch.setattr(scheduling, '_client', client)
+    monkeypatch.setattr(metrics, '_client', client)
+    monkeypatch.setattr(redis.asyncio.Redis, 'from_url', lambda *args, **kwargs: FakeAsyncRedis(client))
+    return client
+
+def read_events(*args, **kwargs)->list:
+    """Server-Sent Events of the stream of a simulation."""
+    async def read():
+        return [event async for event in stream.read_events(*args, **kwargs)]
+    return asyncio.run(read())
+
+# docker-compose exec web python -m pytest -k "test_warm_execution"
+def test_warm_execution():
+    ### same output in a warm process and in a subprocess
+    for args in (['-blockslist'], ['-blockargs', 'Gen_0']):
+        warm = nogui.execute(YAML_FILENAME, args)
+        assert warm['success'] and nogui.is_warm()
+        assert warm == worker.execute_cmd(YAML_FILENAME, args)
+
+    ### an error of devsimpy-nogui does not stop the warm process
+    assert not nogui.execute(YAML_FILENAME, ['-blockargs', 'Unknown'])['success']
+    assert not worker.execute_cmd(YAML_FILENAME, ['-blockargs', 'Unknown'])['success']
+    assert nogui.execute(YAML_FILENAME, ['-blockslist'])['success']
+
+# docker-compose exec web python -m pytest -k "test_stream"
+def test_stream(fake_redis, monkeypatch):
+    publisher = stream.Publisher("sim1")
+    publisher.publish({'type': 'progress', 'progress': 50})
+    publisher.publish({'type': 'output', 'data': [1]})
+    publisher.end("SUCCESS")
+    assert fake_redis.ttl[stream.stream_key("sim1")] == stream.STREAM_TTL
+
+    events = read_events("sim1")
+    assert events[0] == stream.format_event("1-0", "progress", json.dumps({'type': 'progress', 'progress': 50}))
+    assert [e.split('\n')[1] for e in events] == ["event: progress", "event: output", "event: end"]
+    assert events[-1].endswith(f"data: {json.dumps({'type': 'end', 'status': 'SUCCESS'})}\n\n")
+
+    ### a reconnecting client gets the events after its Last-Event-ID (and nothing after the end event)
+    assert read_events("sim1", "1-0") == events[1:]
+    assert read_events("sim1", "3-0") == []
+
+    ### stream of a simulation that is over without events
+    events = read_events("sim2", is_ready=lambda: True)
+    assert len(events) == 1 and '"UNKNOWN"' in events[0]
+
+    ### stream of a simulation that never starts
+    monkeypatch.setattr(stream, 'STREAM_MAX_WAIT', 0)
+    events = read_events("sim3", is_ready=lambda: False)
+    assert len(events) == 1 and '"TIMEOUT"' in events[0]
+
+# docker-compose exec web python -m pytest -k "test_yaml_cache"
+def test_yaml_cache(tmp_path):
+    ### same results as devsimpy-nogui
+    blocks = get_blocks_list(YAML_FILENAME)
+    assert blocks['success'] and blocks['output'].encode() == nogui.execute(YAML_FILENAME, ['-blockslist'])['output']
+    args = get_block_args(YAML_FILENAME, 'Gen_0')
+    assert args['success'] and json.loads(args['output']) == json.loads(nogui.execute(YAML_FILENAME, ['-blockargs', 'Gen_0'])['output'])
+    assert not get_block_args(YAML_FILENAME, 'Unknown')['success']
+
+    path = str(tmp_path / "model.yaml")
+    shutil.copy(YAML_FILENAME, path)
+    cache = YAMLCache(maxsize=1)
+    index = cache.get(path)
+    assert index['hash'] == catalog.file_hash(path) and set(index['sources']) == set(json.loads(index['blocks']))
+    assert cache.get(path) is index and (cache.hits, cache.misses) == (1, 1)
+
+    ### same size, new mtime
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert cache.get(path) is not index and (cache.hits, cache.misses) == (1, 2)
+
+    ### least recently used file evicted
+    cache.get(YAML_FILENAME)
+    assert len(cache) == 1 and cache.get(path) and cache.misses == 4
+
+# docker-compose exec web python -m pytest -k "test_catalog"
+def test_catalog(tmp_path):
+    for name in ('c.yaml', 'a.yaml', 'b.yaml', 'ab.yaml', 'e.yaml', 'notes.txt'):
+        (tmp_path / name).write_text(name)
+
+    cat = catalog.Catalog(str(tmp_path), interval=0)
+    entries, total = cat.list(offset=1, limit=2)
+    assert [e.name for e in entries] == ['ab.yaml', 'b.yaml'] and total == 5
+    entries, total = cat.list(prefix='a')
+    assert [e.name for e in entries] == ['a.yaml', 'ab.yaml'] and total == 2
+    entries, total = cat.list(offset=4, limit=10)
+    assert [e.name for e in entries] == ['e.yaml'] and total == 5
+
+    ### new, modified and removed files
+    (tmp_path / 'd.yaml').write_text('d')
+    (tmp_path / 'a.yaml').write_text('modified')
+    os.remove(tmp_path / 'e.yaml')
+    entries, total = cat.list()
+    assert [e.name for e in entries] == ['a.yaml', 'ab.yaml', 'b.yaml', 'c.yaml', 'd.yaml']
+    assert entries[0].hash == hashlib.sha256(b'modified').hexdigest() == catalog.file_hash(str(tmp_path / 'a.yaml'))
+    assert catalog.project(entries[0], ('size', 'content')) == {'size': '0.008 ko', 'content': 'modified'}
+
+    ### a name of a directory overrides the same name in the previous ones
+    other = tmp_path / 'other'
+    other.mkdir()
+    (other / 'b.yaml').write_text('other b')
+    entries, total = catalog.list_entries([str(tmp_path), str(other)], offset=1, limit=2)
+    assert [e.name for e in entries] == ['ab.yaml', 'b.yaml'] and entries[1].path == str(other / 'b.yaml') and total == 5
+
+# docker-compose exec web python -m pytest -k "test_batch_runs"
+def test_batch_runs(test_app, monkeypatch):
+    runs = endpoints.expand_grid({'Gen_0': {'max': [5, 20], 'step': [1]}, 'Gen_1': {'min': [1, 2]}})
+    assert runs == [{'Gen_0': {'max': 5, 'step': 1}, 'Gen_1': {'min': 1}}, {'Gen_0': {'max': 5, 'step': 1}, 'Gen_1': {'min': 2}},
+                    {'Gen_0': {'max': 20, 'step': 1}, 'Gen_1': {'min': 1}}, {'Gen_0': {'max': 20, 'step': 1}, 'Gen_1': {'min': 2}}]
+
+    ### the args are overridden in memory only
+    assert nogui.warm_up()
+    from InteractionYAML import YAMLHandler
+    handler = YAMLHandler(YAML_FILENAME)
+    assert handler.overrideYAMLBlockModelArgs({'Gen_0': {'max': 5}}) == {'Gen_0': {'max': 5, 'min': 0, 'step': 2}}
+    assert json.loads(worker.execute_cmd(YAML_FILENAME, ['-blockargs', 'Gen_0'])['output']) == {'max': 10, 'min': 0, 'step': 2}
+    assert YAMLHandler(YAML_FILENAME).getYAMLBlockModelArgs('Gen_0') == {'max': 10, 'min': 0, 'step': 2}
+    with pytest.raises(ValueError):
+        handler.overrideYAMLBlockModelArgs({'Gen_9': {'max': 5}})
+    with pytest.raises(ValueError):
+        handler.overrideYAMLBlockModelArgs({'Gen_0': {'period': 5}})
+
+    monkeypatch.setattr(endpoints, 'BATCH_MAX_RUNS', 3)
+    response = test_app.post("/simulation/batch", json={'filename': "save_model.yaml", 'grid': {'Gen_0': {'max': [1, 2, 3, 4]}}})
+    assert response.status_code == 422
+
+    ### a bad block or arg is rejected before the simulations are queued
+    assert endpoints.check_overrides(YAML_FILENAME, [{'Gen_0': {'max': 1, 'step': 1}}, {}]) is None
+    response = test_app.post("/simulation/batch", json={'filename': "save_model.yaml", 'grid': {'Gen_9': {'max': [1, 2]}}})
+    assert response.status_code == 422 and 'Gen_9' in response.json()['detail']
+    response = test_app.post("/simulation/batch", json={'filename': "save_model.yaml", 'runs': [{'Gen_0': {'max': 1}}, {'Gen_0': {'period': 1}}]})
+    assert response.status_code == 422 and 'period' in response.json()['detail']
+
+class FakeBatch:
+    """GroupResult of simulations in the given states."""
+
+    def __init__(self, states:list):
+        self.results = [type('Result', (), {'id': f"sim{i}", 'status': state, 'result': None}) for i, state in enumerate(states)]
+
+    def completed_count(self):
+        return sum(result.status == "SUCCESS" for result in self.results)
+
+# docker-compose exec web python -m pytest -k "test_batch_status"
+@pytest.mark.parametrize("states, batch_status", [(["SUCCESS", "SUCCESS"], "SUCCESS"), (["PENDING", "PENDING"], "PENDING"),
+                                                  (["CANCELLED", "STARTED"], "STARTED"), (["CANCELLED", "SUCCESS"], "CANCELLED"),
+                                                  (["FAILURE", "SUCCESS"], "FAILURE"), (["REVOKED", "PENDING"], "STARTED")])
+def test_batch_status(test_app, states, batch_status, monkeypatch):
+    ### a cancelled batch is reported once all its runs are final
+    monkeypatch.setattr(endpoints, 'get_batch', lambda batch_id: FakeBatch(states))
+    response = test_app.get("/simulation/batch/batch1/status")
+    assert response.status_code == 200 and response.json()['batch_status'] == batch_status
+
+# docker-compose exec web python -m pytest -k "test_cached_simulation"
+def test_cached_simulation(test_app, fake_redis):
+    ### the result of the same simulation is returned without running it
+    key = endpoints.get_cache_key(YAML_FILENAME, "10", budget={})
+    assert key and result_cache.put(key, {'success': True, 'output': "[]", 'sim_id': "sim1"})
+    response = test_app.get("/simulation/start/", params={'duration': "10", 'filename': "save_model.yaml"})
+    assert response.status_code == 200
+    assert response.json() == {"sim_id": "sim1", "cache_hit": True, "sim_result": {'success': True, 'output': "[]"}}
+
+# docker-compose exec web python -m pytest -k "test_sim_output"
+def test_sim_output(fake_redis, monkeypatch):
+    frames = [{'type': 'live_streams', 'data': {}}, {'type': 'progress', 'data': {'progress': 50}},
+              {'type': 'output', 'label': 'out', 'value': [1]}, {'type': 'report', 'data': {'success': True}}]
+    def execute_sim(yaml_filename, args, on_frame=None, on_start=None):
+        for frame in frames:
+            on_frame(frame)
+        return {'success': True, 'output': b'print'}
+    monkeypatch.setattr(worker, 'execute_sim', execute_sim)
+
+    ### only the collectors outputs and the report are kept in the result
+    task = type('Task', (), {'request': type('Request', (), {'id': None})})
+    output = worker.run_sim(task, YAML_FILENAME, "10")
+    assert json.loads(output['output']) == frames[2:] and output['info'] == 'print'
+
+# docker-compose exec web python -m pytest -k "test_result_cache"
+def test_result_cache(fake_redis, monkeypatch, tmp_path):
+    source = tmp_path / 'Gen.py'
+    source.write_text('class Gen: pass')
+    index = {'hash': 'yaml-v1', 'blocks': '["Gen", "Out"]', 'args': {'Gen': '{"period": 1}', 'Out': '{}'}, 'sources': {'Gen': str(source)}}
+
+    key = result_cache.make_key(index, '10', strategy='bag-based')
+    assert key == result_cache.make_key(dict(index), 10, overrides={'Gen': {'period': 1}}, strategy='bag-based')
+
+    ### every input of the simulation changes the key
+    assert key != result_cache.make_key(dict(index, blocks='["Gen"]'), '10', strategy='bag-based')
+    assert key != result_cache.make_key(dict(index, hash='yaml-v2'), '10', strategy='bag-based')
+    assert key != result_cache.make_key(index, '10', overrides={'Gen': {'period': 2}}, strategy='bag-based')
+    assert key != result_cache.make_key(index, '20', strategy='bag-based')
+    assert key != result_cache.make_key(index, '10', kernel='PyPDEVS', strategy='bag-based')
+    assert key != result_cache.make_key(index, '10', strategy='direct-coupling')
+    assert key != result_cache.make_key(index, '10', strategy='bag-based', budget={'max_events': 10})
+
+    ### the model file of a block is read again when it is modified
+    source.write_text('class Gen: period = 2')
+    assert key != result_cache.make_key(index, '10', strategy='bag-based')
+
+    assert result_cache.get(key) is None
+    assert result_cache.put(key, {'success': True, 'output': "[]"})
+    assert result_cache.get(key) == {'success': True, 'output': "[]"}
+
+    ### the oldest results are evicted beyond the max size
+    monkeypatch.setattr(result_cache, 'SIM_CACHE_MAX_BYTES', 100)
+    for i in range(4):
+        assert result_cache.put(f"key{i}", {'output': "x"*30})
+    assert result_cache.get(key) is None and result_cache.get("key0") is None and result_cache.get("key3") is not None
+
+    ### running total of the sizes (a result stored again is not counted twice, a removed one only once)
+    total = lambda: int(fake_redis.get(result_cache.TOTAL_KEY))
+    size = len(json.dumps({'output': "x"*30}))
+    assert total() == 2*size
+    assert result_cache.put("key3", {'output': "x"*30}) and total() == 2*size
+    assert result_cache.evict("key2") == size and result_cache.evict("key2") == 0 and total() == size
+
+    ### the expired results are evicted and removed from the total
+    fake_redis.zadd(result_cache.INDEX_KEY, {"key3": 0})
+    assert result_cache.put("key4", {'output': "x"*30})
+    assert result_cache.get("key3") is None and total() == size
+
+    monkeypatch.setattr(result_cache, 'SIM_CACHE_MAX_ENTRY_BYTES', 10)
+    assert not result_cache.put("big", {'output': "x"*30})
+
+    report = lambda **data: {'type': 'report', 'data': dict({'success': True}, **data)}
+    assert result_cache.is_deterministic([{'type': 'output'}, report(deterministic=True)])
+    assert not result_cache.is_deterministic([report(deterministic=False)])
+    assert not result_cache.is_deterministic([report(deterministic=True, success=False)])
+
+    ### a simulation stopped by its event budget is reproducible, not by its wall clock budget
+    assert result_cache.is_deterministic([report(deterministic=True, termination_reason='max_events')])
+    assert not result_cache.is_deterministic([report(deterministic=True, termination_reason='max_wall')])
+
+# docker-compose exec web python -m pytest -k "test_scheduling"
+def test_scheduling(fake_redis, monkeypatch):
+    assert scheduling.get_lane("10") == scheduling.SHORT_QUEUE
+    assert scheduling.get_lane(str(scheduling.SIM_LONG_DURATION)) == scheduling.LONG_QUEUE
+    assert scheduling.get_lane("ntl") == scheduling.get_lane("inf") == scheduling.LONG_QUEUE
+
+    ### the priority of a user (or a tag) decreases with its in-flight simulations
+    for i in range(2*scheduling.FAIR_SHARE_STEP):
+        scheduling.submitted(f"sim{i}", userid="busy", tag="app")
+    assert scheduling.get_priority(userid="busy") == scheduling.get_priority(tag="app") == 2
+    assert scheduling.get_priority(userid="idle") == 0
+    assert scheduling.get_priority(userid="idle", tag="app") == 2
+    for i in range(scheduling.FAIR_SHARE_STEP):
+        scheduling.done(f"sim{i}", userid="busy", tag="app")
+    assert scheduling.get_priority(userid="busy") == 1
+
+    ### the forgotten in-flight simulations do not count
+    monkeypatch.setattr(scheduling, 'INFLIGHT_TTL', -1)
+    assert scheduling.get_priority(userid="busy") == 0
+
+    for wait in (4.0, 1.0, 2.0):
+        scheduling.started(scheduling.SHORT_QUEUE, time.time() - wait)
+    fake_redis.lpush(scheduling.queue_keys(scheduling.LONG_QUEUE)[3], "task")
+    stats = scheduling.get_lanes_stats()
+    assert stats[scheduling.SHORT_QUEUE]['wait']['samples'] == 3 and round(stats[scheduling.SHORT_QUEUE]['wait']['p50']) == 2
+    assert stats[scheduling.LONG_QUEUE]['depth'] == 1 and stats[scheduling.LONG_QUEUE]['depth_by_priority'] == {3: 1}
+
+# docker-compose exec web python -m pytest -k "test_batch_priorities"
+def test_batch_priorities(fake_redis):
+    priorities = [scheduling.fair_priority(n) for n in range(20*scheduling.FAIR_SHARE_STEP)]
+    assert priorities == sorted(priorities)
+    assert priorities[0] == 0 and priorities[scheduling.FAIR_SHARE_STEP] == 1 and priorities[-1] == scheduling.MAX_PRIORITY
+
+    ### the later runs of a batch go after the in-flight simulations of the user and the previous runs
+    for i in range(scheduling.FAIR_SHARE_STEP):
+        scheduling.submitted(f"sim{i}", userid="busy")
+    signatures = worker.batch_signatures("model.yaml", "10", [{}]*(3*scheduling.FAIR_SHARE_STEP), userid="busy")
+    assert [s.options['priority'] for s in signatures] == [scheduling.fair_priority(scheduling.FAIR_SHARE_STEP + i) for i in range(len(signatures))]
+    assert all(s.options['queue'] == scheduling.SHORT_QUEUE for s in signatures)
+
+def fib(n:int)->int:
+    return n if n < 2 else fib(n-1) + fib(n-2)
+
+def profiled_sum()->int:
+    return sum(fib(n) for n in range(18))
+
+# docker-compose exec web python -m pytest -k "test_profiles"
+def test_profiles(tmp_path, monkeypatch):
+    path = str(tmp_path / "sim1.prof")
+    profiler = cProfile.Profile()
+    profiler.runcall(profiled_sum)
+    profiler.dump_stats(path)
+
+    assert "profiled_sum" in profiles.get_text(path, limit=5)
+    stacks = dict(line.rsplit(' ', 1) for line in profiles.get_collapsed(path).splitlines())
+    ### the recursive calls are not expanded
+    fib_stacks = [stack for stack in stacks if stack.split(';')[-1].startswith('fib ')]
+    assert fib_stacks and all(stack.split(';')[0].startswith('profiled_sum ') and stack.count('fib ') == 1 for stack in fib_stacks)
+    assert all(int(weight) > 0 for weight in stacks.values())
+
+    ### expired and oldest profiles
+    monkeypatch.setattr(profiles, 'profiles_path_dir', str(tmp_path))
+    now = time.time()
+    for i, age in enumerate((10, 20, 30, 100)):
+        p = tmp_path / f"sim{i+2}.prof"
+        p.write_bytes(b'x'*100)
+        os.utime(p, (now - age, now - age))
+    assert profiles.get_profile_path("sim2") == str(tmp_path / "sim2.prof")
+    assert profiles.cleanup(ttl=50, max_bytes=os.path.getsize(path) + 200, now=now) == 2
+    assert sorted(os.listdir(tmp_path)) == ['sim1.prof', 'sim2.prof', 'sim3.prof']
+
+# docker-compose exec web python -m pytest -k "test_metrics_render"
+def test_metrics_render(fake_redis):
+    metrics.observe('devsimpy_task_run_seconds', 0.3, lane='sim_short')
+    metrics.observe('devsimpy_task_run_seconds', 7.0, lane='sim_short')
+    metrics.inc('devsimpy_simulations_total', status='SUCCESS')
+    text = metrics.render()
+    lines = text.splitlines()
+
+    assert text.endswith('\n')
+    for name, (kind, description, buckets) in metrics.METRICS.items():
+        assert f"# HELP {name} {description}" in lines and f"# TYPE {name} {kind}" in lines
+
+    ### cumulative buckets, sum and count
+    assert 'devsimpy_task_run_seconds_bucket{lane="sim_short",le="0.25"} 0' in lines
+    assert 'devsimpy_task_run_seconds_bucket{lane="sim_short",le="0.5"} 1' in lines
+    assert 'devsimpy_task_run_seconds_bucket{lane="sim_short",le="10.0"} 2' in lines
+    assert 'devsimpy_task_run_seconds_bucket{lane="sim_short",le="+Inf"} 2' in lines
+    assert 'devsimpy_task_run_seconds_sum{lane="sim_short"} 7.3' in lines
+    assert 'devsimpy_task_run_seconds_count{lane="sim_short"} 2' in lines
+    assert 'devsimpy_simulations_total{status="SUCCESS"} 1.0' in lines
+    assert 'devsimpy_queue_depth{lane="sim_long",priority="0"} 0' in lines
+
+    ### every sample is 'name{labels} value'
+    sample = re.compile(r'^[a-z_]+(\{([a-z_]+="[^"]*",?)+\})? (\+Inf|[0-9.e+-]+)$')
+    assert all(sample.match(line) for line in lines if not line.startswith('#'))
+
+# docker-compose exec web python -m pytest -k "test_sim_ready"
+@pytest.mark.parametrize("state, ready", [("PENDING", False), ("STARTED", False), ("SUCCESS", True), ("FAILURE", True), (worker.CANCELLED, True)])
+def test_sim_ready(state, ready, monkeypatch):
+    monkeypatch.setattr(worker.AsyncResult, 'state', property(lambda self: state))
+    assert worker.is_sim_ready("sim1") == ready